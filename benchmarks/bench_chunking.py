@@ -0,0 +1,99 @@
+import sys, os, time, socket, threading, argparse
+from itertools import zip_longest
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import chunking
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+chunking benchmark, compares the old byte by byte _chunker and per chunk send()
+against the memoryview chunker with sendChunked, and against the length prefixed
+framing that sends large slices without padding, over a local socket pair
+"""
+
+MB = 1024 * 1024
+
+def legacyChunker(iterable, n, fillvalue=b'\x00'):
+    """the _chunker that used to live in both Server and client, kept here as the baseline
+    """
+    args = [iter(iterable)] * n
+    ans = list(zip_longest(fillvalue=fillvalue, *args))
+    fin = []
+    for sub in ans:
+        chunk = b''
+        for each in sub:
+            if isinstance(each, bytes): chunk += each
+            else: chunk += int(each).to_bytes(1, 'big')
+        fin.append(chunk)
+    return fin
+
+def legacySend(sock, data, n):
+    """chunks data with legacyChunker and sends it one chunk per send() call
+    """
+    for chunk in legacyChunker(data, n):
+        sock.sendall(chunk)
+    sock.sendall(bytes(n))
+
+def framedSend(sock, data, n):
+    """sends data the way the length prefixed framing does, large slices and no padding
+    """
+    for view in chunking.slices(data, 65536):
+        sock.sendall(view)
+
+def drain(sock, total):
+    """reads total bytes from the socket and discards them
+    """
+    buf = bytearray(1024 * 1024)
+    while total:
+        total -= sock.recv_into(buf, min(len(buf), total))
+
+def measure(send, data, n, chunked=True):
+    """times sending data through a socket pair with the given send function
+
+    Returns:
+        float: throughput in MB/s
+    """
+    a, b = socket.socketpair()
+    total = len(data)
+    if chunked:
+        total += len(chunking.padding(len(data), n)) + n
+    reader = threading.Thread(target=drain, args=(b, total))
+    reader.start()
+    start = time.perf_counter()
+    send(a, data, n)
+    reader.join()
+    elapsed = time.perf_counter() - start
+    a.close()
+    b.close()
+    return len(data) / MB / elapsed
+
+def measureChunking(chunk, data, n):
+    """times only producing the chunks, without any socket
+
+    Returns:
+        float: throughput in MB/s
+    """
+    start = time.perf_counter()
+    for _ in chunk(data, n):
+        pass
+    return len(data) / MB / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="chunking throughput before and after")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1024], help="payload sizes in MB")
+    parser.add_argument("--chunk", type=int, default=1024, help="protocol chunk size")
+    parser.add_argument("--legacy-max", type=int, default=8, help="largest payload in MB the legacy path is run on, it needs about 60 bytes of RAM per payload byte")
+    args = parser.parse_args()
+    print(f"{'size':>8} {'path':>8} {'chunk MB/s':>12} {'send MB/s':>12}")
+    for size in args.sizes:
+        data = os.urandom(size * MB)
+        if size <= args.legacy_max:
+            print(f"{size:>6}MB {'legacy':>8} {measureChunking(legacyChunker, data, args.chunk):>12.1f} {measure(legacySend, data, args.chunk):>12.1f}")
+        else:
+            print(f"{size:>6}MB {'legacy':>8} {'skipped':>12} {'skipped':>12}")
+        print(f"{size:>6}MB {'chunked':>8} {measureChunking(chunking.chunker, data, args.chunk):>12.1f} {measure(chunking.sendChunked, data, args.chunk):>12.1f}")
+        print(f"{size:>6}MB {'framed':>8} {'-':>12} {measure(framedSend, data, args.chunk, False):>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+import sys, os, time, argparse
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import codec
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+header codec benchmark, compares building and parsing headers through strings of
+1's and 0's, the way client and Server used to, against the struct based codec
+"""
+
+def bitstringToBytes(s):
+    """the _bitstring_to_bytes that used to live in both Server and client
+    """
+    return int(s.replace(" ", ""), 2).to_bytes((len(s) + 7) // 8, byteorder='big')
+
+def byteToBit(b):
+    """the _byteToBit that used to live in both Server and client
+    """
+    if isinstance(b, int):
+        b = b.to_bytes(1, 'big')
+    return format(int.from_bytes(b, byteorder=sys.byteorder), '#010b')[2:10]
+
+def bitNameLen(fn):
+    """the _getBitNameLen that used to live in both Server and client
+    """
+    out = "{0:b}".format(len(fn))
+    if len(out) < 5:
+        for _ in range(5-len(out)):
+            out = "0" + out
+    return out
+
+def legacyPackHeader(opcode, name, size):
+    """builds a put/get header the old way
+    """
+    return bitstringToBytes(opcode+bitNameLen(name)) + bytes(name, 'utf-8') + size.to_bytes(4, 'big')
+
+def legacyUnpackHeader(buf):
+    """parses a put/get header the old way
+    """
+    bits = byteToBit(buf[0])
+    fl = int(bits[3:8], 2)
+    return bits[0:3], buf[1:fl+1].decode('utf-8'), int.from_bytes(buf[fl+1:fl+5], "big")
+
+def legacyPackChange(opcode, name, newName):
+    """builds a change request the old way
+    """
+    r = bitstringToBytes(opcode+bitNameLen(name)) + bytes(name, 'utf-8')
+    return r + bitstringToBytes(bitNameLen(newName)) + bytes(newName, 'utf-8')
+
+def legacyUnpackChange(buf):
+    """parses a change request the old way
+    """
+    fl = int(byteToBit(buf[0])[3:8], 2)
+    fln = int(buf[fl+1])
+    return buf[1:fl+1].decode('utf-8'), buf[fl+2:fl+fln+2].decode('utf-8')
+
+def measure(fn, args, n):
+    """calls fn(*args) n times
+
+    Returns:
+        float: calls per second
+    """
+    start = time.perf_counter()
+    for _ in range(n):
+        fn(*args)
+    return n / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="header encode/decode rate before and after")
+    parser.add_argument("-n", type=int, default=200000, help="headers encoded and decoded per case")
+    args = parser.parse_args()
+    name, newName = "report-2021.txt", "report-final.txt"
+    cases = [
+        ("put/get", (legacyPackHeader, legacyUnpackHeader), (codec.packHeader, codec.unpackHeader), ("000", name, 123456789)),
+        ("change", (legacyPackChange, legacyUnpackChange), (codec.packChange, codec.unpackChange), ("010", name, newName)),
+    ]
+    print(f"{'header':>8} {'path':>8} {'encode/s':>12} {'decode/s':>12}")
+    for label, legacy, current, packArgs in cases:
+        for path, (pack, unpack) in [("legacy", legacy), ("codec", current)]:
+            header = pack(*packArgs)
+            assert header == legacy[0](*packArgs)
+            print(f"{label:>8} {path:>8} {measure(pack, packArgs, args.n):>12.0f} {measure(unpack, (header,), args.n):>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import sys, os, time, json, tempfile, threading, platform, subprocess, resource, argparse
+import multiprocessing
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import codec
+from common.loopback import freePort, waitListening
+from client import api
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+loopback benchmark, starts a Server on localhost and drives it with the client library to
+measure put/get throughput over a range of file sizes, request latency percentiles,
+throughput as the number of concurrent clients grows and the peak RSS of both ends. The
+results go out as JSON so runs on different commits can be compared
+
+The server runs in a child process, built from the Server class rather than the command
+line, so the two ends don't share a GIL and each has a peak RSS of its own
+"""
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+KB = 1024
+MB = 1024 * 1024
+
+def serve(mode, port, root, workers):
+    """runs the server until the process is terminated, client and server both have a
+    constants module so the server is only ever imported in the child
+
+    Args:
+        mode (str): "thread", "selector" or "async"
+        port (int): port to listen on
+        root (str): directory the server serves
+        workers (int): size of the worker pool
+    """
+    sys.path.insert(0, os.path.join(ROOT, "server"))
+    os.chdir(root)
+    if mode == "async":
+        import async_server
+        async_server.AsyncServer(port, workers=workers).operate()
+    else:
+        import server
+        server.Server(port, mode=mode, workers=workers).operate()
+
+def peakRss(pid=None):
+    """peak resident set size of this process, or of another one where /proc tells
+
+    Returns:
+        int: kilobytes, None if unknown
+    """
+    if pid is None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss // 1024 if sys.platform == "darwin" else rss
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def commit():
+    """commit the benchmark runs on
+
+    Returns:
+        str: commit hash, None outside a git checkout
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def makeFile(path, size):
+    """writes a file of size bytes of random data, one random block repeated
+    """
+    block = os.urandom(min(size, MB))
+    with open(path, 'wb') as file:
+        remaining = size
+        while remaining:
+            n = file.write(block[:remaining])
+            remaining -= n
+
+def percentiles(samples):
+    """summary of latency samples
+
+    Args:
+        samples (list[float]): seconds
+
+    Returns:
+        dict: mean, p50, p90, p99 and max in milliseconds
+    """
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))] * 1000
+    return {"n": len(s), "mean": sum(s) / len(s) * 1000, "p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": s[-1] * 1000}
+
+def timed(fn, *args):
+    """calls fn(*args)
+
+    Returns:
+        float: seconds it took
+    """
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+def benchThroughput(api, port, local, sizes, repeat):
+    """times put and get of one file of every size
+
+    Returns:
+        list[dict]: size, operation and MB/s of every repetition with their median and best
+    """
+    results = []
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        for sizeKB in sizes:
+            size = sizeKB * KB
+            name = f"tp{sizeKB}.bin"
+            path = os.path.join(local, name)
+            makeFile(path, size)
+            for op, run in [("put", lambda: ftp.put(path, name)), ("get", lambda: ftp.get(name, path))]:
+                rates = sorted(size / MB / timed(run) for _ in range(repeat))
+                results.append({"sizeKB": sizeKB, "op": op, "mbps": rates, "median": rates[len(rates) // 2], "best": rates[-1]})
+                print(f"{sizeKB:>10}KB {op:>4} {results[-1]['median']:>10.2f} MB/s", file=sys.stderr)
+            os.remove(path)
+    return results
+
+def benchLatency(api, port, local, n):
+    """times single small requests one after the other on one connection
+
+    Returns:
+        dict: percentiles of help, change and get of a 1 KB file
+    """
+    makeFile(os.path.join(local, "lat.bin"), KB)
+    samples = {"help": [], "change": [], "get": []}
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        ftp.put(os.path.join(local, "lat.bin"), "lat.bin")
+        ftp.put(os.path.join(local, "lat.bin"), "ren-a.bin")
+        def help():
+            with ftp.pool.connection() as conn:
+                conn.client.sendall(codec.packOp("011"))
+                header = conn.receiver.recvExact(1 + codec.SIZE.size)
+                conn.receiver.recvExact(codec.unpackSize(header, 1))
+        target = os.path.join(local, "lat.copy")
+        for i in range(n):
+            samples["help"].append(timed(help))
+            names = ("ren-a.bin", "ren-b.bin") if i % 2 == 0 else ("ren-b.bin", "ren-a.bin")
+            samples["change"].append(timed(ftp.rename, *names))
+            samples["get"].append(timed(ftp.get, "lat.bin", target))
+    results = {op: percentiles(s) for op, s in samples.items()}
+    for op, r in results.items():
+        print(f"{op:>8} p50 {r['p50']:.3f} ms p99 {r['p99']:.3f} ms", file=sys.stderr)
+    return results
+
+def benchConcurrency(api, port, local, maxClients, sizeKB, requests):
+    """runs 1, 2, 4 ... maxClients clients at once, each fetching the same file requests times
+    over its own connection of a shared pool
+
+    Returns:
+        list[dict]: number of clients, requests per second and MB/s
+    """
+    name = f"cc{sizeKB}.bin"
+    makeFile(os.path.join(local, name), sizeKB * KB)
+    counts = []
+    n = 1
+    while n < maxClients:
+        counts.append(n)
+        n *= 2
+    counts.append(maxClients)
+    results = []
+    for clients in counts:
+        with api.Client("localhost", port, poolSize=clients) as ftp:
+            ftp.put(os.path.join(local, name), name)
+            errors = []
+            def run(i):
+                try:
+                    for _ in range(requests):
+                        ftp.get(name, os.path.join(local, f"cc{i}.copy"))
+                except Exception as e:
+                    errors.append(e)
+            threads = [threading.Thread(target=run, args=(i,)) for i in range(clients)]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+            if errors:
+                raise errors[0]
+        total = clients * requests
+        results.append({"clients": clients, "requests": total, "seconds": elapsed,
+                        "rps": total / elapsed, "mbps": total * sizeKB * KB / MB / elapsed})
+        print(f"{clients:>4} clients {results[-1]['rps']:>10.0f} req/s {results[-1]['mbps']:>10.1f} MB/s", file=sys.stderr)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="loopback throughput, latency and concurrency of the server")
+    parser.add_argument("--mode", choices=["thread", "selector", "async"], default="thread", help="server mode")
+    parser.add_argument("--workers", type=int, default=32, help="server worker pool size")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 64, 1024, 16384, 262144], help="file sizes in KB for the throughput runs")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions of every throughput run")
+    parser.add_argument("--latency", type=int, default=500, help="requests of every kind for the latency percentiles")
+    parser.add_argument("--clients", type=int, default=16, help="largest number of concurrent clients")
+    parser.add_argument("--concurrency-size", type=int, default=64, help="file size in KB fetched by the concurrent clients")
+    parser.add_argument("--requests", type=int, default=200, help="gets per client in the concurrency runs")
+    parser.add_argument("--output", default="-", help="file to write the JSON results to, - for stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as served, tempfile.TemporaryDirectory() as local:
+        port = freePort()
+        proc = multiprocessing.Process(target=serve, args=(args.mode, port, served, args.workers), daemon=True)
+        proc.start()
+        try:
+            waitListening(port)
+            results = {
+                "meta": {"commit": commit(), "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"), "python": platform.python_version(),
+                         "platform": platform.platform(), "args": vars(args)},
+                "throughput": benchThroughput(api, port, local, args.sizes, args.repeat),
+                "latency": benchLatency(api, port, local, args.latency),
+                "concurrency": benchConcurrency(api, port, local, args.clients, args.concurrency_size, args.requests),
+            }
+            results["rss"] = {"clientKB": peakRss(), "serverKB": peakRss(proc.pid)}
+        finally:
+            proc.terminate()
+            proc.join()
+    out = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(out)
+    else:
+        with open(args.output, 'w') as file:
+            file.write(out + "\n")
+
+
+if __name__ == "__main__":
+    main()
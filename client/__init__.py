@@ -0,0 +1,9 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+client package
+
+The interactive client, the asyncio client and the library other python code uses, importable
+as a package next to the server: from FTPSocketPy.client.api import Client
+"""
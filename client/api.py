@@ -0,0 +1,365 @@
+import io, os, json, queue, threading
+from contextlib import contextmanager
+from . import constants
+from .client import client
+from common import codec, framing, progress
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+client library file
+
+Programmatic access to the server for other python code, without the interactive loop.
+Every call borrows a negotiated connection from a thread safe pool and gives it back once
+the response arrived, so a service moving many files pays for the TCP handshake and the
+version negotiation once per pooled connection instead of once per file.
+
+    from FTPSocketPy.client.api import Client
+    with Client("localhost", 32323) as ftp:
+        ftp.put("report.csv")
+        ftp.get("report.csv", "copy.csv")
+        with ftp.getStream("big.log") as stream:
+            for line in io.TextIOWrapper(stream):
+                ...
+"""
+
+
+class TransferError(Exception):
+    """the server refused a request or a transfer didn't complete
+    """
+
+
+class Pool:
+    def __init__(self, host, port, size=constants.POOL_SIZE, loglevel=0, progress=None, tune=None):
+        """connections to one server shared between threads, at most size of them are open
+        at once and callers wait for one to be given back beyond that
+
+        Args:
+            host (str): host's address
+            port (str): host's port
+            size (int, optional): largest number of connections. Defaults to constants.POOL_SIZE.
+            loglevel (int, optional): logging level. Defaults to 0.
+            progress (function, optional): progress callback of every connection. Defaults to None.
+            tune (tuning.Settings, optional): tuning of every connection. Defaults to None.
+        """
+        self.host = host
+        self.port = port
+        self.loglevel = loglevel
+        self.progress = progress
+        self.tune = tune
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """an idle connection, or a new one if none is idle
+
+        Returns:
+            client: connected and negotiated client
+        """
+        self.slots.acquire()
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            conn = client(self.host, self.port, self.loglevel, self.progress, self.tune)
+            conn.Errors = []
+            conn.connect()
+            return conn
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def release(self, conn, reusable=True):
+        """gives a connection back, connections left in the middle of a response are closed
+
+        Args:
+            conn (client): connection from acquire
+            reusable (bool, optional): whether the connection is between requests. Defaults to True.
+        """
+        if reusable:
+            self.idle.put(conn)
+        else:
+            conn.client.close()
+        self.slots.release()
+
+    @contextmanager
+    def connection(self):
+        """borrows a connection for the duration of a with block, it is closed instead of
+        given back if the block raises
+
+        Yields:
+            client: connected and negotiated client
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        except BaseException:
+            self.release(conn, False)
+            raise
+        self.release(conn)
+
+    def close(self):
+        """closes every idle connection
+        """
+        while True:
+            try:
+                self.idle.get_nowait().client.close()
+            except queue.Empty:
+                return
+
+
+class Download(io.RawIOBase):
+    def __init__(self, pool, conn, size):
+        """file-like reader over the contents of a get response, the connection goes back
+        to the pool once everything was read and is closed if the reader is closed earlier
+
+        Args:
+            pool (Pool): pool the connection was borrowed from
+            conn (client): connection the response arrives on
+            size (int): file size announced in the response header
+        """
+        self.pool = pool
+        self.conn = conn
+        self.size = size
+        self.remaining = size
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        """reads the next bytes of the file
+
+        Args:
+            b (bytearray/memoryview): buffer to fill
+
+        Returns:
+            int: number of bytes read, 0 at the end of the file
+        """
+        n = min(len(b), self.remaining, self.conn.chunkSize)
+        if not n:
+            return 0
+        try:
+            data = self.conn.receiver.recvExact(n)
+        except BaseException:
+            self.close()
+            raise
+        b[:n] = data
+        self.remaining -= n
+        return n
+
+    def close(self):
+        """gives the connection back to the pool
+        """
+        if self.conn is not None:
+            conn, self.conn = self.conn, None
+            self.pool.release(conn, not self.remaining)
+        super().close()
+
+
+class Client:
+    def __init__(self, host, port, poolSize=constants.POOL_SIZE, loglevel=0, progress=None, tune=None):
+        """ftp client for use from python code, safe to share between threads
+
+        Args:
+            host (str): host's address
+            port (str): host's port
+            poolSize (int, optional): largest number of connections open at once. Defaults to constants.POOL_SIZE.
+            loglevel (int, optional): logging level. Defaults to 0.
+            progress (function, optional): called with a progress.Report of every get and put,
+                a few times a second at most and from the thread running the transfer. Defaults to None.
+            tune (tuning.Settings, optional): chunk size, socket buffers and TCP options of the
+                pooled connections. Defaults to tuning.Settings().
+        """
+        self.pool = Pool(host, port, poolSize, loglevel, progress, tune)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """closes the idle connections of the pool
+        """
+        self.pool.close()
+
+    def get(self, name, target=None):
+        """downloads a file from the server
+
+        Args:
+            name (str): filename on the server
+            target (str, optional): local path to write to. Defaults to name.
+
+        Returns:
+            str: local path the file was written to
+        """
+        target = target or name
+        self._run(self._get, name, target)
+        return target
+
+    def put(self, path, name=None):
+        """uploads a local file to the server
+
+        Args:
+            path (str): local filename/path
+            name (str, optional): filename on the server. Defaults to the basename of path.
+        """
+        self._run(self._put, path, name or os.path.basename(path))
+
+    def rename(self, name, newName):
+        """renames a file on the server
+
+        Args:
+            name (str): current filename
+            newName (str): new filename
+        """
+        self._run(client._request, ["change", name, newName])
+
+    def stats(self, fmt="json"):
+        """fetches the server's metrics
+
+        Args:
+            fmt (str, optional): "json" for a dict or "prometheus" for the text format. Defaults to "json".
+
+        Returns:
+            dict/str: metrics
+        """
+        return self._run(self._stats, fmt)
+
+    def getStream(self, name):
+        """downloads a file as a stream instead of writing it to disk, the connection stays
+        borrowed until the stream is read to the end or closed
+
+        Args:
+            name (str): filename on the server
+
+        Returns:
+            Download: readable file-like object, usable as a context manager
+        """
+        conn = self.pool.acquire()
+        if conn.version < framing.VERSION_FRAMED:
+            self.pool.release(conn)
+            raise TransferError("streaming needs a server that speaks the framed protocol")
+        try:
+            conn.client.sendall(codec.packName("001", name))
+            operation, fl = conn._getOp(conn.receiver.peek(1))
+            if operation != "001":
+                conn.receiver.recvExact(1)
+                self.pool.release(conn)
+                raise TransferError(constants.ERROR_SERVER + operation)
+            wide = conn.version >= framing.VERSION_WIDE
+            _, _, size = codec.unpackHeader(conn.receiver.recvExact(codec.headerSize(fl, wide)), wide)
+        except TransferError:
+            raise
+        except BaseException:
+            self.pool.release(conn, False)
+            raise
+        return Download(self.pool, conn, size)
+
+    def putStream(self, file, name, size=None):
+        """uploads the contents of a readable file-like object
+
+        Args:
+            file (file): object with a read method, positioned at the data
+            name (str): filename on the server
+            size (int, optional): number of bytes to send. Defaults to the size of the
+                file behind file.fileno() from its current position on.
+        """
+        if size is None:
+            size = os.fstat(file.fileno()).st_size - file.tell()
+        self._run(self._putStream, file, name, size)
+
+    def _run(self, operation, *args):
+        """runs an operation on a borrowed connection and raises the errors it reported
+
+        Args:
+            operation (function): called with the connection followed by args
+
+        Returns:
+            object: whatever operation returned
+        """
+        with self.pool.connection() as conn:
+            result = operation(conn, *args)
+            errors, conn.Errors = conn.Errors, []
+        if errors:
+            raise TransferError("; ".join(errors))
+        return result
+
+    def _get(self, conn, name, target):
+        """sends a get request and writes the response to target
+
+        Args:
+            conn (client): borrowed connection
+            name (str): filename on the server
+            target (str): local path
+        """
+        conn.client.sendall(codec.packName("001", name))
+        conn._awaitResponse(target)
+
+    def _stats(self, conn, fmt):
+        """sends a stats request and reads the answer
+
+        Args:
+            conn (client): borrowed connection
+            fmt (str): "json" or "prometheus"
+
+        Returns:
+            dict/str: metrics, None if the server refused
+        """
+        conn.client.sendall(codec.packStats(fmt))
+        operation, sub = conn._getOp(conn.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            conn._awaitResponse()
+            return None
+        header = conn.receiver.recvExact(1+codec.SIZE.size)
+        body = conn.receiver.recvExact(codec.unpackSize(header, 1)).decode('utf-8')
+        return json.loads(body) if fmt == "json" else body
+
+    def _put(self, conn, path, name):
+        """sends a put request with the contents of a local file
+
+        Args:
+            conn (client): borrowed connection
+            path (str): local filename/path
+            name (str): filename on the server
+        """
+        if os.path.getsize(path) > codec.maxSize(conn.version >= framing.VERSION_WIDE):
+            conn.Errors.append(constants.ERROR_FILESIZE)
+            return
+        if conn.version >= framing.VERSION_FRAMED:
+            conn._streamPut(path, name)
+        else:
+            with open(path, 'rb') as file:
+                data = file.read()
+            conn._sendRequest(codec.packHeader("000", name, len(data)) + data, "000")
+        conn._awaitResponse()
+
+    def _putStream(self, conn, file, name, size):
+        """sends a put request with size bytes read from a file-like object
+
+        Args:
+            conn (client): borrowed connection
+            file (file): object with a read method
+            name (str): filename on the server
+            size (int): number of bytes to send
+        """
+        if size > codec.maxSize(conn.version >= framing.VERSION_WIDE):
+            conn.Errors.append(constants.ERROR_FILESIZE)
+            return
+        if conn.version < framing.VERSION_FRAMED:
+            data = file.read(size)
+            conn._sendRequest(codec.packHeader("000", name, len(data)) + data, "000")
+            conn._awaitResponse()
+            return
+        conn.client.sendall(codec.packHeader("000", name, size, conn.version >= framing.VERSION_WIDE))
+        remaining = size
+        with progress.track(conn.progress, f"sending {name}", size) as bar:
+            while remaining:
+                data = file.read(min(conn.chunkSize, remaining))
+                if not data:
+                    raise TransferError(f"{name} ended {remaining} bytes short of {size}")
+                conn.client.sendall(data)
+                remaining -= len(data)
+                bar.update(len(data))
+        conn._awaitResponse()
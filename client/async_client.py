@@ -0,0 +1,309 @@
+import asyncio, os, sys
+try:
+    from . import constants
+    from .client import client
+except ImportError:
+    # run as a script from the client directory
+    import constants
+    from client import client
+from common import chunking, codec, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+asyncio client script file
+"""
+
+class AsyncClient(client):
+    Traced = ["_request", "_streamPut", "_sendRequest", "_awaitResponse", "_recvFramed", "_recvFile"]
+    def __init__(self, host, port, loglevel=0, progress=None, tune=None):
+        """ftp client speaking the same protocol as client on top of asyncio streams
+
+        Args:
+            host (str): host's address
+            port (str): host's port
+            loglevel (int, optional): logging level. Defaults to 0.
+            progress (function, optional): called with a progress.Report of every file sent
+                or received. Defaults to None.
+            tune (tuning.Settings, optional): chunk size, socket buffers and TCP options.
+                Defaults to tuning.Settings().
+        """
+        super().__init__(host, port, loglevel, progress, tune)
+        self.reader = None
+        self.writer = None
+        self.BUFFER = []
+
+    async def connect(self):
+        """opens the connection to the server on the socket the client was tuned with
+        """
+        loop = asyncio.get_running_loop()
+        self.client.setblocking(False)
+        await loop.sock_connect(self.client, (self.host, self.port))
+        self.reader, self.writer = await asyncio.open_connection(sock=self.client)
+        self.logger.info("Successfully conencted to the server")
+        await self._negotiate()
+
+    async def _negotiate(self):
+        """offers the server the highest protocol version the client speaks, a legacy
+        server answers with the usual help text and the connection stays on the legacy framing
+        """
+        self.writer.write(codec.packOp("011", framing.VERSION))
+        await self.writer.drain()
+        response = await self.reader.readexactly(1)
+        operation, version = self._getOp(response)
+        if operation == "111":
+            self.version = version
+        else:
+            await self._recvFile(response)
+            self.BUFFER = []
+            self.version = framing.VERSION_LEGACY
+        self.logger.info(f"Using protocol version {self.version}")
+
+    async def close(self):
+        """closes the connection to the server
+        """
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    async def put(self, fileName):
+        """uploads a local file to the server
+
+        Args:
+            fileName (str): filename/path
+
+        Returns:
+            str: response code
+        """
+        return await self._request("put", fileName)
+
+    async def get(self, fileName):
+        """downloads a file from the server into the working directory
+
+        Args:
+            fileName (str): filename
+
+        Returns:
+            str: response code
+        """
+        return await self._request("get", fileName)
+
+    async def change(self, fileName, fileNameNew):
+        """renames a file on the server
+
+        Args:
+            fileName (str): current filename
+            fileNameNew (str): new filename
+
+        Returns:
+            str: response code
+        """
+        return await self._request("change", fileName, fileNameNew)
+
+    async def mget(self, *fileNames):
+        """downloads several files with a single batch request, servers that didn't
+        negotiate the framing get one get request per file
+
+        Args:
+            fileNames (str): filenames
+
+        Returns:
+            list[str]: response code of every file
+        """
+        if self.version < framing.VERSION_FRAMED:
+            return [await self.get(each) for each in fileNames]
+        self.writer.write(codec.packBatch(fileNames))
+        await self.writer.drain()
+        response = await self.reader.readexactly(1)
+        operation, sub = self._getOp(response)
+        if operation != codec.EXTENDED:
+            self.logger.warning(f"Server responded with error {operation}")
+            return [operation]
+        count = codec.unpackSize(await self.reader.readexactly(codec.SIZE.size))
+        return [await self._awaitResponse() for _ in range(count)]
+
+    async def pipeline(self, commands):
+        """sends several get/change requests back to back and then reads the responses
+        in order, servers that didn't negotiate the framing get one request at a time
+
+        Args:
+            commands (list[list[str]]): operation name followed by its filenames, for every request
+
+        Returns:
+            list[str]: response code of every request
+        """
+        for args in commands:
+            if args[0] not in ["get", "change"]:
+                raise ValueError(constants.ERROR_PIPELINE)
+        if self.version < framing.VERSION_FRAMED:
+            return [await self._request(*args) for args in commands]
+        loop = asyncio.get_running_loop()
+        self.BUFFER = []
+        for args in commands:
+            r, opcode = await loop.run_in_executor(None, self._createRequest, *args)
+            self.writer.write(r)
+        sender = asyncio.ensure_future(self.writer.drain())
+        results = [await self._awaitResponse() for _ in commands]
+        await sender
+        return results
+
+    async def help(self):
+        """asks the server for its list of commands
+
+        Returns:
+            str: help text sent by the server
+        """
+        await self._request("help")
+        return b''.join(self.BUFFER)[1:].rstrip(b'\x00').decode('utf-8')
+
+    async def _request(self, operation, fileName=None, fileNameNew=None):
+        """builds, sends and awaits the response of a single request, reading the file
+        to upload happens in the executor. On a framed connection uploads are streamed
+        with sendfile instead
+
+        Args:
+            operation (str): operation name
+            fileName (str, optional): filename. Defaults to None.
+            fileNameNew (str, optional): new filename. Defaults to None.
+
+        Returns:
+            str: response code
+        """
+        loop = asyncio.get_running_loop()
+        self.BUFFER = []
+        if operation == "put" and self.version >= framing.VERSION_FRAMED:
+            await self._streamPut(fileName)
+            return await self._awaitResponse()
+        r, opcode = await loop.run_in_executor(None, self._createRequest, operation, fileName, fileNameNew)
+        await self._sendRequest(r, opcode)
+        return await self._awaitResponse()
+
+    async def _streamPut(self, fileName):
+        """sends a put request without reading the file into memory, the header carries
+        the size and the contents follow with the event loop's sendfile
+
+        Args:
+            fileName (str): filename/path
+        """
+        loop = asyncio.get_running_loop()
+        with open(fileName, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            self.writer.write(codec.packHeader("000", fileName, size, self.version >= framing.VERSION_WIDE))
+            await self.writer.drain()
+            self.logger.info(f'Request is {size} bytes')
+            await loop.sendfile(self.writer.transport, file, 0, size)
+
+    async def _sendRequest(self, req, opcode):
+        """handles sending requests to the server after they're compiled
+
+        Args:
+            req (bytes): request to be sent
+            opcode (str): operation code
+        """
+        if opcode == "000":
+            self.logger.info(f'Request is {len(req)} bytes')
+            if self.version >= framing.VERSION_FRAMED:
+                self.writer.write(req)
+            else:
+                for chunk in chunking.chunker(req, self.ChunkSize):
+                    self.writer.write(chunk)
+                    await self.writer.drain()
+                self.writer.write(bytes(self.ChunkSize))
+        elif opcode in ["001", "010", "011"]:
+            self.writer.write(req)
+            self.logger.info('Request sent to server')
+        await self.writer.drain()
+
+    async def _awaitResponse(self):
+        """handles waiting and sorting out all the different server responses
+
+        Returns:
+            str: response code
+        """
+        response = await self.reader.readexactly(1)
+        operation, fl = self._getOp(response)
+        self.logger.debug(f"new response {operation} {fl}")
+        if operation in ["001", "110"] and self.version >= framing.VERSION_FRAMED:
+            await self._recvFramed(response, operation)
+        elif operation == "001":
+            await self._recvFile(response)
+            operation, fn, fs = codec.unpackHeader(self.BUFFER[0])
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._getFile, codec.headerSize(fl), fn)
+        elif operation == "110":
+            await self._recvFile(response)
+        elif operation != "000":
+            self.logger.warning(f"Server responded with error {operation}")
+        return operation
+
+    async def _recvFramed(self, fb, operation):
+        """receive a length prefixed response, a downloaded file is written through the
+        executor piece by piece as it arrives. It goes to a partial file that only replaces
+        the local file once complete, an interrupted download stays in it for reget to resume
+
+        Args:
+            fb (bytes): first byte of the response, already consumed from the stream
+            operation (str): response code
+        """
+        loop = asyncio.get_running_loop()
+        if operation == "110":
+            header = await self.reader.readexactly(codec.SIZE.size)
+            self.BUFFER = [fb + await self.reader.readexactly(codec.unpackSize(header))]
+            return
+        operation, fl = self._getOp(fb)
+        wide = self.version >= framing.VERSION_WIDE
+        self.BUFFER = [fb + await self.reader.readexactly(codec.headerSize(fl, wide)-1)]
+        operation, fn, remaining = codec.unpackHeader(self.BUFFER[0], wide)
+        part = f"{fn}{constants.PARTIAL_SUFFIX}"
+        file = await loop.run_in_executor(None, open, part, 'wb')
+        try:
+            while remaining:
+                data = await self.reader.read(min(constants.IO_BUFFER_SIZE, remaining))
+                if not data:
+                    raise ConnectionError("server disconnected mid transfer")
+                remaining -= len(data)
+                await loop.run_in_executor(None, file.write, data)
+        finally:
+            await loop.run_in_executor(None, file.close)
+        await loop.run_in_executor(None, os.replace, part, fn)
+
+    async def _recvFile(self, fb):
+        """receive a response in chunks until the empty end chunk arrives
+
+        Args:
+            fb (bytes): first byte of the response, already consumed from the stream
+        """
+        self.logger.info("Began receiving response.")
+        data = fb + await self.reader.readexactly(self.ChunkSize-1)
+        while data != bytes(self.ChunkSize):
+            self.BUFFER.append(data)
+            data = await self.reader.readexactly(self.ChunkSize)
+        self.logger.info("Finished receiving response.")
+
+
+async def main(host, port, commands, loglevel=0):
+    """runs a list of commands against the server, one connection per command
+    so independent transfers proceed concurrently
+
+    Args:
+        host (str): host's address
+        port (str): host's port
+        commands (list[list[str]]): commands in the same form the interactive client accepts
+        loglevel (int, optional): logging level. Defaults to 0.
+    """
+    async def run(args):
+        c = AsyncClient(host, port, loglevel)
+        await c.connect()
+        try:
+            if args[0] == "help":
+                print(await c.help())
+            else:
+                await getattr(c, args[0])(*args[1:])
+        finally:
+            await c.close()
+    await asyncio.gather(*(run(args) for args in commands))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        raise ValueError('Please provide server hostname, port and at least one command, e.g. "get file.txt".')
+    asyncio.run(main(sys.argv[1], sys.argv[2], [each.split(" ") for each in sys.argv[3:]]))
@@ -1,8 +1,13 @@
-import socket, os, sys, logging
+import socket, os, sys, logging, threading, time, json
 from typing import Union
-from itertools import zip_longest
-from tqdm import tqdm
-import constants;
+from concurrent.futures import ThreadPoolExecutor
+try:
+    from . import constants
+except ImportError:
+    # run as a script from the client directory
+    import constants
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import checksum, chunking, codec, compression, delta, framing, progress, store, tracing, tree, tuning
 
 """
 Name: Maxim Hermez
@@ -14,18 +19,44 @@ class client():
     ChunkSize = 1024
     Errors = []
     BUFFER = []
-    def __init__(self, host, port, loglevel=0):
+    # stages of a request timed when tracing is on
+    Traced = ["_request", "_createRequest", "_sendRequest", "_streamPut", "_awaitResponse", "_recvFile", "_getFile"]
+    def __init__(self, host, port, loglevel=0, progress=None, tune=None):
         """ftp client class
 
         Args:
             host (str): host's address
             port (str): host's port
             loglevel (int, optional): logging level. Defaults to 0.
+            progress (function, optional): called with a progress.Report of every file sent
+                or received, a few times a second at most. Defaults to None.
+            tune (tuning.Settings, optional): chunk size, socket buffers and TCP options to use
+                and offer the server. Defaults to tuning.Settings().
         """
         self.client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.tune = tune or tuning.Settings()
+        tuning.configure(self.client, self.tune.sndbuf, self.tune.rcvbuf, self.tune.nodelay)
+        self.chunkSize = self.tune.chunkSize
+        self.tuner = tuning.AutoTuner(self.chunkSize) if self.tune.auto else None
         self.host = host
         self.port = int(port)
         self.logger = self._getLogger(loglevel)
+        self.version = framing.VERSION_LEGACY
+        self.compression = None
+        self.checksum = None
+        self.dedup = False
+        self.progress = progress
+        self.receiver = framing.Receiver(self.client, self.chunkSize)
+        self._instrument()
+
+    def _instrument(self):
+        """times the stages of every request if the FTP_TRACE environment variable names
+        a trace file, nothing is wrapped otherwise
+        """
+        self.tracer = tracing.tracer()
+        if self.tracer is not None:
+            tracing.instrument(self, self.Traced, self.tracer, "client")
+            tracing.instrument(self.receiver, self.receiver.Traced, self.tracer, "recv")
     
     def _getLogger(self, loglevel=0):
         """handles initializing the right level of logging
@@ -61,21 +92,100 @@ class client():
         else:
             return False
 
-    def operate(self):
-        """Entry function for the user
+    def connect(self):
+        """opens the connection to the server and negotiates the protocol version
         """
         self.client.connect((self.host, self.port))
         self.logger.info("Successfully conencted to the server")
+        self._negotiate()
+        if self.version >= framing.VERSION_FRAMED and not self.tune.isDefault():
+            self._tune()
+
+    def operate(self):
+        """Entry function for the user
+        """
+        self.connect()
         while (True):
             self.BUFFER = []
             if self._checkErrors(): continue
             userIn = input("waiting for command\n")
+            if ";" in userIn:
+                self._pipeline([each.strip().split(" ") for each in userIn.split(";")])
+                continue
             args = userIn.split(" ")
-            if args[0] in ["get", "put"]:
+            if args[0] == "put" and self.dedup and self.version >= framing.VERSION_FRAMED:
+                if not self._validateArgs(args) or self._putByHash(args[1]): continue
+            if args[0] in ["get", "put"] and self.checksum and self.version >= framing.VERSION_FRAMED:
                 if not self._validateArgs(args): continue
-                r, opcode = self._createRequest(args[0], args[1])
-                self._sendRequest(r, opcode)
-                self._awaitResponse()
+                if args[0] == "get":
+                    self._checkedGet(args[1])
+                else:
+                    self._checkedPut(args[1])
+                continue
+            elif args[0] in ["get", "put"] and self.compression and self.version >= framing.VERSION_FRAMED:
+                if not self._validateArgs(args): continue
+                if args[0] == "get":
+                    self._compressedGet(args[1])
+                else:
+                    self._compressedPut(args[1])
+                continue
+            elif args[0] in ["get", "put"]:
+                if not self._validateArgs(args): continue
+                self._request(args)
+                continue
+            elif args[0] == "mget":
+                if not self._validateArgs(args): continue
+                self._batchGet(args[1:])
+                continue
+            elif args[0] == "compress":
+                if not self._validateArgs(args): continue
+                self.compression = None if args[1] == "off" else args[1]
+                continue
+            elif args[0] == "verify":
+                if not self._validateArgs(args): continue
+                self.checksum = None if args[1] == "off" else args[1]
+                continue
+            elif args[0] == "dedup":
+                if not self._validateArgs(args): continue
+                self.dedup = args[1] == "on"
+                continue
+            elif args[0] in ["tget", "tput"]:
+                if not self._validateArgs(args): continue
+                if args[0] == "tget":
+                    self._treeGet(args[1])
+                else:
+                    self._treePut(args[1])
+                continue
+            elif args[0] == "list":
+                if not self._validateArgs(args): continue
+                self._list(args[1] if len(args) > 1 else "")
+                continue
+            elif args[0] == "stats":
+                if not self._validateArgs(args): continue
+                self._stats(args[1] if len(args) > 1 else "json")
+                continue
+            elif args[0] == "tune":
+                if not self._validateArgs(args): continue
+                self._retune(*args[1:])
+                continue
+            elif args[0] == "dput":
+                if not self._validateArgs(args): continue
+                self._deltaPut(args[1])
+                continue
+            elif args[0] in ["reget", "reput"]:
+                if not self._validateArgs(args): continue
+                if args[0] == "reget":
+                    self._resumeGet(args[1])
+                else:
+                    self._resumePut(args[1])
+                continue
+            elif args[0] in ["pget", "pput"]:
+                if not self._validateArgs(args): continue
+                n = int(args[2]) if len(args) > 2 else constants.PARALLEL_CONNECTIONS
+                if args[0] == "pget":
+                    self._parallelGet(args[1], n)
+                else:
+                    self._parallelPut(args[1], n)
                 continue
             elif args[0] == "change":
                 if not self._validateArgs(args): continue
@@ -96,6 +206,79 @@ class client():
                 self.client.close()
                 break
 
+    def _negotiate(self):
+        """offers the server the highest protocol version the client speaks through a help
+        request, a legacy server answers it with the usual help text and the connection
+        stays on the legacy framing
+        """
+        self.client.sendall(codec.packOp("011", framing.VERSION))
+        response = self.receiver.peek(1)
+        operation, version = self._getOp(response)
+        if operation == "111":
+            self.receiver.recvExact(1)
+            self.version = version
+        else:
+            self._recvFile()
+            self.version = framing.VERSION_LEGACY
+        self.logger.info(f"Using protocol version {self.version}")
+
+    def _tune(self):
+        """offers the server the client's tuning with a tune request and switches to the
+        chunk size both agreed on, servers that don't know the request leave it as it is
+        """
+        self.client.sendall(codec.packTune(0 if self.tune.auto else self.tune.chunkSize, self.tune.sndbuf, self.tune.rcvbuf))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self.receiver.recvExact(1)
+            self.logger.info("Server doesn't support tuning")
+            return
+        chunkSize, sndbuf, rcvbuf = codec.unpackTuneReply(self.receiver.recvExact(codec.TUNE_REPLY.size))
+        if chunkSize:
+            self.tuner = None
+            self._resize(chunkSize)
+        else:
+            self._resize(self.tune.chunkSize)
+            self.tuner = tuning.AutoTuner(self.chunkSize)
+        self.logger.info(f"Tuned to {'auto from ' if self.tuner else ''}{self.chunkSize} byte chunks, server buffers {sndbuf}/{rcvbuf}")
+
+    def _retune(self, chunkSize, sndbuf="0", rcvbuf="0"):
+        """switches to new tuning from the user's input, agrees on it with the server and
+        prints the chunk size the connection ended up with
+
+        Args:
+            chunkSize (str): chunk size in kilobytes or "auto"
+            sndbuf (str, optional): send buffer in kilobytes, 0 for the system default. Defaults to "0".
+            rcvbuf (str, optional): receive buffer in kilobytes, 0 for the system default. Defaults to "0".
+        """
+        auto = chunkSize == "auto"
+        self.tune = tuning.Settings(tuning.DEFAULT_CHUNK if auto else int(chunkSize) << 10, int(sndbuf) << 10, int(rcvbuf) << 10, self.tune.nodelay, auto)
+        tuning.configure(self.client, self.tune.sndbuf, self.tune.rcvbuf, self.tune.nodelay)
+        if self.version >= framing.VERSION_FRAMED:
+            self._tune()
+        else:
+            self._resize(self.tune.chunkSize)
+            self.tuner = tuning.AutoTuner(self.chunkSize) if auto else None
+        print(f"Chunk size {self.chunkSize >> 10} KB{', tuned automatically' if self.tuner else ''}")
+
+    def _resize(self, chunkSize):
+        """changes the chunk size framed transfers are moved in
+
+        Args:
+            chunkSize (int): bytes read, written or sent at a time
+        """
+        self.chunkSize = chunkSize
+        self.receiver.bufferSize = chunkSize
+
+    def _observe(self, nbytes, seconds):
+        """lets the auto tuner, if any, learn from a finished transfer
+
+        Args:
+            nbytes (int): bytes transferred
+            seconds (float): time the transfer took
+        """
+        if self.tuner is not None:
+            self._resize(self.tuner.observe(nbytes, seconds))
+
     def _validateArgs(self, args):
         """validate that the arguments are correct in respect to the request called
 
@@ -105,27 +288,95 @@ class client():
         Returns:
             bool: validation passed
         """
-        if args[0] == "put":
+        if args[0] in ["put", "reput", "dput"]:
             if len(args) < 2:
                 self.Errors.append(constants.ERROR_ARG_PUT)
                 return False
             elif not os.path.isfile(args[1]):
                 self.Errors.append(constants.ERROR_ARG_FILE)
                 return False
+            elif os.path.getsize(args[1]) > codec.maxSize(self.version >= framing.VERSION_WIDE):
+                self.Errors.append(constants.ERROR_FILESIZE)
+                return False
+            else:
+                return self._validateNames(args[1:])
+        elif args[0] in ["get", "reget"]:
+            if len(args) != 2:
+                self.Errors.append(constants.ERROR_ARG)
+                return False
+            else:
+                return self._validateNames(args[1:])
+        elif args[0] in ["pget", "pput"]:
+            if len(args) not in [2, 3] or (len(args) == 3 and not args[2].isdigit()):
+                self.Errors.append(constants.ERROR_ARG)
+                return False
+            elif args[0] == "pput":
+                return self._validateArgs(["put", args[1]])
+            else:
+                return self._validateNames(args[1:2])
+        elif args[0] == "compress":
+            if len(args) != 2:
+                self.Errors.append(constants.ERROR_ARG)
+                return False
+            elif args[1] != "off" and args[1] not in compression.CODECS:
+                self.Errors.append(constants.ERROR_CODEC)
+                return False
             else:
                 return True
-        elif args[0] == "get":
+        elif args[0] == "verify":
             if len(args) != 2:
                 self.Errors.append(constants.ERROR_ARG)
                 return False
+            elif args[1] != "off" and args[1] not in checksum.ALGORITHMS:
+                self.Errors.append(constants.ERROR_ALGORITHM)
+                return False
+            else:
+                return True
+        elif args[0] == "tune":
+            if len(args) not in [2, 3, 4] or not (args[1] == "auto" or args[1].isdigit()) or not all(each.isdigit() for each in args[2:]):
+                self.Errors.append(constants.ERROR_ARG)
+                return False
+            else:
+                return True
+        elif args[0] == "dedup":
+            if len(args) != 2 or args[1] not in ["on", "off"]:
+                self.Errors.append(constants.ERROR_ARG)
+                return False
             else:
                 return True
+        elif args[0] in ["tget", "tput"]:
+            if len(args) != 2:
+                self.Errors.append(constants.ERROR_ARG)
+                return False
+            elif args[0] == "tput" and not os.path.isdir(args[1]):
+                self.Errors.append(constants.ERROR_ARG_DIR)
+                return False
+            else:
+                return self._validateNames(args[1:])
+        elif args[0] == "list":
+            if len(args) > 2:
+                self.Errors.append(constants.ERROR_ARG)
+                return False
+            else:
+                return self._validateNames(args[1:])
+        elif args[0] == "stats":
+            if len(args) > 2 or (len(args) == 2 and args[1] not in ["json", "prometheus"]):
+                self.Errors.append(constants.ERROR_ARG)
+                return False
+            else:
+                return True
+        elif args[0] == "mget":
+            if len(args) < 2:
+                self.Errors.append(constants.ERROR_ARG)
+                return False
+            else:
+                return self._validateNames(args[1:])
         elif args[0] == "change":
             if len(args) != 3:
                 self.Errors.append(constants.ERROR_ARG)
                 return False
             else:
-                return True
+                return self._validateNames(args[1:])
         elif args[0] == "help":
             if len(args) != 1:
                 self.Errors.append(constants.ERROR_ARG)
@@ -133,6 +384,533 @@ class client():
             else:
                 return True
         
+    def _validateNames(self, names):
+        """validate that every filename fits the 5 bit length field of the header
+
+        Args:
+            names (list[str]): filenames
+
+        Returns:
+            bool: validation passed
+        """
+        for each in names:
+            if len(each.encode('utf-8')) > codec.MAX_NAME:
+                self.Errors.append(constants.ERROR_FILENAME)
+                return False
+        return True
+
+    def _request(self, args):
+        """builds, sends and awaits the response of a single request
+
+        Args:
+            args (list[str]): validated user's input
+        """
+        if args[0] == "put" and self.version >= framing.VERSION_FRAMED:
+            self._streamPut(args[1])
+        else:
+            r, opcode = self._createRequest(*args)
+            self._sendRequest(r, opcode)
+        self._awaitResponse()
+
+    def _streamPut(self, fileName, name=None):
+        """sends a put request on a framed connection without reading the file into memory,
+        the header carries the size and the contents follow straight from the page cache
+
+        Args:
+            fileName (str): filename/path
+            name (str, optional): filename on the server. Defaults to fileName.
+        """
+        wide = self.version >= framing.VERSION_WIDE
+        with open(fileName, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            start = time.perf_counter()
+            with tuning.cork(self.client, self.tune.nodelay), progress.track(self.progress, f"sending {name or fileName}", size) as bar:
+                self.client.sendall(codec.packHeader("000", name or fileName, size, wide))
+                self.logger.info(f'Request is {size} bytes')
+                offset = 0
+                while offset < size:
+                    n = self.client.sendfile(file, offset, min(self.chunkSize << 4, size - offset))
+                    if not n:
+                        raise OSError(f"{fileName} shrank while being sent")
+                    offset += n
+                    bar.update(n)
+            self._observe(size, time.perf_counter() - start)
+
+    def _pipeline(self, commands):
+        """sends several get/change requests back to back and then reads the responses,
+        which the server sends in the order the requests arrived. The requests are sent
+        from a second thread so a long list can't fill the socket buffers both ways while
+        nobody reads. Servers that didn't negotiate the framing get one request at a time
+
+        Args:
+            commands (list[list[str]]): user's input for every request
+        """
+        for args in commands:
+            if args[0] not in ["get", "change"]:
+                self.Errors.append(constants.ERROR_PIPELINE)
+                return
+            if not self._validateArgs(args): return
+        if self.version < framing.VERSION_FRAMED:
+            for args in commands:
+                self._request(args)
+            return
+        requests = b''.join(self._createRequest(*args)[0] for args in commands)
+        sender = threading.Thread(target=self.client.sendall, args=(requests,))
+        sender.start()
+        self.logger.info(f'{len(commands)} requests pipelined')
+        for _ in commands:
+            self._awaitResponse()
+        sender.join()
+
+    def _batchGet(self, fileNames):
+        """fetches several files with one batch request, the server answers with a batch
+        header followed by an ordinary get response for every file. Servers that didn't
+        negotiate the framing get one get request per file
+
+        Args:
+            fileNames (list[str]): filenames
+        """
+        if self.version < framing.VERSION_FRAMED:
+            for each in fileNames:
+                self._request(["get", each])
+            return
+        self.client.sendall(codec.packBatch(fileNames))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return
+        header = self.receiver.recvExact(1+codec.SIZE.size)
+        for _ in range(codec.unpackSize(header, 1)):
+            self._awaitResponse()
+
+    def _parallelGet(self, fileName, n):
+        """downloads a file in ranges over up to n connections, an empty range is fetched
+        first to learn the file size. Every range is written at its offset in a partial
+        file, so they can arrive in any order, and the partial file only replaces the local
+        file once every range arrived. A partial file with holes can't be resumed, so it is
+        removed if any range fails
+
+        Args:
+            fileName (str): filename
+            n (int): largest number of connections
+        """
+        if self.version < framing.VERSION_FRAMED:
+            self._request(["get", fileName])
+            return
+        size = self._getRange(fileName, 0, 0)
+        if size is None:
+            return
+        part = f"{fileName}{constants.PARTIAL_SUFFIX}"
+        with open(part, 'wb') as file:
+            file.truncate(size)
+        ranges = chunking.ranges(size, n, constants.PARALLEL_MIN_RANGE)
+        try:
+            if len(ranges) == 1:
+                done = self._getRange(fileName, 0, size, part) is not None
+            else:
+                done = self._parallel(client._getRange, fileName, ranges, part)
+        except BaseException:
+            os.remove(part)
+            raise
+        if done:
+            os.replace(part, fileName)
+        else:
+            os.remove(part)
+
+    def _parallelPut(self, fileName, n):
+        """uploads a file in ranges over up to n connections, the server assembles them in a
+        partial file that replaces the old one once every range arrived
+
+        Args:
+            fileName (str): filename/path
+            n (int): largest number of connections
+        """
+        size = os.path.getsize(fileName)
+        ranges = chunking.ranges(size, n, constants.PARALLEL_MIN_RANGE)
+        if self.version < framing.VERSION_FRAMED or len(ranges) == 1:
+            self._request(["put", fileName])
+            return
+        self._parallel(client._putRange, fileName, ranges, size)
+
+    def _parallel(self, transfer, fileName, ranges, *args):
+        """runs transfer for every range at once, each on a new connection of its own
+
+        Args:
+            transfer (function): client method moving one range, returns None if it failed
+            fileName (str): filename
+            ranges (list[tuple(int,int)]): offset and length of every range
+            args: extra arguments passed to transfer
+
+        Returns:
+            bool: True if every range was transferred
+        """
+        def run(offset, length):
+            worker = client(self.host, self.port, tune=self.tune)
+            try:
+                worker.connect()
+                return transfer(worker, fileName, offset, length, *args)
+            except OSError as e:
+                self.logger.warning(f"Range at {offset} failed: {e}")
+                return None
+            finally:
+                worker.client.close()
+        self.logger.info(f'Transferring {fileName} in {len(ranges)} ranges')
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            results = list(pool.map(lambda r: run(*r), ranges))
+        if None in results:
+            self.Errors.append(constants.ERROR_RANGE)
+            return False
+        return True
+
+    def _resumeGet(self, fileName):
+        """resumes an interrupted download, the local partial file tells how much already
+        arrived and only the rest of the file is requested. The partial file replaces the
+        local file once it is complete
+
+        Args:
+            fileName (str): filename
+        """
+        if self.version < framing.VERSION_FRAMED:
+            self._request(["get", fileName])
+            return
+        part = f"{fileName}{constants.PARTIAL_SUFFIX}"
+        created = not os.path.exists(part)
+        open(part, 'ab').close()
+        have = os.path.getsize(part)
+        size = None
+        try:
+            size = self._getRange(fileName, have, codec.maxSize(self.version >= framing.VERSION_WIDE) - have, part)
+        finally:
+            if size is None and created and not os.path.getsize(part):
+                # refused or broken off before anything arrived, don't leave an empty partial file
+                os.remove(part)
+        if size is None:
+            return
+        if size < have:
+            # the file on the server changed since, start over
+            os.remove(part)
+            self._resumeGet(fileName)
+            return
+        self.logger.info(f'Resumed {fileName} at {have} of {size} bytes')
+        if os.path.getsize(part) == size:
+            os.replace(part, fileName)
+
+    def _resumePut(self, fileName):
+        """resumes an interrupted upload, the server is asked how much of it was kept and
+        only the rest of the file is sent, straight from the page cache with sendfile
+
+        Args:
+            fileName (str): filename/path
+        """
+        if self.version < framing.VERSION_FRAMED:
+            self._request(["put", fileName])
+            return
+        wide = self.version >= framing.VERSION_WIDE
+        size = os.path.getsize(fileName)
+        self.client.sendall(codec.packQuery(fileName))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return
+        have = codec.unpackSize(self.receiver.recvExact(1+codec.sizeLength(wide)), 1, wide)
+        if have > size:
+            have = 0
+        self.logger.info(f'Resuming {fileName} at {have} of {size} bytes')
+        self.client.sendall(codec.packRange(codec.EXT_RESUME_PUT, fileName, have, size - have, size, wide))
+        if size > have:
+            with open(fileName, 'rb') as file:
+                self.client.sendfile(file, have, size - have)
+        self._awaitResponse()
+
+    def _compressedGet(self, fileName):
+        """downloads a file offering the server a compressed transfer, the server may still
+        answer with an ordinary get response. Compressed blocks are decompressed and written
+        one at a time
+
+        Args:
+            fileName (str): filename
+        """
+        wide = self.version >= framing.VERSION_WIDE
+        self.client.sendall(codec.packCompressed(codec.EXT_COMPRESSED_GET, self.compression, fileName, wide=wide))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return
+        codecName, size = codec.unpackCompressedReply(self.receiver.recvMessage(codec.compressedReplySize, wide), wide)
+        part = f"{fileName}{constants.PARTIAL_SUFFIX}"
+        with open(part, 'wb') as file:
+            written = compression.recvFile(self.receiver, file, codecName, size, self.chunkSize)
+        if written != size:
+            raise ValueError(f"decompressed {written} bytes, the server announced {size}")
+        os.replace(part, fileName)
+        self.logger.info(f'Received {fileName} compressed with {codecName}')
+
+    def _compressedPut(self, fileName):
+        """uploads a file offering the server a compressed transfer, unless a sample of the
+        file shows it doesn't compress. The file goes as it is if the server doesn't accept
+        the codec
+
+        Args:
+            fileName (str): filename/path
+        """
+        wide = self.version >= framing.VERSION_WIDE
+        size = os.path.getsize(fileName)
+        with open(fileName, 'rb') as file:
+            if not compression.worthCompressing(compression.readSample(file)):
+                self._request(["put", fileName])
+                return
+            self.client.sendall(codec.packCompressed(codec.EXT_COMPRESSED_PUT, self.compression, fileName, size, wide))
+            codecName, _ = codec.unpackCompressedReply(self.receiver.recvMessage(codec.compressedReplySize, wide), wide)
+            if codecName:
+                sent = compression.sendFile(self.client, file, size, codecName, self.chunkSize)
+                self.logger.info(f'Sent {size} bytes compressed to {sent} with {codecName}')
+            elif size:
+                self.client.sendfile(file, 0, size)
+        self._awaitResponse()
+
+    def _checkedGet(self, fileName):
+        """downloads a file asking the server to follow it with its digest, every block is
+        added to the digest as it is written. A file that doesn't match is thrown away, servers
+        that don't know the algorithm answer with an ordinary get response
+
+        Args:
+            fileName (str): filename
+        """
+        wide = self.version >= framing.VERSION_WIDE
+        self.client.sendall(codec.packChecked(codec.EXT_CHECKED_GET, self.checksum, fileName, wide=wide))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return
+        algorithm, size = codec.unpackCheckedReply(self.receiver.recvMessage(codec.checkedReplySize, wide), wide)
+        part = f"{fileName}{constants.PARTIAL_SUFFIX}"
+        with open(part, 'wb') as file:
+            matched = checksum.recvFile(self.receiver, file, size, algorithm, self.chunkSize)
+        if not matched:
+            os.remove(part)
+            self.Errors.append(constants.ERROR_CHECKSUM)
+            return
+        os.replace(part, fileName)
+        self.logger.info(f'Received {fileName} checked with {algorithm}')
+
+    def _checkedPut(self, fileName):
+        """uploads a file followed by its digest, every block is added to the digest between
+        reading and sending it. The file goes without a trailer if the server doesn't accept
+        the algorithm
+
+        Args:
+            fileName (str): filename/path
+        """
+        wide = self.version >= framing.VERSION_WIDE
+        size = os.path.getsize(fileName)
+        self.client.sendall(codec.packChecked(codec.EXT_CHECKED_PUT, self.checksum, fileName, size, wide))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return
+        algorithm, _ = codec.unpackCheckedReply(self.receiver.recvMessage(codec.checkedReplySize, wide), wide)
+        with open(fileName, 'rb') as file:
+            if algorithm:
+                checksum.sendFile(self.client, file, size, algorithm, self.chunkSize)
+            elif size:
+                self.client.sendfile(file, 0, size)
+        self._awaitResponse()
+
+    def _deltaPut(self, fileName):
+        """uploads only what changed in a file the server already has a copy of, the server
+        sends the signatures of its blocks and the client answers with the blocks to keep and
+        the bytes in between. Files the server doesn't have go through an ordinary put
+
+        Args:
+            fileName (str): filename/path
+        """
+        if self.version < framing.VERSION_FRAMED:
+            self._request(["put", fileName])
+            return
+        self.client.sendall(codec.packSignature(fileName))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self.receiver.recvExact(1)
+            self._request(["put", fileName])
+            return
+        wide = self.version >= framing.VERSION_WIDE
+        n, baseSize, count = codec.unpackSignatureReply(self.receiver.recvExact(codec.signatureReplySize(wide)), wide)
+        blocks = delta.table(self.receiver.recvExact(count * delta.SIGNATURE.size))
+        size = os.path.getsize(fileName)
+        self.client.sendall(codec.packDelta(fileName, n, baseSize, size, wide))
+        with open(fileName, 'rb') as file:
+            literal, copied = delta.sendFile(self.client, file, n, blocks, self.chunkSize)
+        self.logger.info(f'Sent {literal} of {size} bytes, {copied} were kept from the server copy')
+        self._awaitResponse()
+
+    def _treePut(self, root):
+        """uploads a directory tree as one stream of entries, the server only answers once
+        the whole tree arrived so small files don't each wait for a response
+
+        Args:
+            root (str): directory
+        """
+        if self.version < framing.VERSION_FRAMED:
+            self.Errors.append(constants.ERROR_TREE)
+            return
+        with tuning.cork(self.client, self.tune.nodelay):
+            self.client.sendall(codec.packTree(codec.EXT_TREE_PUT, root))
+            sent = tree.sendTree(self.client, root, self.chunkSize)
+        self.logger.info(f'Sent {sent} bytes of {root}')
+        self._awaitResponse()
+
+    def _treeGet(self, root):
+        """downloads a directory tree sent as one stream of entries, files are written as
+        their entries arrive
+
+        Args:
+            root (str): directory
+        """
+        if self.version < framing.VERSION_FRAMED:
+            self.Errors.append(constants.ERROR_TREE)
+            return
+        self.client.sendall(codec.packTree(codec.EXT_TREE_GET, root))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return
+        self.receiver.recvExact(1)
+        files = tree.recvTree(self.receiver, root, lambda path: f"{path}{constants.PARTIAL_SUFFIX}", os.replace, self.chunkSize)
+        self.logger.info(f'Received {files} files into {root}')
+
+    def _list(self, path):
+        """prints the entries of a directory on the server, or the entry of a single file.
+        The first page tells how many entries there are, the requests for the other pages
+        are then sent back to back
+
+        Args:
+            path (str): directory or file, empty for the directory the server runs in
+        """
+        if self.version < framing.VERSION_FRAMED:
+            self.Errors.append(constants.ERROR_LIST)
+            return
+        self.client.sendall(codec.packList(path, 0, constants.LIST_PAGE))
+        page = self._recvList()
+        if page is None:
+            return
+        total, entries = page
+        offsets = range(constants.LIST_PAGE, total, constants.LIST_PAGE)
+        requests = b''.join(codec.packList(path, offset, constants.LIST_PAGE) for offset in offsets)
+        sender = threading.Thread(target=self.client.sendall, args=(requests,))
+        sender.start()
+        self._printEntries(entries)
+        for _ in offsets:
+            page = self._recvList()
+            if page is not None:
+                self._printEntries(page[1])
+        sender.join()
+
+    def _recvList(self):
+        """receives the answer to a list request
+
+        Returns:
+            tuple(int,list): number of entries and the entries on the page, None if the server
+                answered with an error
+        """
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return None
+        header = self.receiver.recvExact(1+codec.SIZE.size)
+        return codec.unpackListReply(self.receiver.recvExact(codec.unpackSize(header, 1)))
+
+    def _stats(self, fmt):
+        """prints the server's metrics
+
+        Args:
+            fmt (str): "json" or "prometheus"
+        """
+        if self.version < framing.VERSION_FRAMED:
+            self.Errors.append(constants.ERROR_STATS)
+            return
+        self.client.sendall(codec.packStats(fmt))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return
+        header = self.receiver.recvExact(1+codec.SIZE.size)
+        body = self.receiver.recvExact(codec.unpackSize(header, 1)).decode('utf-8')
+        print(json.dumps(json.loads(body), indent=2) if fmt == "json" else body)
+
+    def _printEntries(self, entries):
+        """prints listed entries, one per line
+
+        Args:
+            entries (list[tuple(str,int,int,int)]): name, kind, size and mtime of every entry
+        """
+        for name, kind, size, mtime in entries:
+            stamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime / 1e9))
+            print(f"{'d' if kind else '-'} {size:>12} {stamp} {name}")
+
+    def _putByHash(self, fileName):
+        """asks the server whether it already holds the contents of a file, if it does the
+        server stores the file as a reference to them and nothing has to be uploaded
+
+        Args:
+            fileName (str): filename/path
+
+        Returns:
+            bool: True if the server stored the file without it being sent
+        """
+        with open(fileName, 'rb') as file:
+            digest = store.digestFile(file, constants.IO_BUFFER_SIZE)
+            size = os.fstat(file.fileno()).st_size
+        self.client.sendall(codec.packHave(fileName, digest, size, self.version >= framing.VERSION_WIDE))
+        operation, fl = self._getOp(self.receiver.recvExact(1))
+        if operation == "000":
+            self.logger.info(f'Server already holds {fileName}, nothing sent')
+        return operation == "000"
+
+    def _getRange(self, fileName, offset, length, target=None):
+        """downloads one range of a file and writes it at the same offset in a local file,
+        which has to exist already unless the range is empty
+
+        Args:
+            fileName (str): filename
+            offset (int): position of the range in the file
+            length (int): length of the range, cut short at the end of the file
+            target (str, optional): local file written to. Defaults to fileName.
+
+        Returns:
+            int: size of the whole file, None if the server answered with an error
+        """
+        wide = self.version >= framing.VERSION_WIDE
+        self.client.sendall(codec.packRange(codec.EXT_RANGE_GET, fileName, offset, length, wide=wide))
+        operation, sub = self._getOp(self.receiver.peek(1))
+        if operation != codec.EXTENDED:
+            self._awaitResponse()
+            return None
+        size, length = codec.unpackRangeReply(self.receiver.recvExact(codec.rangeReplySize(wide)), wide)
+        if length:
+            with open(target or fileName, 'r+b') as file:
+                file.seek(offset)
+                self.receiver.recvToFile(file, length, self.chunkSize)
+        return size
+
+    def _putRange(self, fileName, offset, length, size):
+        """uploads one range of a local file straight from the page cache with sendfile
+
+        Args:
+            fileName (str): filename/path
+            offset (int): position of the range in the file
+            length (int): length of the range
+            size (int): size of the whole file
+
+        Returns:
+            bool: True once the server stored the range, None if it answered with an error
+        """
+        with open(fileName, 'rb') as file, tuning.cork(self.client, self.tune.nodelay):
+            self.client.sendall(codec.packRange(codec.EXT_RANGE_PUT, fileName, offset, length, size, self.version >= framing.VERSION_WIDE))
+            self.client.sendfile(file, offset, length)
+        operation, fl = self._getOp(self.receiver.peek(1))
+        self._awaitResponse()
+        return True if operation == "000" else None
+
     def _sendRequest(self, req, opcode):
         """handles sending requests to the server after they're compiled
 
@@ -141,12 +919,19 @@ class client():
             opcode (str): operation code
         """
         if opcode == "000":
-            chunks = self._chunker(req, self.ChunkSize)
-            n = len(chunks)
-            self.logger.info(f'File is chunked into {n}')
-            for i in tqdm(range(n), desc="sending file"):
-                self.client.send(chunks[i])
-            self.client.send(bytes(self.ChunkSize))
+            n = len(req)
+            self.logger.info(f'Request is {n} bytes')
+            if self.version >= framing.VERSION_FRAMED:
+                pieces = chunking.slices(req, self.chunkSize)
+            else:
+                n += len(chunking.padding(n, self.ChunkSize))
+                pieces = chunking.chunker(req, self.ChunkSize)
+            with progress.track(self.progress, "sending file", n) as bar:
+                for view in pieces:
+                    self.client.sendall(view)
+                    bar.update(len(view))
+            if self.version < framing.VERSION_FRAMED:
+                self.client.sendall(bytes(self.ChunkSize))
         elif opcode in ["001", "010", "011"]:
             self.client.send(req)
             self.logger.info('Request sent to server')
@@ -165,95 +950,24 @@ class client():
         """
         if operation == "put":
             opcode = "000"
-            FL = self._getBitNameLen(fileName)
-            byteName = bytes(fileName, 'utf-8')
-            fileSize = self._getByteFileSize(fileName)
             fileData = self._getByteFile(fileName)
-            r = self._bitstring_to_bytes(opcode+FL)
-            r += byteName+fileSize+fileData
+            r = codec.packHeader(opcode, fileName, len(fileData), self.version >= framing.VERSION_WIDE)
+            r += fileData
             return r, opcode
         if operation == "get":
             opcode = "001"
-            FL = self._getBitNameLen(fileName)
-            byteName = bytes(fileName, 'utf-8')
-            r = self._bitstring_to_bytes(opcode+FL)
-            r += byteName
+            r = codec.packName(opcode, fileName)
             return r, opcode
         if operation == "change":
             opcode = "010"
-            FL = self._getBitNameLen(fileName)
-            byteName = bytes(fileName, 'utf-8')
-            FLN = self._getBitNameLen(fileNameNew)
-            byteNewName = bytes(fileNameNew, 'utf-8')
-            r = self._bitstring_to_bytes(opcode+FL)
-            r += byteName
-            r += self._bitstring_to_bytes(FLN)
-            r += byteNewName
+            r = codec.packChange(opcode, fileName, fileNameNew)
             return r, opcode
         if operation == "help":
             opcode = "011"
-            r = self._bitstring_to_bytes(opcode+"00000")
+            r = codec.packOp(opcode)
             return r, opcode
             
-    def _chunker(self, iterable, n, fillvalue =b'\x00'):
-        """handles chunking any bytes string into n equal chunks, if the last chunk
-        is not of size n it will be padded with the fillvalue
-
-        Args:
-            iterable (bytes): bytes string to chunk
-            n (int): chunk size
-            fillvalue (bytes, optional): padding fill value. Defaults to b'\x00'.
-
-        Returns:
-            list(bytes): list of the bytes chunks
-        """
-        args = [iter(iterable)] * n
-        ans = list(zip_longest(fillvalue=fillvalue, *args))
-        fin = []
-        for sub in ans:
-            chunk = b''
-            for each in sub:
-                if isinstance(each, bytes): chunk += each
-                else: chunk += int(each).to_bytes(1, 'big')
-            fin.append(chunk)
-        return fin
     
-    def _getBitNameLen(self, fn):
-        """get the length of the string in binary
-
-        Args:
-            fn (str): filename
-
-        Returns:
-            str/bool: binary string if successful or False if error occured
-        """
-        out = "{0:b}".format(len(fn))
-        if len(out) < 5:
-            for _ in range(5-len(out)):
-                out = "0" + out
-            return out
-        elif len(out) > 5:
-            self.Error.append(constants.ERROR_FILENAME)
-            return False
-        else: 
-            return out
-
-    def _getByteFileSize(self, fn):
-        """get a file's size in a bytes object
-
-        Args:
-            fn (str): filename/path
-
-        Returns:
-            bytes/bool: size of the file if successful or False if error occured
-        """
-        fs = os.path.getsize(fn)
-        if fs > 2**32:
-            self.Error.append(constants.ERROR_FILESIZE)
-            return False
-        else: 
-            return fs.to_bytes(4, 'big')
-
     def _getByteFile(self, fn):
         """read a file as binary
 
@@ -267,62 +981,51 @@ class client():
             data = file.read()
             return data
     
-    def _bitstring_to_bytes(self, s):
-        """converts a string of 1's and 0's to its bytes object
+    def _awaitResponse(self, target=None):
+        """handles waiting and sorting out all the different server responses
 
         Args:
-            s (str): binary data
-
-        Returns:
-            bytes: output
+            target (str, optional): local path a received file is written to. Defaults to
+                the filename in the response header.
         """
-        return int(s.replace(" ", ""), 2).to_bytes((len(s) + 7) // 8, byteorder='big')
-
-    def _awaitResponse(self):
-        """handles waiting and sorting out all the different server responses
-        """
-        response = self.client.recv(1, socket.MSG_PEEK)
-        if response == (0).to_bytes(1, 'big'): # success response
-            response = self.client.recv(1)
-            self.logger.debug(f"new response receiver{self._byteToBit(response)}")
+        response = self.receiver.peek(1)
+        operation, fl = self._getOp(response)
+        self.logger.debug(f"new response {operation} {fl}")
+        if operation == "000": # success response
+            self.receiver.recvExact(1)
+            return
+        if operation == "001" and self.version >= framing.VERSION_FRAMED:
+            wide = self.version >= framing.VERSION_WIDE
+            self.BUFFER = [self.receiver.recvExact(codec.headerSize(fl, wide))]
+            operation, fn, fs = codec.unpackHeader(self.BUFFER[0], wide)
+            fn = target or fn
+            # an interrupted download stays in the partial file for reget to resume
+            part = f"{fn}{constants.PARTIAL_SUFFIX}"
+            start = time.perf_counter()
+            with open(part, 'wb') as file, progress.track(self.progress, f"receiving {fn}", fs) as bar:
+                self.receiver.recvToFile(file, fs, self.chunkSize, bar)
+            self._observe(fs, time.perf_counter() - start)
+            os.replace(part, fn)
             return
-        operation = self._byteToBit(response)[0:3]
-        self.logger.debug(f"new response receiver{self._byteToBit(response)}")
         if operation == "001":
             self._recvFile()
-            operation, fl = self._getOp()
-            fn = self._getFileName(fl)
-            fs = self._getFileSize(fl)
-            self._getFile(fl+5, fn)
+            operation, fn, fs = codec.unpackHeader(self.BUFFER[0])
+            self._getFile(codec.headerSize(fl), target or fn)
+            return
+        if operation == "110" and self.version >= framing.VERSION_FRAMED:
+            header = self.receiver.recvExact(1+codec.SIZE.size)
+            print(self.receiver.recvExact(codec.unpackSize(header, 1)).decode('utf-8'))
             return
         if operation == "110":
-            operation, fl = self._getOp(response)
             self._recvFile()
             print(self.BUFFER[0][1:].decode('utf-8'))
             return
+        self.receiver.recvExact(1)
+        if operation == "100":
+            self.Errors.append(constants.ERROR_CHECKSUM)
+            return
+        self.Errors.append(constants.ERROR_SERVER + operation)
 
-    def _getFileName(self, fl):
-        """handles getting the string filename from the request in the buffer
-
-        Args:
-            fl (int): filename length
-
-        Returns:
-            str: filename
-        """
-        return self.BUFFER[0][1:fl+1].decode('utf-8')
-    
-    def _getFileSize(self, fl):
-        """retrieve the file size from a request in the buffer
-
-        Args:
-            fl (int): filename length
-
-        Returns:
-            int: file size in bytes
-        """
-        return int.from_bytes(self.BUFFER[0][fl+1:fl+5], "big")
-    
     def _recvFile(self):
         """recieve a file from the server, handles chunking and adding to the buffer
         """
@@ -330,7 +1033,7 @@ class client():
         finalChunk = False
         self.BUFFER = []
         while not finalChunk:
-            data = self.client.recv(self.ChunkSize)
+            data = self.receiver.recvExact(self.ChunkSize)
             if data == bytes(self.ChunkSize):
                 self.logger.info("Finished receiving response.")
                 finalChunk = True
@@ -351,35 +1054,19 @@ class client():
         file.close()
 
     def _getOp(self, firstByte=None):
-        """gets a tuple of two strings representing in binary the operation code
-        and the filename length. The byte is retrieved from the buffer if no arguments
-        are supplied
+        """gets a tuple of the operation code and the filename length. The byte is
+        retrieved from the buffer if no arguments are supplied
 
         Args:
             firstByte (bytes, optional): alternative byte to read. Defaults to None.
 
         Returns:
-            tuple(str,str): extracted bits tuple
+            tuple(str,int): operation code and filename length
         """
         if firstByte == None:
-            firstByte = self._byteToBit(self.BUFFER[0][0])
-        else:
-            firstByte = self._byteToBit(firstByte)
-        return (firstByte[0:3],int(firstByte[3:8], 2))
+            firstByte = self.BUFFER[0]
+        return codec.unpackOp(firstByte)
     
-    def _byteToBit(self, b):
-        """convert a bytes string to a string of 1's and 0's
-
-        Args:
-            b (bytes): bytes to convert
-
-        Returns:
-            str: binary string
-        """
-        if isinstance(b, int):
-            b = b.to_bytes(1, 'big')
-        return format(int.from_bytes(b, byteorder=sys.byteorder), '#010b')[2:10]
-
     def _createDetails(self):
         """create the local details info
 
@@ -392,11 +1079,12 @@ class client():
         h += "When launching the script, you can add a 1 at the end to enable debug log printing, or you can add a 2 to save the logs to a file in the local dir"
         return h
 
-if len(sys.argv) < 3:
-    print(sys.argv)
-    raise ValueError('Please provide server hostname and port.')
-if sys.argv[3]:
-    c = client(sys.argv[1], sys.argv[2], sys.argv[3])
-else:
-    c = client(sys.argv[1], sys.argv[2])
-c.operate()
\ No newline at end of file
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print(sys.argv)
+        raise ValueError('Please provide server hostname and port.')
+    if len(sys.argv) > 3:
+        c = client(sys.argv[1], sys.argv[2], int(sys.argv[3]), progress.TqdmProgress())
+    else:
+        c = client(sys.argv[1], sys.argv[2], progress=progress.TqdmProgress())
+    c.operate()
\ No newline at end of file
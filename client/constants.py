@@ -8,10 +8,42 @@ HPUT = "<put filename>This command instructs the client to send a put request to
 HGET = "<get filename>This command instructs the client to send a get request to the server in order to retrieve a file from the server machine to the client machine. \n Example: get file.txt"
 HCHANGE = "<change OldFileName NewFileName>This command instructs the client to send a change request to the server to rename a file at the server machine."
 HHELP = "<help>This command instructs the client to send a help request to the server to get a list of the commands that the server support. \n Example: help"
+HMGET = "<mget filename filename ...>This command instructs the client to fetch several files from the server with a single batch request. \n Example: mget a.txt b.txt"
+HPIPELINE = "<command; command; ...>get and change commands separated by ; are sent back to back without waiting for each response. \n Example: get a.txt; get b.txt"
+HPGET = "<pget filename [connections]>This command instructs the client to download a large file in ranges over several connections at once. \n Example: pget big.iso 8"
+HPPUT = "<pput filename [connections]>This command instructs the client to upload a large file in ranges over several connections at once. \n Example: pput big.iso 8"
+HREGET = "<reget filename>This command instructs the client to resume an interrupted download, only the part of the file still missing is fetched. \n Example: reget big.iso"
+HREPUT = "<reput filename>This command instructs the client to resume an interrupted upload, the server is asked how much it kept and only the rest is sent. \n Example: reput big.iso"
+HDPUT = "<dput filename>This command instructs the client to upload only the parts of a file that changed since the copy the server has, files the server doesn't have are sent whole. \n Example: dput build.tar"
+HTPUT = "<tput directory>This command instructs the client to upload a whole directory tree as one stream. \n Example: tput logs"
+HTGET = "<tget directory>This command instructs the client to download a whole directory tree as one stream. \n Example: tget logs"
+HLIST = "<list [path]>This command instructs the client to list the names, sizes and modification times of the files in a directory on the server, or of a single file. \n Example: list logs"
+HCOMPRESS = "<compress zlib|lzma|off>This command makes get and put offer the server a compressed transfer, files that don't compress well are still sent as they are. \n Example: compress zlib"
+HDEDUP = "<dedup on|off>This command makes put first ask the server whether it already holds a file with the same contents, the file is only sent if it doesn't. \n Example: dedup on"
+HVERIFY = "<verify crc32|blake2b|off>This command makes get and put send a digest of the file after its contents, a transfer that arrives corrupted or cut short is thrown away instead of written. \n Example: verify crc32"
+HTUNE = "<tune chunkKB|auto [sndbufKB] [rcvbufKB]>This command sets the size of the pieces framed transfers are moved in, or lets the client grow it while transfers get faster, and optionally the socket buffer sizes. The server is asked to use the same, chunks are kept between 16 and 4096 KB and the size in use is printed. \n Example: tune 256 4096 4096"
+HSTATS = "<stats [json|prometheus]>This command instructs the client to fetch the server's metrics: requests per operation, bytes moved, request latencies, open connections and errors. \n Example: stats prometheus"
 HBYE = "<bye>This command instructs the client to break the connection with the server and exit."
 ERROR_FILENAME = "Your file name is too long, it has to be 31 characters or less."
 ERROR_FILESIZE = "Your file size is too big."
+ERROR_ARG_PUT = "Please provide the name of the file to upload, if you're lost type (help) to see the list of instructions"
 ERROR_ARG_FILE = "Could not find the specified file. Check for typos and make sure you open the terminal from the scripts directory."
+ERROR_SERVER = "The server could not process the request, error code "
+ERROR_CODEC = "Unknown compression codec, use zlib, lzma or off."
+ERROR_ALGORITHM = "Unknown checksum, use crc32, blake2b or off."
+ERROR_CHECKSUM = "The file did not match its checksum and was thrown away, run the command again."
+ERROR_RANGE = "Some ranges of the file could not be transferred, run the command again."
+ERROR_ARG_DIR = "Could not find the specified directory. Check for typos and make sure you open the terminal from the scripts directory."
+ERROR_TREE = "The server does not support directory transfers."
+ERROR_LIST = "The server does not support listing files."
+ERROR_STATS = "The server does not support metrics."
+ERROR_PIPELINE = "Only get and change commands can be pipelined."
 ERROR_ARG = "Incorrect number of arguments, if you're lost type (help) to see the list of instructions"
 
-HELP = [HPUT, HGET, HCHANGE, HHELP, HBYE]
\ No newline at end of file
+HELP = [HPUT, HGET, HMGET, HTPUT, HTGET, HLIST, HPGET, HPPUT, HREGET, HREPUT, HDPUT, HCOMPRESS, HVERIFY, HDEDUP, HCHANGE, HHELP, HSTATS, HTUNE, HPIPELINE, HBYE]
+IO_BUFFER_SIZE = 65536
+PARTIAL_SUFFIX = ".part"
+PARALLEL_CONNECTIONS = 4
+PARALLEL_MIN_RANGE = 1 << 20
+LIST_PAGE = 1000
+POOL_SIZE = 4
@@ -0,0 +1,122 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared file cache file
+
+Small files fetched over and over are kept in memory together with their prebuilt get
+response header, so serving one costs a stat call instead of opening and reading the file.
+An entry is only used while the inode, mtime and size of the file still match the ones it was
+read with, and the server drops entries itself whenever it replaces or renames a file.
+"""
+import threading
+from collections import OrderedDict
+
+
+class FileCache:
+    def __init__(self, maxBytes, maxEntry):
+        """least recently used cache of responses bounded by their total size in bytes
+
+        Args:
+            maxBytes (int): largest total size of the cached responses
+            maxEntry (int): largest file that is cached
+        """
+        self.maxBytes = maxBytes
+        self.maxEntry = min(maxEntry, maxBytes)
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def fits(self, size):
+        """whether a file of size bytes is cached once read
+
+        Args:
+            size (int): file size
+
+        Returns:
+            bool: True if the file is small enough
+        """
+        return size <= self.maxEntry
+
+    def get(self, key, st):
+        """cached response for a file, stale entries are dropped
+
+        Args:
+            key (tuple): filename followed by whatever else the response depends on
+            st (os.stat_result): current stat of the file
+
+        Returns:
+            bytes: response header followed by the contents, None on a miss
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != _version(st):
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, st, response):
+        """caches the response for a file, the least recently used entries are evicted
+        until the cache fits its size again
+
+        Args:
+            key (tuple): filename followed by whatever else the response depends on
+            st (os.stat_result): stat of the file the contents were read from
+            response (bytes): response header followed by the contents
+        """
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (_version(st), response)
+            self.size += len(response)
+            while self.size > self.maxBytes:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        """drops the entries of files that were replaced or renamed
+
+        Args:
+            keys (tuple): keys of the entries
+        """
+        with self.lock:
+            for key in keys:
+                if key in self.entries:
+                    self._drop(key)
+
+    def stats(self):
+        """counters to size the cache by
+
+        Returns:
+            dict: hits, misses, evictions, number of entries and bytes cached
+        """
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self.entries), "bytes": self.size}
+
+    def _drop(self, key):
+        """removes an entry, the lock has to be held
+
+        Args:
+            key (tuple): key of the entry
+        """
+        self.size -= len(self.entries.pop(key)[1])
+
+
+def _version(st):
+    """what tells two versions of a file apart
+
+    Args:
+        st (os.stat_result): stat of the file
+
+    Returns:
+        tuple(int,int,int): inode, mtime in nanoseconds and size
+    """
+    return st.st_ino, st.st_mtime_ns, st.st_size
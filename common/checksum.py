@@ -0,0 +1,169 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared checksum file
+
+A checked transfer is the file contents followed by a trailer holding their digest. Both
+sides feed every block to the digest as it is sent or received, so a transfer is checked
+without reading the file a second time. Algorithms are looked up by name in ALGORITHMS, more
+can be added with register as long as both sides know them.
+"""
+import hashlib, zlib
+from common import codec
+
+ALGORITHMS = {}
+
+
+class Crc32:
+    def __init__(self):
+        """hashlib style wrapper around zlib.crc32
+        """
+        self.value = 0
+
+    def update(self, data):
+        """adds data to the checksum
+
+        Args:
+            data (bytes): next block of the contents
+        """
+        self.value = zlib.crc32(data, self.value)
+
+    def digest(self):
+        """checksum of everything added so far
+
+        Returns:
+            bytes: 4 byte big endian crc
+        """
+        return codec.SIZE.pack(self.value)
+
+
+class Writer:
+    def __init__(self, file, hasher):
+        """file wrapper adding everything written to a digest on the way
+
+        Args:
+            file (file): open file the data is written to
+            hasher (object): digest the data is added to
+        """
+        self.file = file
+        self.hasher = hasher
+
+    def write(self, data):
+        """adds data to the digest and writes it to the file
+
+        Args:
+            data (bytes): data to write
+
+        Returns:
+            int: number of bytes written
+        """
+        self.hasher.update(data)
+        return self.file.write(data)
+
+
+class Reader:
+    def __init__(self, file, hasher):
+        """file wrapper adding everything read to a digest on the way
+
+        Args:
+            file (file): open file the data is read from
+            hasher (object): digest the data is added to
+        """
+        self.file = file
+        self.hasher = hasher
+
+    def read(self, n):
+        """reads up to n bytes from the file and adds them to the digest
+
+        Args:
+            n (int): largest number of bytes to read
+
+        Returns:
+            bytes: data read
+        """
+        data = self.file.read(n)
+        self.hasher.update(data)
+        return data
+
+
+def register(name, factory, size):
+    """makes an algorithm available for checked transfers
+
+    Args:
+        name (str): name the algorithm is negotiated by, at most codec.MAX_NAME bytes
+        factory (function): returns a new object with update(data) and digest() methods
+        size (int): length of the digest in bytes
+    """
+    codec.encodeName(name)
+    ALGORITHMS[name] = (factory, size)
+
+register("crc32", Crc32, codec.SIZE.size)
+register("blake2b", lambda: hashlib.blake2b(digest_size=32), 32)
+
+def new(name):
+    """new digest of a registered algorithm
+
+    Args:
+        name (str): algorithm name
+
+    Returns:
+        object: digest
+    """
+    return ALGORITHMS[name][0]()
+
+def digestSize(name):
+    """length of the trailer of an algorithm
+
+    Args:
+        name (str): algorithm name
+
+    Returns:
+        int: length in bytes
+    """
+    return ALGORITHMS[name][1]
+
+def sendFile(sock, file, size, name, bufferSize=65536):
+    """sends size bytes of the file followed by their digest, every block is added to the
+    digest between reading and sending it
+
+    Args:
+        sock (socket): socket to send on
+        file (file): open file positioned at the data
+        size (int): number of bytes to send
+        name (str): algorithm name
+        bufferSize (int, optional): size of every read. Defaults to 65536.
+
+    Returns:
+        int: number of bytes sent, with the trailer
+    """
+    hasher = new(name)
+    buf = memoryview(bytearray(max(1, min(bufferSize, size))))
+    remaining = size
+    while remaining:
+        n = file.readinto(buf[:min(len(buf), remaining)])
+        if not n:
+            raise OSError(f"file changed size while being sent, {remaining} bytes missing")
+        hasher.update(buf[:n])
+        sock.sendall(buf[:n])
+        remaining -= n
+    trailer = hasher.digest()
+    sock.sendall(trailer)
+    return size + len(trailer)
+
+def recvFile(receiver, file, size, name, bufferSize=65536):
+    """receives size bytes into the file followed by their digest
+
+    Args:
+        receiver (framing.Receiver): buffered receiver of the connection
+        file (file): open file the data is written to
+        size (int): number of bytes announced by the header
+        name (str): algorithm name
+        bufferSize (int, optional): size of the receive buffer. Defaults to 65536.
+
+    Returns:
+        bool: True if the digest of what arrived matches the trailer
+    """
+    hasher = new(name)
+    receiver.recvToFile(Writer(file, hasher), size, bufferSize)
+    return hasher.digest() == receiver.recvExact(digestSize(name))
@@ -0,0 +1,106 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared chunking file
+"""
+
+def chunker(data, n, fillvalue=b'\x00'):
+    """yields n sized chunks of a bytes string as memoryview slices, no data is copied
+    except for the last chunk which is padded with the fillvalue if it is not of size n
+
+    Args:
+        data (bytes): bytes string to chunk
+        n (int): chunk size
+        fillvalue (bytes, optional): padding fill value. Defaults to b'\\x00'.
+
+    Yields:
+        memoryview/bytes: chunks of size n
+    """
+    view = memoryview(data)
+    whole = len(view) - len(view) % n
+    for i in range(0, whole, n):
+        yield view[i:i+n]
+    if whole < len(view):
+        yield bytes(view[whole:]) + fillvalue * (n - len(view) + whole)
+
+def slices(data, size):
+    """yields memoryview slices of at most size bytes without padding, used to hand
+    large pieces of a buffer to sendall while still being able to report progress
+
+    Args:
+        data (bytes): bytes string to slice
+        size (int): maximum slice size
+
+    Yields:
+        memoryview: slices of data
+    """
+    view = memoryview(data)
+    for i in range(0, len(view), size):
+        yield view[i:i+size]
+
+def padding(length, n):
+    """zero bytes needed to pad length bytes up to a whole number of n sized chunks
+
+    Args:
+        length (int): number of bytes already sent
+        n (int): chunk size
+
+    Returns:
+        bytes: padding
+    """
+    return bytes(-length % n)
+
+def ranges(size, n, minimum=1):
+    """splits size bytes into at most n contiguous ranges of about the same length, fewer
+    ranges are used when they would get shorter than minimum
+
+    Args:
+        size (int): number of bytes to split
+        n (int): largest number of ranges
+        minimum (int, optional): smallest range worth its own transfer. Defaults to 1.
+
+    Returns:
+        list[tuple(int,int)]: offset and length of every range
+    """
+    n = max(1, min(n, size // minimum))
+    step = max(1, -(-size // n))
+    return [(offset, min(step, size - offset)) for offset in range(0, size, step)] or [(0, 0)]
+
+def cover(covered, start, end):
+    """adds the range from start to end to sorted ranges that don't touch each other,
+    overlapping and adjacent ones are merged so a range sent twice is only covered once
+
+    Args:
+        covered (list[tuple(int,int)]): start and end of every covered range, in order
+        start (int): start of the new range
+        end (int): end of the new range
+
+    Returns:
+        list[tuple(int,int)]: covered ranges including the new one
+    """
+    if start >= end:
+        return covered
+    merged = []
+    for a, b in covered:
+        if b < start or a > end:
+            merged.append((a, b))
+        else:
+            start, end = min(a, start), max(b, end)
+    merged.append((start, end))
+    return sorted(merged)
+
+def sendChunked(sock, data, n):
+    """sends a bytes string the way the legacy framing expects it, padded to whole chunks
+    and followed by an empty chunk. Every chunk gets its own send call, legacy receivers
+    read one recv(n) at a time and only stay aligned on chunk boundaries as long as the
+    sender never hands the kernel more than a chunk at once
+
+    Args:
+        sock (socket): socket to send on
+        data (bytes): data to send
+        n (int): chunk size
+    """
+    for chunk in chunker(data, n):
+        sock.sendall(chunk)
+    sock.sendall(bytes(n))
@@ -0,0 +1,835 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared protocol codec file
+
+Every request and response starts with one byte holding a 3 bit opcode and a 5 bit field,
+usually the length of the filename that follows. Opcodes stay the "000".."111" strings used
+throughout the client and server, the conversion to and from the byte goes through lookup
+tables and the fixed parts of a header through precompiled Struct objects.
+
+On framed connections the 111 request opcode is extended: the 5 bit field selects a sub
+operation and a 4 byte payload length follows, so a server can skip sub operations it
+doesn't know.
+
+File sizes and offsets are 4 byte fields, on connections that negotiated the wide version
+they are 8 bytes instead. Every function packing or reading one takes wide for that, counts
+and payload lengths stay 4 bytes either way.
+"""
+import struct
+
+OPCODES = ["000", "001", "010", "011", "100", "101", "110", "111"]
+MAX_NAME = 31
+MAX_SIZE = 2**32 - 1
+MAX_WIDE_SIZE = 2**64 - 1
+EXTENDED = "111"
+EXT_BATCH = 1
+EXT_RANGE_GET = 2
+EXT_RANGE_PUT = 3
+EXT_QUERY = 4
+EXT_RESUME_PUT = 5
+EXT_COMPRESSED_GET = 6
+EXT_COMPRESSED_PUT = 7
+EXT_SIGNATURE = 8
+EXT_DELTA_PUT = 9
+EXT_HAVE = 10
+EXT_LIST = 11
+EXT_TREE_PUT = 12
+EXT_TREE_GET = 13
+EXT_CHECKED_GET = 14
+EXT_CHECKED_PUT = 15
+EXT_STATS = 16
+EXT_TUNE = 17
+
+SIZE = struct.Struct('>I')
+WIDE_SIZE = struct.Struct('>Q')
+# offset, length and file size of a range request, the file size is only used by range put
+RANGE = struct.Struct('>III')
+WIDE_RANGE = struct.Struct('>QQQ')
+# opcode byte, file size and length of a range get response
+RANGE_REPLY = struct.Struct('>BII')
+WIDE_RANGE_REPLY = struct.Struct('>BQQ')
+# block size, size of the server's copy and size of the new file of a delta put
+DELTA = struct.Struct('>III')
+WIDE_DELTA = struct.Struct('>IQQ')
+# opcode byte, block size, size of the server's copy and number of block signatures
+SIGNATURE_REPLY = struct.Struct('>BIII')
+WIDE_SIGNATURE_REPLY = struct.Struct('>BIQI')
+# file size and blake2b digest of the contents of a have request
+HAVE = struct.Struct('>I32s')
+WIDE_HAVE = struct.Struct('>Q32s')
+# first entry and largest number of entries of a list request
+LIST = struct.Struct('>II')
+
+TUNE = struct.Struct('>III')
+TUNE_REPLY = struct.Struct('>BIII')
+# kind, size, mtime in nanoseconds and name length of a listed entry, the name follows
+LIST_ENTRY = struct.Struct('>BQQB')
+# opcode/length byte followed by a filename of every possible length, with and without the size
+NAMES = [struct.Struct(f'>B{n}s') for n in range(MAX_NAME+1)]
+HEADERS = [struct.Struct(f'>B{n}sI') for n in range(MAX_NAME+1)]
+WIDE_HEADERS = [struct.Struct(f'>B{n}sQ') for n in range(MAX_NAME+1)]
+
+_OPBITS = {op: i << 5 for i, op in enumerate(OPCODES)}
+_BYTES = [bytes([i]) for i in range(256)]
+_UNPACKED = [(OPCODES[i >> 5], i & 0x1f) for i in range(256)]
+
+def maxSize(wide=False):
+    """largest file size a header can carry
+
+    Args:
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        int: size in bytes
+    """
+    return MAX_WIDE_SIZE if wide else MAX_SIZE
+
+def sizeLength(wide=False):
+    """length of a file size field
+
+    Args:
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        int: field length in bytes
+    """
+    return WIDE_SIZE.size if wide else SIZE.size
+
+def packOp(opcode, low=0):
+    """packs an opcode and the 5 bit field into the first byte of a message
+
+    Args:
+        opcode (str): operation/response code
+        low (int, optional): value of the 5 low bits. Defaults to 0.
+
+    Returns:
+        bytes: single byte
+    """
+    return _BYTES[_OPBITS[opcode] | low]
+
+def unpackOp(b):
+    """splits the first byte of a message into its opcode and 5 bit field
+
+    Args:
+        b (bytes/int): first byte, or a buffer starting with it
+
+    Returns:
+        tuple(str,int): opcode and the value of the low bits
+    """
+    if not isinstance(b, int):
+        b = b[0]
+    return _UNPACKED[b]
+
+def encodeName(name):
+    """encodes a filename, the length has to fit the 5 bit field
+
+    Args:
+        name (str): filename
+
+    Returns:
+        bytes: utf-8 encoded filename
+    """
+    raw = name.encode('utf-8')
+    if len(raw) > MAX_NAME:
+        raise ValueError(f"filename {name} is {len(raw)} bytes, at most {MAX_NAME} fit the header")
+    return raw
+
+def packName(opcode, name):
+    """packs a header made of the opcode/length byte and a filename
+
+    Args:
+        opcode (str): operation/response code
+        name (str): filename
+
+    Returns:
+        bytes: header
+    """
+    raw = encodeName(name)
+    return NAMES[len(raw)].pack(_OPBITS[opcode] | len(raw), raw)
+
+def unpackName(buf):
+    """reads a header made of the opcode/length byte and a filename
+
+    Args:
+        buf (bytes): buffer starting with the header
+
+    Returns:
+        tuple(str,str): opcode and filename
+    """
+    b, raw = NAMES[buf[0] & 0x1f].unpack_from(buf)
+    return OPCODES[b >> 5], raw.decode('utf-8')
+
+def packHeader(opcode, name, size, wide=False):
+    """packs a header made of the opcode/length byte, a filename and the file size
+
+    Args:
+        opcode (str): operation/response code
+        name (str): filename
+        size (int): file size in bytes
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: header
+    """
+    raw = encodeName(name)
+    return (WIDE_HEADERS if wide else HEADERS)[len(raw)].pack(_OPBITS[opcode] | len(raw), raw, size)
+
+def unpackHeader(buf, wide=False):
+    """reads a header made of the opcode/length byte, a filename and the file size,
+    anything following the header in the buffer is ignored
+
+    Args:
+        buf (bytes): buffer starting with the header
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(str,str,int): opcode, filename and file size
+    """
+    b, raw, size = (WIDE_HEADERS if wide else HEADERS)[buf[0] & 0x1f].unpack_from(buf)
+    return OPCODES[b >> 5], raw.decode('utf-8'), size
+
+def headerSize(fl, wide=False):
+    """length of a header carrying a file size
+
+    Args:
+        fl (int): filename length
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        int: header length in bytes
+    """
+    return (WIDE_HEADERS if wide else HEADERS)[fl].size
+
+def packChange(opcode, name, newName):
+    """packs a change request, the second filename is preceded by a whole byte holding its length
+
+    Args:
+        opcode (str): operation code
+        name (str): current filename
+        newName (str): new filename
+
+    Returns:
+        bytes: request
+    """
+    raw = encodeName(name)
+    rawNew = encodeName(newName)
+    return NAMES[len(raw)].pack(_OPBITS[opcode] | len(raw), raw) + NAMES[len(rawNew)].pack(len(rawNew), rawNew)
+
+def unpackChange(buf):
+    """reads a change request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+
+    Returns:
+        tuple(str,str): current filename and new filename
+    """
+    fl = buf[0] & 0x1f
+    fln = buf[fl+1]
+    return bytes(buf[1:fl+1]).decode('utf-8'), bytes(buf[fl+2:fl+fln+2]).decode('utf-8')
+
+def requestSize(buf, framed, chunkSize=1024, wide=False):
+    """incremental parser for the requests a client sends, works out from the bytes received
+    so far how long the request at the start of the buffer is. As long as the buffer is too
+    short to tell, the number of bytes needed to find out more is returned instead, so the
+    caller keeps receiving until the buffer is at least as long as the returned size
+
+    Args:
+        buf (bytes): received bytes, starting at a request boundary
+        framed (bool): whether the connection uses the length prefixed framing
+        chunkSize (int, optional): legacy chunk size. Defaults to 1024.
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        int: length of the request, or of the prefix needed to tell
+    """
+    if not buf:
+        return 1
+    opcode, fl = _UNPACKED[buf[0]]
+    if opcode == "000":
+        # a legacy upload starts with a whole chunk holding the header and the first data
+        return headerSize(fl, wide) if framed else chunkSize
+    if opcode == "001":
+        return fl+1
+    if opcode == "010":
+        if len(buf) < fl+2:
+            return fl+2
+        return fl+2+buf[fl+1]
+    if opcode == EXTENDED and framed:
+        if len(buf) < 1+SIZE.size:
+            return 1+SIZE.size
+        return 1+SIZE.size+SIZE.unpack_from(buf, 1)[0]
+    return 1
+
+def packEntry(name):
+    """packs a string preceded by a whole byte holding its length, the way every name inside
+    an extended request is sent
+
+    Args:
+        name (str): filename or codec name
+
+    Returns:
+        bytes: entry
+    """
+    raw = encodeName(name)
+    return NAMES[len(raw)].pack(len(raw), raw)
+
+def unpackEntry(buf, pos):
+    """reads an entry packed by packEntry
+
+    Args:
+        buf (bytes): buffer holding the entry
+        pos (int): position of the entry in the buffer
+
+    Returns:
+        tuple(str,int): the string and the position right after the entry
+    """
+    end = pos+1+buf[pos]
+    return bytes(buf[pos+1:end]).decode('utf-8'), end
+
+def packExtended(sub, payload):
+    """packs an extended request
+
+    Args:
+        sub (int): sub operation
+        payload (bytes): request payload
+
+    Returns:
+        bytes: request
+    """
+    return packOp(EXTENDED, sub) + SIZE.pack(len(payload)) + payload
+
+def packBatch(names):
+    """packs a batch get request, every filename is preceded by a whole byte holding its length
+
+    Args:
+        names (list[str]): filenames
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(EXT_BATCH, b''.join(packEntry(each) for each in names))
+
+def unpackBatch(buf):
+    """reads the filenames of a batch get request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+
+    Returns:
+        list[str]: filenames
+    """
+    names = []
+    pos = 1+SIZE.size
+    while pos < len(buf):
+        name, pos = unpackEntry(buf, pos)
+        names.append(name)
+    return names
+
+def packRange(sub, name, offset, length, size=0, wide=False):
+    """packs a range get or range put request, the data of a range put follows it
+
+    Args:
+        sub (int): EXT_RANGE_GET or EXT_RANGE_PUT
+        name (str): filename
+        offset (int): position of the range in the file
+        length (int): length of the range
+        size (int, optional): size of the whole file, for range put. Defaults to 0.
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(sub, (WIDE_RANGE if wide else RANGE).pack(offset, length, size) + packEntry(name))
+
+def unpackRange(buf, wide=False):
+    """reads a range get or range put request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(str,int,int,int): filename, offset, length and file size
+    """
+    fields = WIDE_RANGE if wide else RANGE
+    offset, length, size = fields.unpack_from(buf, 1+SIZE.size)
+    return unpackEntry(buf, 1+SIZE.size+fields.size)[0], offset, length, size
+
+def rangeReplySize(wide=False):
+    """length of the header of a range get response
+
+    Args:
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        int: header length in bytes
+    """
+    return (WIDE_RANGE_REPLY if wide else RANGE_REPLY).size
+
+def packRangeReply(size, length, wide=False):
+    """packs the header of a range get response, the range data follows it
+
+    Args:
+        size (int): size of the whole file
+        length (int): length of the range that follows
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: header
+    """
+    return (WIDE_RANGE_REPLY if wide else RANGE_REPLY).pack(_OPBITS[EXTENDED] | EXT_RANGE_GET, size, length)
+
+def unpackRangeReply(buf, wide=False):
+    """reads the header of a range get response
+
+    Args:
+        buf (bytes): buffer starting with the header
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(int,int): size of the whole file and length of the range that follows
+    """
+    b, size, length = (WIDE_RANGE_REPLY if wide else RANGE_REPLY).unpack_from(buf)
+    return size, length
+
+def packQuery(name):
+    """packs a query asking how much of an interrupted upload the server kept
+
+    Args:
+        name (str): filename
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(EXT_QUERY, packEntry(name))
+
+def unpackQuery(buf):
+    """reads the filename of a query, or of any other request carrying nothing but a filename
+
+    Args:
+        buf (bytes): buffer holding the whole request
+
+    Returns:
+        str: filename
+    """
+    return unpackEntry(buf, 1+SIZE.size)[0]
+
+def packCompressed(sub, codecName, name, size=0, wide=False):
+    """packs a compressed get or compressed put request
+
+    Args:
+        sub (int): EXT_COMPRESSED_GET or EXT_COMPRESSED_PUT
+        codecName (str): codec the client would like to use
+        name (str): filename
+        size (int, optional): size of the uncompressed file, for compressed put. Defaults to 0.
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(sub, packSize(size, wide) + packEntry(codecName) + packEntry(name))
+
+def unpackCompressed(buf, wide=False):
+    """reads a compressed get or compressed put request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(str,str,int): codec name, filename and uncompressed file size
+    """
+    pos = 1+SIZE.size
+    size = unpackSize(buf, pos, wide)
+    codecName, pos = unpackEntry(buf, pos+sizeLength(wide))
+    return codecName, unpackEntry(buf, pos)[0], size
+
+def packCompressedReply(sub, codecName, size=0, wide=False):
+    """packs the answer to a compressed request, naming the codec the data is sent with,
+    an empty name means the data goes uncompressed
+
+    Args:
+        sub (int): EXT_COMPRESSED_GET or EXT_COMPRESSED_PUT
+        codecName (str): codec used
+        size (int, optional): size of the uncompressed file, for compressed get. Defaults to 0.
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: header
+    """
+    return packOp(EXTENDED, sub) + packSize(size, wide) + packEntry(codecName)
+
+def compressedReplySize(buf, wide=False):
+    """length of the answer to a compressed request, or of the prefix needed to tell
+
+    Args:
+        buf (bytes): received bytes, starting with the answer
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        int: length in bytes
+    """
+    n = sizeLength(wide)
+    if len(buf) < 2+n:
+        return 2+n
+    return 2+n+buf[1+n]
+
+def unpackCompressedReply(buf, wide=False):
+    """reads the answer to a compressed request
+
+    Args:
+        buf (bytes): buffer holding the whole answer
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(str,int): codec name and uncompressed file size
+    """
+    return unpackEntry(buf, 1+sizeLength(wide))[0], unpackSize(buf, 1, wide)
+
+def packChecked(sub, algorithm, name, size=0, wide=False):
+    """packs a checked get or checked put request, laid out like a compressed request
+    with the checksum algorithm in place of the codec
+
+    Args:
+        sub (int): EXT_CHECKED_GET or EXT_CHECKED_PUT
+        algorithm (str): checksum algorithm the client would like to use
+        name (str): filename
+        size (int, optional): file size, for checked put. Defaults to 0.
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: request
+    """
+    return packCompressed(sub, algorithm, name, size, wide)
+
+def unpackChecked(buf, wide=False):
+    """reads a checked get or checked put request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(str,str,int): algorithm name, filename and file size
+    """
+    return unpackCompressed(buf, wide)
+
+def packCheckedReply(sub, algorithm, size=0, wide=False):
+    """packs the answer to a checked request, naming the algorithm of the trailer that
+    follows the data, an empty name means the data goes without a trailer
+
+    Args:
+        sub (int): EXT_CHECKED_GET or EXT_CHECKED_PUT
+        algorithm (str): checksum algorithm used
+        size (int, optional): file size, for checked get. Defaults to 0.
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: header
+    """
+    return packCompressedReply(sub, algorithm, size, wide)
+
+def checkedReplySize(buf, wide=False):
+    """length of the answer to a checked request, or of the prefix needed to tell
+
+    Args:
+        buf (bytes): received bytes, starting with the answer
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        int: length in bytes
+    """
+    return compressedReplySize(buf, wide)
+
+def unpackCheckedReply(buf, wide=False):
+    """reads the answer to a checked request
+
+    Args:
+        buf (bytes): buffer holding the whole answer
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(str,int): algorithm name and file size
+    """
+    return unpackCompressedReply(buf, wide)
+
+def packSignature(name):
+    """packs a request for the block signatures of the server's copy of a file
+
+    Args:
+        name (str): filename
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(EXT_SIGNATURE, packEntry(name))
+
+def signatureReplySize(wide=False):
+    """length of the header of the answer to a signature request
+
+    Args:
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        int: header length in bytes
+    """
+    return (WIDE_SIGNATURE_REPLY if wide else SIGNATURE_REPLY).size
+
+def packSignatureReply(n, baseSize, count, wide=False):
+    """packs the header of the answer to a signature request, count block signatures follow it
+
+    Args:
+        n (int): block size
+        baseSize (int): size of the server's copy
+        count (int): number of signatures
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: header
+    """
+    return (WIDE_SIGNATURE_REPLY if wide else SIGNATURE_REPLY).pack(_OPBITS[EXTENDED] | EXT_SIGNATURE, n, baseSize, count)
+
+def unpackSignatureReply(buf, wide=False):
+    """reads the header of the answer to a signature request
+
+    Args:
+        buf (bytes): buffer starting with the header
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(int,int,int): block size, size of the server's copy and number of signatures
+    """
+    b, n, baseSize, count = (WIDE_SIGNATURE_REPLY if wide else SIGNATURE_REPLY).unpack_from(buf)
+    return n, baseSize, count
+
+def packDelta(name, n, baseSize, size, wide=False):
+    """packs a delta put request, the delta instructions follow it
+
+    Args:
+        name (str): filename
+        n (int): block size the signatures were made with
+        baseSize (int): size of the server's copy the signatures were made of
+        size (int): size of the new file
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(EXT_DELTA_PUT, (WIDE_DELTA if wide else DELTA).pack(n, baseSize, size) + packEntry(name))
+
+def unpackDelta(buf, wide=False):
+    """reads a delta put request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(str,int,int,int): filename, block size, size of the server's copy and size of the new file
+    """
+    fields = WIDE_DELTA if wide else DELTA
+    n, baseSize, size = fields.unpack_from(buf, 1+SIZE.size)
+    return unpackEntry(buf, 1+SIZE.size+fields.size)[0], n, baseSize, size
+
+def packHave(name, digest, size, wide=False):
+    """packs a have request, asking the server to store fn as a reference to contents it
+    already holds instead of receiving them
+
+    Args:
+        name (str): filename
+        digest (bytes): blake2b digest of the contents
+        size (int): file size in bytes
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(EXT_HAVE, (WIDE_HAVE if wide else HAVE).pack(size, digest) + packEntry(name))
+
+def unpackHave(buf, wide=False):
+    """reads a have request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+        wide (bool, optional): whether the connection uses 8 byte sizes. Defaults to False.
+
+    Returns:
+        tuple(str,bytes,int): filename, blake2b digest of the contents and file size
+    """
+    fields = WIDE_HAVE if wide else HAVE
+    size, digest = fields.unpack_from(buf, 1+SIZE.size)
+    return unpackEntry(buf, 1+SIZE.size+fields.size)[0], digest, size
+
+def packTree(sub, root):
+    """packs a tree put or tree get request, the entries of a tree put follow it
+
+    Args:
+        sub (int): EXT_TREE_PUT or EXT_TREE_GET
+        root (str): directory
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(sub, packEntry(root))
+
+def packList(path, offset, limit):
+    """packs a list request for one page of the entries of a directory, or for the entry of
+    a single file
+
+    Args:
+        path (str): directory or file, empty for the directory the server runs in
+        offset (int): first entry of the page
+        limit (int): largest number of entries on the page
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(EXT_LIST, LIST.pack(offset, limit) + packEntry(path))
+
+def unpackList(buf):
+    """reads a list request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+
+    Returns:
+        tuple(str,int,int): path, first entry and largest number of entries
+    """
+    offset, limit = LIST.unpack_from(buf, 1+SIZE.size)
+    return unpackEntry(buf, 1+SIZE.size+LIST.size)[0], offset, limit
+
+def packListReply(total, entries):
+    """packs the answer to a list request, its length follows the opcode byte like in an
+    extended request. Names longer than a length byte allows are left out
+
+    Args:
+        total (int): number of entries of the whole directory
+        entries (list[tuple(str,int,int,int)]): name, kind, size and mtime of the entries on the page
+
+    Returns:
+        bytes: answer
+    """
+    parts = [SIZE.pack(total)]
+    for name, kind, size, mtime in entries:
+        raw = name.encode('utf-8', 'surrogateescape')
+        if len(raw) <= 0xff:
+            parts.append(LIST_ENTRY.pack(kind, size, mtime, len(raw)) + raw)
+    return packExtended(EXT_LIST, b''.join(parts))
+
+def unpackListReply(body):
+    """reads the body of the answer to a list request, everything after its length
+
+    Args:
+        body (bytes): body of the answer
+
+    Returns:
+        tuple(int,list[tuple(str,int,int,int)]): number of entries of the whole directory and
+            name, kind, size and mtime of the entries on the page
+    """
+    total = SIZE.unpack_from(body)[0]
+    entries = []
+    pos = SIZE.size
+    while pos < len(body):
+        kind, size, mtime, n = LIST_ENTRY.unpack_from(body, pos)
+        pos += LIST_ENTRY.size
+        entries.append((bytes(body[pos:pos+n]).decode('utf-8', 'replace'), kind, size, mtime))
+        pos += n
+    return total, entries
+
+def packStats(fmt):
+    """packs a request for the server's metrics
+
+    Args:
+        fmt (str): "json" or "prometheus"
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(EXT_STATS, packEntry(fmt))
+
+def unpackStats(buf):
+    """reads a request for the server's metrics
+
+    Args:
+        buf (bytes): buffer holding the whole request
+
+    Returns:
+        str: format asked for
+    """
+    return unpackEntry(buf, 1+SIZE.size)[0]
+
+def packTune(chunkSize, sndbuf, rcvbuf):
+    """packs a tune request offering the client's transfer settings
+
+    Args:
+        chunkSize (int): chunk size, 0 for auto tuning
+        sndbuf (int): client's send buffer size, 0 for no preference
+        rcvbuf (int): client's receive buffer size, 0 for no preference
+
+    Returns:
+        bytes: request
+    """
+    return packExtended(EXT_TUNE, TUNE.pack(chunkSize, sndbuf, rcvbuf))
+
+def unpackTune(buf):
+    """reads a tune request
+
+    Args:
+        buf (bytes): buffer holding the whole request
+
+    Returns:
+        tuple(int,int,int): chunk size, send and receive buffer sizes offered
+    """
+    return TUNE.unpack_from(buf, 1+SIZE.size)
+
+def packTuneReply(chunkSize, sndbuf, rcvbuf):
+    """packs the server's answer to a tune request
+
+    Args:
+        chunkSize (int): agreed chunk size, 0 for auto tuning
+        sndbuf (int): send buffer size of the server's socket
+        rcvbuf (int): receive buffer size of the server's socket
+
+    Returns:
+        bytes: response
+    """
+    return TUNE_REPLY.pack(_OPBITS[EXTENDED] | EXT_TUNE, chunkSize, sndbuf, rcvbuf)
+
+def unpackTuneReply(buf):
+    """reads the server's answer to a tune request
+
+    Args:
+        buf (bytes): TUNE_REPLY.size bytes
+
+    Returns:
+        tuple(int,int,int): agreed chunk size, server's send and receive buffer sizes
+    """
+    return TUNE_REPLY.unpack(buf)[1:]
+
+def packSize(size, wide=False):
+    """packs a size field, 4 bytes unless it is a file size on a wide connection
+
+    Args:
+        size (int): size in bytes
+        wide (bool, optional): whether the field is 8 bytes. Defaults to False.
+
+    Returns:
+        bytes: size field
+    """
+    return (WIDE_SIZE if wide else SIZE).pack(size)
+
+def unpackSize(buf, offset=0, wide=False):
+    """reads a size field, 4 bytes unless it is a file size on a wide connection
+
+    Args:
+        buf (bytes): buffer holding the field
+        offset (int, optional): position of the field in the buffer. Defaults to 0.
+        wide (bool, optional): whether the field is 8 bytes. Defaults to False.
+
+    Returns:
+        int: size in bytes
+    """
+    return (WIDE_SIZE if wide else SIZE).unpack_from(buf, offset)[0]
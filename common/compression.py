@@ -0,0 +1,219 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared compression file
+
+A compressed transfer is a series of blocks, each a 4 byte length followed by that many
+compressed bytes, ended by an empty block. Files are compressed and decompressed one read
+at a time, never as a whole. Blocks are at most MAX_BLOCK bytes and every block is
+decompressed in pieces of at most one read, so neither a long block length nor a block that
+inflates to gigabytes makes the receiver hold more than that in memory, and a transfer is
+dropped as soon as it decompresses to more than the size it announced. Codecs are looked up
+by name in CODECS, more can be added with register as long as both sides know them.
+"""
+import zlib, lzma
+from common import codec
+
+SAMPLE_SIZE = 65536
+MIN_SIZE = 4096
+MIN_RATIO = 0.9
+END = bytes(codec.SIZE.size)
+# longest compressed block a receiver accepts, senders split longer output
+MAX_BLOCK = 1 << 20
+
+CODECS = {}
+
+def register(name, compressor, decompressor):
+    """makes a codec available for compressed transfers
+
+    Args:
+        name (str): name the codec is negotiated by, at most codec.MAX_NAME bytes
+        compressor (function): returns a new object with compress(data) and flush() methods
+        decompressor (function): returns a new object with a zlib or lzma style
+            decompress(data, max_length) method
+    """
+    codec.encodeName(name)
+    CODECS[name] = (compressor, decompressor)
+
+register("zlib", zlib.compressobj, zlib.decompressobj)
+register("lzma", lzma.LZMACompressor, lzma.LZMADecompressor)
+
+def compressor(name):
+    """new compressor of a registered codec
+
+    Args:
+        name (str): codec name
+
+    Returns:
+        object: compressor
+    """
+    return CODECS[name][0]()
+
+def decompressor(name):
+    """new decompressor of a registered codec
+
+    Args:
+        name (str): codec name
+
+    Returns:
+        object: decompressor
+    """
+    return CODECS[name][1]()
+
+def worthCompressing(sample):
+    """guesses from the start of a file whether compressing it pays off, small files and
+    data that is compressed already are sent as they are
+
+    Args:
+        sample (bytes): first SAMPLE_SIZE bytes of the file, or all of it if shorter
+
+    Returns:
+        bool: True if the sample shrinks by more than 1-MIN_RATIO with a fast zlib level
+    """
+    if len(sample) < MIN_SIZE:
+        return False
+    return len(zlib.compress(sample, 1)) < len(sample) * MIN_RATIO
+
+def readSample(file):
+    """reads the sample worthCompressing looks at and rewinds the file
+
+    Args:
+        file (file): file open for reading at its start
+
+    Returns:
+        bytes: sample
+    """
+    sample = file.read(SAMPLE_SIZE)
+    file.seek(0)
+    return sample
+
+def block(data):
+    """frames compressed bytes as one block
+
+    Args:
+        data (bytes): at most MAX_BLOCK compressed bytes
+
+    Returns:
+        bytes: block
+    """
+    return codec.packSize(len(data)) + data
+
+def blocks(data):
+    """frames compressed bytes as as many blocks as MAX_BLOCK takes
+
+    Args:
+        data (bytes): compressed bytes
+
+    Returns:
+        list[bytes]: blocks
+    """
+    view = memoryview(data)
+    return [block(view[i:i + MAX_BLOCK]) for i in range(0, len(data), MAX_BLOCK)]
+
+def blockSize(header):
+    """reads the length of a block and checks it against MAX_BLOCK
+
+    Args:
+        header (bytes): 4 byte block length
+
+    Raises:
+        ValueError: block longer than MAX_BLOCK
+
+    Returns:
+        int: block length, 0 for the end block
+    """
+    n = codec.unpackSize(header)
+    if n > MAX_BLOCK:
+        raise ValueError(f"compressed block of {n} bytes, at most {MAX_BLOCK} are accepted")
+    return n
+
+def writeBlock(decomp, data, file, room, bufferSize=65536):
+    """decompresses one block into the file bufferSize bytes at a time. zlib decompressors
+    keep the input they didn't get to in unconsumed_tail, lzma ones keep it themselves and
+    clear needs_input while they have output left
+
+    Args:
+        decomp (object): decompressor of the transfer
+        data (bytes): compressed block
+        file (file): open file the data is written to
+        room (int): bytes the transfer may still decompress to
+        bufferSize (int, optional): largest piece decompressed at a time. Defaults to 65536.
+
+    Raises:
+        ValueError: the block decompresses to more than room bytes
+
+    Returns:
+        int: number of decompressed bytes written
+    """
+    written = 0
+    while True:
+        out = decomp.decompress(data, bufferSize)
+        written += len(out)
+        if written > room:
+            raise ValueError(f"decompressed data goes past the announced size by {written - room} bytes")
+        file.write(out)
+        if getattr(decomp, "eof", False):
+            return written
+        data = getattr(decomp, "unconsumed_tail", None)
+        if data is None:
+            if getattr(decomp, "needs_input", True):
+                return written
+            data = b""
+        elif not data and len(out) < bufferSize:
+            return written
+
+def sendFile(sock, file, size, name, bufferSize=65536):
+    """compresses size bytes of the file and sends them as blocks followed
+    by the empty end block
+
+    Args:
+        sock (socket): socket to send on
+        file (file): open file positioned at the data
+        size (int): number of bytes to send
+        name (str): codec name
+        bufferSize (int, optional): size of every read. Defaults to 65536.
+
+    Returns:
+        int: number of bytes sent
+    """
+    comp = compressor(name)
+    sent = 0
+    remaining = size
+    while remaining:
+        data = file.read(min(bufferSize, remaining))
+        if not data:
+            raise OSError(f"file changed size while being sent, {remaining} bytes missing")
+        remaining -= len(data)
+        for each in blocks(comp.compress(data)):
+            sock.sendall(each)
+            sent += len(each)
+    for each in blocks(comp.flush()):
+        sock.sendall(each)
+        sent += len(each)
+    sock.sendall(END)
+    return sent + len(END)
+
+def recvFile(receiver, file, name, size, bufferSize=65536):
+    """receives blocks until the empty end block, writing every decompressed block to the file
+
+    Args:
+        receiver (framing.Receiver): buffered receiver of the connection
+        file (file): open file the data is written to
+        name (str): codec name
+        size (int): uncompressed size the sender announced
+        bufferSize (int, optional): largest piece decompressed at a time. Defaults to 65536.
+
+    Raises:
+        ValueError: a block is longer than MAX_BLOCK or the data decompresses to more than size
+
+    Returns:
+        int: number of decompressed bytes written
+    """
+    decomp = decompressor(name)
+    written = 0
+    while True:
+        n = blockSize(receiver.recvExact(len(END)))
+        if not n:
+            return written
+        written += writeBlock(decomp, receiver.recvExact(n), file, size - written, bufferSize)
@@ -0,0 +1,267 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared delta transfer file
+
+A delta upload works rsync style. The server splits its copy of a file into blocks of
+blockSize bytes and sends a weak and a strong checksum of every whole block. The client
+slides a window over its file, the weak checksum rolls one byte at a time and only a window
+whose weak checksum is known gets its strong checksum computed. What goes over the wire is a
+series of instructions, each an INSTRUCTION struct: copying a run of blocks from the server's
+copy, or a literal followed by its bytes, ended by END.
+"""
+import hashlib, mmap, struct, zlib
+from math import isqrt
+
+MIN_BLOCK = 2048
+MAX_BLOCK = 1 << 17
+DIGEST_SIZE = 16
+# weak adler32 checksum and strong blake2b digest of a block
+SIGNATURE = struct.Struct(f'>I{DIGEST_SIZE}s')
+# kind, then the first block and number of blocks of a copy or the length of a literal
+INSTRUCTION = struct.Struct('>BII')
+KIND_END = 0
+KIND_COPY = 1
+KIND_LITERAL = 2
+END = INSTRUCTION.pack(KIND_END, 0, 0)
+
+_MOD = 65521
+
+def blockSize(size):
+    """block size used for a file, about the square root of its size so the signature
+    stays small for large files while small files still match at a fine grain
+
+    Args:
+        size (int): size of the server's copy
+
+    Returns:
+        int: block size in bytes
+    """
+    return min(MAX_BLOCK, max(MIN_BLOCK, isqrt(size)))
+
+def strong(data):
+    """strong checksum of a block
+
+    Args:
+        data (bytes): block
+
+    Returns:
+        bytes: digest
+    """
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+def signature(file, n):
+    """signature of every whole block of a file, read one block at a time, a short last
+    block is left out and will go as a literal
+
+    Args:
+        file (file): file open for reading at its start
+        n (int): block size
+
+    Returns:
+        bytes: packed signatures, in block order
+    """
+    out = []
+    block = file.read(n)
+    while len(block) == n:
+        out.append(SIGNATURE.pack(zlib.adler32(block), strong(block)))
+        block = file.read(n)
+    return b''.join(out)
+
+def table(buf):
+    """index of packed signatures for matching, weak checksum to strong digest to block
+
+    Args:
+        buf (bytes): packed signatures
+
+    Returns:
+        dict: {weak: {strong: block index}}
+    """
+    index = {}
+    for i, (weak, digest) in enumerate(SIGNATURE.iter_unpack(buf)):
+        index.setdefault(weak, {}).setdefault(digest, i)
+    return index
+
+def match(data, n, blocks):
+    """slides a window of n bytes over data and yields what has to be sent for it, the
+    weak checksum rolls by one byte until a window matches a block of the server's copy
+
+    Args:
+        data (bytes/mmap): contents of the local file
+        n (int): block size
+        blocks (dict): signature table built by table
+
+    Yields:
+        tuple(int,int,int): (KIND_COPY, block index, 1) or (KIND_LITERAL, start, end)
+    """
+    size = len(data)
+    pos = 0
+    literal = 0
+    weak = None
+    while blocks and pos + n <= size:
+        if weak is None:
+            weak = zlib.adler32(data[pos:pos+n])
+            a, b = weak & 0xffff, weak >> 16
+        candidates = blocks.get(weak)
+        if candidates:
+            index = candidates.get(strong(data[pos:pos+n]))
+            if index is not None:
+                if literal < pos:
+                    yield KIND_LITERAL, literal, pos
+                yield KIND_COPY, index, 1
+                pos += n
+                literal = pos
+                weak = None
+                continue
+        if pos + n == size:
+            break
+        out, new = data[pos], data[pos+n]
+        a = (a - out + new) % _MOD
+        b = (b - n * out + a - 1) % _MOD
+        weak = (b << 16) | a
+        pos += 1
+    if literal < size:
+        yield KIND_LITERAL, literal, size
+
+def sendFile(sock, file, n, blocks, bufferSize=65536):
+    """sends the instructions rebuilding the file from the server's copy followed by END,
+    consecutive blocks are merged into one copy and literals are sent in pieces of at most
+    bufferSize bytes straight from the mapped file
+
+    Args:
+        sock (socket): socket to send on
+        file (file): local file open for reading
+        n (int): block size
+        blocks (dict): signature table built by table
+        bufferSize (int, optional): largest literal piece. Defaults to 65536.
+
+    Returns:
+        tuple(int,int): number of literal bytes and number of bytes copied from the server's copy
+    """
+    literal = copied = 0
+    run = None
+
+    def flush():
+        if run:
+            sock.sendall(INSTRUCTION.pack(KIND_COPY, *run))
+
+    with _view(file) as data:
+        for kind, first, last in match(data, n, blocks):
+            if kind == KIND_COPY:
+                copied += n
+                if run and run[0] + run[1] == first:
+                    run[1] += 1
+                    continue
+                flush()
+                run = [first, 1]
+                continue
+            flush()
+            run = None
+            literal += last - first
+            for start in range(first, last, bufferSize):
+                piece = data[start:min(start + bufferSize, last)]
+                sock.sendall(INSTRUCTION.pack(KIND_LITERAL, len(piece), 0) + piece)
+        flush()
+    sock.sendall(END)
+    return literal, copied
+
+def recvFile(receiver, base, file, n, bufferSize=65536):
+    """receives instructions until END, literals are written as they arrive and copies
+    are read from the server's copy. Without a base the instructions are only consumed.
+    A copy that can't be made is only raised once END arrived, so the connection is still
+    at a request boundary when the caller answers it
+
+    Args:
+        receiver (framing.Receiver): buffered receiver of the connection
+        base (file): server's copy open for reading, None to drop the data
+        file (file): open file the rebuilt file is written to
+        n (int): block size
+        bufferSize (int, optional): size of every read. Defaults to 65536.
+
+    Raises:
+        ValueError: a copy reached past the end of the server's copy
+        ConnectionError: an unknown instruction, the rest of the stream can't be followed
+
+    Returns:
+        int: number of bytes written
+    """
+    written = 0
+    blocks = _blocks(base, n)
+    error = None
+    while True:
+        kind, first, count = INSTRUCTION.unpack(receiver.recvExact(INSTRUCTION.size))
+        if kind == KIND_END:
+            if error is not None:
+                raise error
+            return written
+        if kind == KIND_LITERAL:
+            receiver.recvToFile(file, first, bufferSize)
+            written += first
+        elif kind == KIND_COPY and base is not None:
+            try:
+                written += copyBlocks(base, file, n, blocks, first, count, bufferSize)
+            except ValueError as e:
+                error, base = e, None
+        elif kind != KIND_COPY:
+            raise ConnectionError(f"unknown delta instruction {kind}")
+
+def copyBlocks(base, file, n, blocks, first, count, bufferSize=65536):
+    """copies a run of blocks of the server's copy to the rebuilt file
+
+    Args:
+        base (file): server's copy open for reading
+        file (file): open file the rebuilt file is written to
+        n (int): block size
+        blocks (int): number of whole blocks in the server's copy
+        first (int): first block of the run
+        count (int): number of blocks
+        bufferSize (int, optional): size of every read. Defaults to 65536.
+
+    Raises:
+        ValueError: the run is past the end of the server's copy, or the copy shrank
+
+    Returns:
+        int: number of bytes written
+    """
+    if first + count > blocks:
+        raise ValueError(f"delta copies block {first + count - 1}, the file has {blocks}")
+    base.seek(first * n)
+    remaining = count * n
+    while remaining:
+        data = base.read(min(bufferSize, remaining))
+        if not data:
+            raise ValueError("server copy shrank during delta")
+        file.write(data)
+        remaining -= len(data)
+    return count * n
+
+def _blocks(base, n):
+    """number of whole blocks in the server's copy
+
+    Args:
+        base (file): server's copy open for reading, or None
+        n (int): block size
+
+    Returns:
+        int: number of blocks
+    """
+    if base is None:
+        return 0
+    base.seek(0, 2)
+    return base.tell() // n
+
+def _view(file):
+    """maps a local file for matching without reading it into memory, empty files can't
+    be mapped and get an empty buffer
+
+    Args:
+        file (file): file open for reading
+
+    Returns:
+        mmap/memoryview: context manager over the contents
+    """
+    try:
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        return memoryview(b'')
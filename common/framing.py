@@ -0,0 +1,189 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared framing file
+
+Both sides start out speaking the legacy framing where a file is sent padded to whole
+chunks and terminated by an empty chunk. A client that knows the length prefixed framing
+sends a help request carrying its version in the low 5 bits, a legacy server answers it
+like any help request while a newer server answers with a single 111 byte carrying the
+version both sides will use from then on. From VERSION_FRAMED up, the size field of a
+header is the only thing delimiting the data that follows it, there is no padding and no
+end chunk. From VERSION_WIDE up, file sizes and offsets are 8 byte fields instead of 4 so
+files above 4 GiB can be moved.
+"""
+VERSION_LEGACY = 0
+VERSION_FRAMED = 1
+VERSION_WIDE = 2
+VERSION = VERSION_WIDE
+
+def recvInto(sock, view):
+    """fills a preallocated buffer completely from the socket, short reads are completed
+
+    Args:
+        sock (socket): socket to read from
+        view (memoryview): buffer to fill
+    """
+    got = 0
+    while got < len(view):
+        n = sock.recv_into(view[got:])
+        if not n:
+            raise ConnectionError("peer disconnected mid transfer")
+        got += n
+
+def recvExact(sock, n):
+    """receives exactly n bytes from the socket
+
+    Args:
+        sock (socket): socket to read from
+        n (int): number of bytes
+
+    Returns:
+        bytes: received data
+    """
+    buf = bytearray(n)
+    recvInto(sock, memoryview(buf))
+    return bytes(buf)
+
+def recvToFile(sock, file, size, bufferSize=65536, progress=None):
+    """receives exactly size bytes from the socket into one preallocated buffer, writing
+    whatever arrived to the file after every recv_into
+
+    Args:
+        sock (socket): socket to read from
+        file (file): open file the data is written to
+        size (int): number of bytes announced by the header
+        bufferSize (int, optional): size of the receive buffer. Defaults to 65536.
+        progress (progress.Progress, optional): told about every write. Defaults to None.
+    """
+    buf = memoryview(bytearray(max(1, min(bufferSize, size))))
+    remaining = size
+    while remaining:
+        n = sock.recv_into(buf, min(len(buf), remaining))
+        if not n:
+            raise ConnectionError("peer disconnected mid transfer")
+        file.write(buf[:n])
+        remaining -= n
+        if progress is not None:
+            progress.update(n)
+
+
+class Receiver:
+    # reads timed when tracing is on
+    Traced = ["recvMessage", "recvExact", "recvToFile"]
+    def __init__(self, sock, bufferSize=65536):
+        """buffered reader over a socket, small reads are served from one large recv and
+        whatever arrived past the current message is kept for the next one, so back to back
+        requests cost a single syscall and a header split across segments is still read whole
+
+        Args:
+            sock (socket): socket to read from
+            bufferSize (int, optional): largest single recv. Defaults to 65536.
+        """
+        self.sock = sock
+        self.bufferSize = bufferSize
+        self.buffer = bytearray()
+
+    def pending(self):
+        """number of bytes received but not consumed yet
+
+        Returns:
+            int: buffered bytes
+        """
+        return len(self.buffer)
+
+    def _fill(self):
+        """appends whatever the socket has, up to bufferSize bytes, to the buffer
+
+        Returns:
+            bool: False if the peer closed the connection
+        """
+        data = self.sock.recv(self.bufferSize)
+        self.buffer += data
+        return bool(data)
+
+    def _take(self, n):
+        """removes and returns the first n buffered bytes
+
+        Args:
+            n (int): number of bytes
+
+        Returns:
+            bytes: consumed data
+        """
+        data = bytes(self.buffer[:n])
+        del self.buffer[:n]
+        return data
+
+    def peek(self, n):
+        """returns the next n bytes without consuming them
+
+        Args:
+            n (int): number of bytes
+
+        Returns:
+            bytes: data, shorter than n only if the peer closed the connection
+        """
+        while len(self.buffer) < n and self._fill():
+            continue
+        return bytes(self.buffer[:n])
+
+    def recvMessage(self, sizeOf, *args):
+        """receives one whole message whose length is worked out incrementally by sizeOf,
+        called with the buffered bytes and args until the buffer holds the full message
+
+        Args:
+            sizeOf (function): parser returning the message length, or the length needed to tell
+            args: extra arguments passed to sizeOf
+
+        Returns:
+            bytes: message, empty if the peer closed the connection between messages
+        """
+        n = sizeOf(self.buffer, *args)
+        while len(self.buffer) < n:
+            if not self._fill():
+                if self.buffer:
+                    raise ConnectionError("peer disconnected mid message")
+                return b''
+            n = sizeOf(self.buffer, *args)
+        return self._take(n)
+
+    def recvExact(self, n):
+        """receives exactly n bytes, reads larger than the buffer go straight into the result
+        once the buffered bytes are used up
+
+        Args:
+            n (int): number of bytes
+
+        Returns:
+            bytes: received data
+        """
+        while len(self.buffer) < n <= self.bufferSize:
+            if not self._fill():
+                raise ConnectionError("peer disconnected mid transfer")
+        if len(self.buffer) >= n:
+            return self._take(n)
+        buf = bytearray(n)
+        have = len(self.buffer)
+        buf[:have] = self.buffer
+        self.buffer.clear()
+        recvInto(self.sock, memoryview(buf)[have:])
+        return bytes(buf)
+
+    def recvToFile(self, file, size, bufferSize=65536, progress=None):
+        """receives exactly size bytes into the file, buffered bytes are written first
+
+        Args:
+            file (file): open file the data is written to
+            size (int): number of bytes announced by the header
+            bufferSize (int, optional): size of the receive buffer. Defaults to 65536.
+            progress (progress.Progress, optional): told about every write. Defaults to None.
+        """
+        if self.buffer and size:
+            data = self._take(min(size, len(self.buffer)))
+            file.write(data)
+            size -= len(data)
+            if progress is not None:
+                progress.update(len(data))
+        recvToFile(self.sock, file, size, bufferSize, progress)
@@ -0,0 +1,167 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared directory index file
+
+Listing requests are answered from an index of the directories listed before instead of
+calling stat on every entry each time. A directory is scanned once when it is first listed,
+after that the server only updates the entries of the files it replaces or renames. The mtime
+of the directory is remembered with the entries, so a directory changed by something other
+than the server is noticed with a single stat call and scanned again when it is next listed.
+"""
+import bisect, os, stat, threading
+
+KIND_FILE = 0
+KIND_DIR = 1
+
+
+class _Directory:
+    def __init__(self, mtime, entries):
+        """index of a single directory
+
+        Args:
+            mtime (int): mtime of the directory in nanoseconds when the entries were read
+            entries (dict): {name: (kind, size, mtime)}
+        """
+        self.mtime = mtime
+        self.entries = entries
+        self.names = sorted(entries)
+
+
+class DirIndex:
+    def __init__(self):
+        """names, kinds, sizes and mtimes of the directories listed so far
+        """
+        self.dirs = {}
+        self.lock = threading.Lock()
+
+    def list(self, path, offset, limit):
+        """one page of the entries of a directory in name order, or the entry of a single file
+
+        Args:
+            path (str): directory or file, empty for the directory the server runs in
+            offset (int): first entry of the page
+            limit (int): largest number of entries on the page
+
+        Returns:
+            tuple(int,list): total number of entries and (name, kind, size, mtime) of every entry
+                on the page, None if the path doesn't exist
+        """
+        path = os.path.normpath(path or ".")
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISDIR(st.st_mode):
+            return 1, [(os.path.basename(path),) + _entry(st)] if offset == 0 and limit else []
+        with self.lock:
+            d = self.dirs.get(path)
+        if d is None or d.mtime != st.st_mtime_ns:
+            d = _scan(path, st.st_mtime_ns)
+            with self.lock:
+                self.dirs[path] = d
+        with self.lock:
+            return len(d.names), [(name,) + d.entries[name] for name in d.names[offset:offset+limit]]
+
+    def mtimes(self, *paths):
+        """mtimes of the indexed directories of files, taken before the server writes to them
+
+        Args:
+            paths (str): filenames
+
+        Returns:
+            dict: {directory: mtime in nanoseconds} for update
+        """
+        before = {}
+        for parent in {_parent(path) for path in paths}:
+            with self.lock:
+                if parent not in self.dirs:
+                    continue
+            try:
+                before[parent] = os.stat(parent).st_mtime_ns
+            except OSError:
+                continue
+        return before
+
+    def update(self, before, *paths):
+        """refreshes the entries of files the server replaced, created, renamed or removed.
+        A directory that changed between its last scan and the server's write is dropped
+        instead, so it is scanned again when it is next listed
+
+        Args:
+            before (dict): mtimes of the directories from mtimes, taken before the write
+            paths (str): filenames
+        """
+        byParent = {}
+        for path in paths:
+            byParent.setdefault(_parent(path), []).append(os.path.basename(os.path.normpath(path)))
+        for parent, changed in byParent.items():
+            with self.lock:
+                d = self.dirs.get(parent)
+                if d is None:
+                    continue
+                try:
+                    mtime = os.stat(parent).st_mtime_ns
+                except OSError:
+                    mtime = None
+                if mtime is None or d.mtime != before.get(parent):
+                    del self.dirs[parent]
+                    continue
+                for name in changed:
+                    try:
+                        entry = _entry(os.stat(os.path.join(parent, name)))
+                    except OSError:
+                        entry = None
+                    if entry is None:
+                        if d.entries.pop(name, None) is not None:
+                            del d.names[bisect.bisect_left(d.names, name)]
+                        continue
+                    if name not in d.entries:
+                        bisect.insort(d.names, name)
+                    d.entries[name] = entry
+                d.mtime = mtime
+
+
+def _entry(st):
+    """index entry of a stat result
+
+    Args:
+        st (os.stat_result): stat of the entry
+
+    Returns:
+        tuple(int,int,int): kind, size and mtime in nanoseconds
+    """
+    if stat.S_ISDIR(st.st_mode):
+        return KIND_DIR, 0, st.st_mtime_ns
+    return KIND_FILE, st.st_size, st.st_mtime_ns
+
+def _parent(path):
+    """directory of a file, normalized the way list looks directories up
+
+    Args:
+        path (str): filename
+
+    Returns:
+        str: directory
+    """
+    return os.path.dirname(os.path.normpath(path)) or "."
+
+def _scan(path, mtime):
+    """reads every entry of a directory
+
+    Args:
+        path (str): directory
+        mtime (int): mtime of the directory the scan is for
+
+    Returns:
+        _Directory: index of the directory
+    """
+    entries = {}
+    with os.scandir(path) as it:
+        for each in it:
+            try:
+                entries[each.name] = _entry(each.stat())
+            except OSError:
+                continue
+    return _Directory(mtime, entries)
@@ -0,0 +1,37 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared loopback file
+
+Helpers for running a server on this machine and waiting for it, used by the loopback
+benchmark and the tests
+"""
+import socket, time
+
+def freePort():
+    """a port nothing listens on right now
+
+    Returns:
+        int: port number
+    """
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+def waitListening(port, timeout=10):
+    """blocks until the server accepts connections
+
+    Args:
+        port (int): port the server listens on
+        timeout (int, optional): seconds to wait before giving up. Defaults to 10.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            socket.create_connection(("localhost", port)).close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
@@ -0,0 +1,272 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared metrics file
+
+Counters the server keeps while it runs: requests per operation, bytes received and sent,
+histograms of the time spent processing requests and sending responses, open connections
+and the error codes answered, unknown requests among them under their own code 011. Bytes
+are counted where they cross the socket, by wrapping the socket or the asyncio streams of
+every connection. Each connection counts into its own Traffic without a lock, the counts of
+open connections are added up when a snapshot is taken and folded into the totals once the
+connection closes. A snapshot is sent to clients asking with the stats request, as JSON or in
+the Prometheus text format.
+"""
+import threading, time
+from common import codec
+
+# upper bounds of the latency histogram buckets in seconds
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+PHASES = ("process", "send")
+OPERATIONS = {"000": "put", "001": "get", "010": "change", "011": "help"}
+EXTENDED_NAMES = {value: name[4:].lower() for name, value in vars(codec).items() if name.startswith("EXT_")}
+
+def operationName(opcode, low):
+    """label of a request in the counters
+
+    Args:
+        opcode (str): request opcode
+        low (int): value of the 5 low bits, the sub operation of extended requests
+
+    Returns:
+        str: operation name
+    """
+    if opcode == codec.EXTENDED:
+        return EXTENDED_NAMES.get(low, f"extended_{low}")
+    if opcode == "011" and low:
+        return "hello"
+    return OPERATIONS.get(opcode, f"unknown_{opcode}")
+
+
+class Metrics:
+    def __init__(self):
+        """counters of a running server, safe to update from every worker
+        """
+        self.started = time.time()
+        self.requests = {}
+        self.errors = {}
+        self.received = 0
+        self.sent = 0
+        self.connections = 0
+        self.connectionsTotal = 0
+        self.live = set()
+        self.phases = {phase: [[0] * (len(BUCKETS) + 1), 0.0, 0] for phase in PHASES}
+        self.lock = threading.Lock()
+
+    def request(self, opcode, low):
+        """counts a received request
+
+        Args:
+            opcode (str): request opcode
+            low (int): value of the 5 low bits
+        """
+        name = operationName(opcode, low)
+        with self.lock:
+            self.requests[name] = self.requests.get(name, 0) + 1
+
+    def error(self, code):
+        """counts an error response
+
+        Args:
+            code (str): response code sent
+        """
+        with self.lock:
+            self.errors[code] = self.errors.get(code, 0) + 1
+
+    def observe(self, phase, seconds):
+        """adds the duration of a request phase to its histogram
+
+        Args:
+            phase (str): "process" or "send"
+            seconds (float): time the phase took
+        """
+        i = 0
+        while i < len(BUCKETS) and seconds > BUCKETS[i]:
+            i += 1
+        with self.lock:
+            counts, total, n = self.phases[phase]
+            counts[i] += 1
+            self.phases[phase][1] = total + seconds
+            self.phases[phase][2] = n + 1
+
+    def opened(self, traffic):
+        """counts a new connection
+
+        Args:
+            traffic (Traffic): byte counts of the connection
+        """
+        with self.lock:
+            self.connections += 1
+            self.connectionsTotal += 1
+            self.live.add(traffic)
+
+    def closed(self, traffic):
+        """counts a connection going away, its bytes join the totals
+
+        Args:
+            traffic (Traffic): byte counts of the connection
+        """
+        with self.lock:
+            self.connections -= 1
+            self.live.discard(traffic)
+            self.received += traffic.received
+            self.sent += traffic.sent
+
+    def snapshot(self, cache=None):
+        """copy of every counter
+
+        Args:
+            cache (dict, optional): file cache statistics to include. Defaults to None.
+
+        Returns:
+            dict: counters, the histograms hold the count of every bucket, not cumulative
+        """
+        with self.lock:
+            snap = {
+                "uptime": time.time() - self.started,
+                "requests": dict(self.requests),
+                "errors": dict(self.errors),
+                "bytesReceived": self.received + sum(traffic.received for traffic in self.live),
+                "bytesSent": self.sent + sum(traffic.sent for traffic in self.live),
+                "connections": self.connections,
+                "connectionsTotal": self.connectionsTotal,
+                "phases": {phase: {"buckets": list(BUCKETS), "counts": list(counts), "sum": total, "count": n}
+                           for phase, (counts, total, n) in self.phases.items()},
+            }
+        if cache is not None:
+            snap["cache"] = cache
+        return snap
+
+
+def prometheus(snap):
+    """formats a snapshot in the Prometheus text exposition format
+
+    Args:
+        snap (dict): snapshot from Metrics.snapshot
+
+    Returns:
+        str: metrics text
+    """
+    lines = []
+    def metric(name, kind, text, samples):
+        lines.append(f"# HELP ftp_{name} {text}")
+        lines.append(f"# TYPE ftp_{name} {kind}")
+        for labels, value in samples:
+            lines.append(f"ftp_{name}{labels} {value}")
+    metric("uptime_seconds", "gauge", "Seconds since the server started.", [("", snap["uptime"])])
+    metric("requests_total", "counter", "Requests received by operation.",
+           [(f'{{op="{op}"}}', n) for op, n in sorted(snap["requests"].items())])
+    metric("errors_total", "counter", "Error responses sent by response code.",
+           [(f'{{code="{code}"}}', n) for code, n in sorted(snap["errors"].items())])
+    metric("received_bytes_total", "counter", "Bytes received from clients.", [("", snap["bytesReceived"])])
+    metric("sent_bytes_total", "counter", "Bytes sent to clients.", [("", snap["bytesSent"])])
+    metric("connections", "gauge", "Open client connections.", [("", snap["connections"])])
+    metric("connections_total", "counter", "Client connections accepted.", [("", snap["connectionsTotal"])])
+    samples = []
+    for phase, h in snap["phases"].items():
+        cumulative = 0
+        for bound, n in zip(h["buckets"] + ["+Inf"], h["counts"]):
+            cumulative += n
+            samples.append((f'_bucket{{phase="{phase}",le="{bound}"}}', cumulative))
+        samples.append((f'_sum{{phase="{phase}"}}', h["sum"]))
+        samples.append((f'_count{{phase="{phase}"}}', h["count"]))
+    metric("request_phase_seconds", "histogram", "Time spent processing requests and sending responses.", samples)
+    if "cache" in snap:
+        metric("cache_events_total", "counter", "File cache lookups and evictions.",
+               [(f'{{event="{event}"}}', snap["cache"][event]) for event in ["hits", "misses", "evictions"]])
+        metric("cache_bytes", "gauge", "Bytes held by the file cache.", [("", snap["cache"]["bytes"])])
+    return "\n".join(lines) + "\n"
+
+
+class Traffic:
+    def __init__(self):
+        """bytes received and sent on one connection, only updated by whoever serves it
+        """
+        self.received = 0
+        self.sent = 0
+
+
+class CountingSocket:
+    def __init__(self, sock, traffic):
+        """socket wrapper counting the bytes that go through it, anything else is passed
+        on to the socket
+
+        Args:
+            sock (socket): client socket
+            traffic (Traffic): counts of the connection
+        """
+        self.sock = sock
+        self.traffic = traffic
+
+    def __getattr__(self, name):
+        return getattr(self.sock, name)
+
+    def recv(self, *args):
+        data = self.sock.recv(*args)
+        self.traffic.received += len(data)
+        return data
+
+    def recv_into(self, *args):
+        n = self.sock.recv_into(*args)
+        self.traffic.received += n
+        return n
+
+    def send(self, data, *args):
+        n = self.sock.send(data, *args)
+        self.traffic.sent += n
+        return n
+
+    def sendall(self, data, *args):
+        self.sock.sendall(data, *args)
+        self.traffic.sent += len(data)
+
+    def sendfile(self, *args):
+        n = self.sock.sendfile(*args)
+        self.traffic.sent += n
+        return n
+
+
+class CountingReader:
+    def __init__(self, reader, traffic):
+        """asyncio.StreamReader wrapper counting the bytes read
+
+        Args:
+            reader (asyncio.StreamReader): incoming stream of the client
+            traffic (Traffic): counts of the connection
+        """
+        self.reader = reader
+        self.traffic = traffic
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+    async def read(self, n=-1):
+        data = await self.reader.read(n)
+        self.traffic.received += len(data)
+        return data
+
+    async def readexactly(self, n):
+        data = await self.reader.readexactly(n)
+        self.traffic.received += len(data)
+        return data
+
+
+class CountingWriter:
+    def __init__(self, writer, traffic):
+        """asyncio.StreamWriter wrapper counting the bytes written, data sent with
+        loop.sendfile on the transport has to be counted by the caller
+
+        Args:
+            writer (asyncio.StreamWriter): outgoing stream of the client
+            traffic (Traffic): counts of the connection
+        """
+        self.writer = writer
+        self.traffic = traffic
+
+    def __getattr__(self, name):
+        return getattr(self.writer, name)
+
+    def write(self, data):
+        self.writer.write(data)
+        self.traffic.sent += len(data)
@@ -0,0 +1,156 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared progress file
+
+Progress of file transfers reported to a callback instead of drawn by the transfer loops.
+Loops add the bytes they moved to a Progress, which hands a Report with the bytes done, the
+total and the rate to its callback at most every INTERVAL seconds and once more when the
+transfer ends, so a file sent in a million pieces still costs a handful of callback calls.
+Without a callback the loops get NULL, whose update does nothing.
+
+The bars of the command line client come from TqdmProgress, tqdm is only imported once
+one is made so library users and servers never need it. Servers track nothing unless given
+a callback, --progress makes them log the reports through LogProgress.
+"""
+import time
+from collections import namedtuple
+
+# shortest time between two reports of the same transfer in seconds
+INTERVAL = 0.1
+
+Report = namedtuple("Report", ["name", "done", "total", "rate", "final"])
+Report.__doc__ = """progress of one transfer
+
+    name (str): what is being transferred, e.g. "sending a.txt"
+    done (int): bytes moved so far
+    total (int): bytes to move, None if unknown
+    rate (float): average bytes per second since the transfer started
+    final (bool): True on the last report of the transfer
+"""
+
+
+class Progress:
+    def __init__(self, callback, name, total, interval=INTERVAL):
+        """counts the bytes of one transfer and reports them at a bounded frequency
+
+        Args:
+            callback (function): called with a Report
+            name (str): what is being transferred
+            total (int): bytes to move, None if unknown
+            interval (float, optional): shortest time between reports. Defaults to INTERVAL.
+        """
+        self.callback = callback
+        self.name = name
+        self.total = total
+        self.interval = interval
+        self.done = 0
+        self.started = time.monotonic()
+        self.last = self.started
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, n):
+        """adds moved bytes, reports them if the last report is old enough
+
+        Args:
+            n (int): bytes moved since the last update
+        """
+        self.done += n
+        now = time.monotonic()
+        if now - self.last >= self.interval:
+            self.last = now
+            self._report(now, False)
+
+    def close(self):
+        """sends the final report, only the first call does anything
+        """
+        if not self.closed:
+            self.closed = True
+            self._report(time.monotonic(), True)
+
+    def _report(self, now, final):
+        elapsed = now - self.started
+        self.callback(Report(self.name, self.done, self.total, self.done / elapsed if elapsed else 0.0, final))
+
+
+class _Null:
+    """stands in for a Progress when nobody listens"""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def update(self, n):
+        pass
+
+    def close(self):
+        pass
+
+NULL = _Null()
+
+def track(callback, name, total):
+    """progress of a transfer for a callback that may be None
+
+    Args:
+        callback (function): called with a Report, None to not track the transfer
+        name (str): what is being transferred
+        total (int): bytes to move, None if unknown
+
+    Returns:
+        Progress: progress to update, NULL if callback is None
+    """
+    return NULL if callback is None else Progress(callback, name, total)
+
+
+class TqdmProgress:
+    def __init__(self, **options):
+        """progress callback drawing a tqdm bar for every transfer, on one line at a time
+
+        Args:
+            options: passed on to every tqdm bar
+        """
+        from tqdm import tqdm
+        self.tqdm = tqdm
+        self.options = dict(unit='B', unit_scale=True, unit_divisor=1024, **options)
+        self.bar = None
+
+    def __call__(self, report):
+        """moves the bar to the reported bytes, closing it after the final report
+
+        Args:
+            report (Report): progress of the transfer
+        """
+        if self.bar is None:
+            self.bar = self.tqdm(total=report.total, desc=report.name, **self.options)
+        self.bar.update(report.done - self.bar.n)
+        if report.final:
+            self.bar.close()
+            self.bar = None
+
+
+class LogProgress:
+    def __init__(self, logger):
+        """progress callback writing every report to a logger, for servers without a terminal
+
+        Args:
+            logger (logging.Logger): logger the reports go to at info level
+        """
+        self.logger = logger
+
+    def __call__(self, report):
+        """logs a report
+
+        Args:
+            report (Report): progress of the transfer
+        """
+        total = "?" if report.total is None else report.total
+        state = "done" if report.final else "at"
+        self.logger.info(f"{report.name} {state} {report.done}/{total} bytes, {report.rate / (1 << 20):.1f} MB/s")
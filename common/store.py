@@ -0,0 +1,148 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared content addressed store file
+
+Every file the server stores is a hard link to a blob named after the blake2b digest of its
+contents, so identical uploads under different names share one copy on disk and everything
+reading a file by name keeps working unchanged. The server never writes into a stored file,
+uploads go to partial files that replace the name once complete, so a blob never changes
+under the names linked to it. A blob no name links to any more is removed by collect. The
+server feeds the digest of an upload while writing it, so storing it doesn't read it again.
+"""
+import hashlib, os
+
+DIGEST_SIZE = 32
+
+def new():
+    """new digest of the kind blobs are named after
+
+    Returns:
+        hashlib.blake2b: digest
+    """
+    return hashlib.blake2b(digest_size=DIGEST_SIZE)
+
+def digestFile(file, bufferSize=65536):
+    """digest of a file, read one buffer at a time
+
+    Args:
+        file (file): file open for reading at its start
+        bufferSize (int, optional): size of every read. Defaults to 65536.
+
+    Returns:
+        bytes: digest
+    """
+    h = new()
+    buf = memoryview(bytearray(bufferSize))
+    n = file.readinto(buf)
+    while n:
+        h.update(buf[:n])
+        n = file.readinto(buf)
+    return h.digest()
+
+
+class Store:
+    def __init__(self, root):
+        """blobs kept in root, spread over subdirectories by the first byte of their digest.
+        root has to be on the same filesystem as the files served
+
+        Args:
+            root (str): store directory
+        """
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest):
+        """path of the blob holding the contents with a digest
+
+        Args:
+            digest (bytes): digest of the contents
+
+        Returns:
+            str: blob path
+        """
+        name = digest.hex()
+        return os.path.join(self.root, name[:2], name)
+
+    def has(self, digest, size):
+        """whether the store holds contents with a digest and size
+
+        Args:
+            digest (bytes): digest of the contents
+            size (int): size of the contents
+
+        Returns:
+            bool: True if a blob is held
+        """
+        try:
+            return os.path.getsize(self.path(digest)) == size
+        except OSError:
+            return False
+
+    def link(self, digest, fn):
+        """makes fn a name of a held blob, replacing whatever fn was. A name that links to
+        the blob already is left alone, replacing a link with another link to the same inode
+        does nothing and would leave the temporary name behind
+
+        Args:
+            digest (bytes): digest of the contents
+            fn (str): filename
+        """
+        blob = self.path(digest)
+        try:
+            if os.path.samefile(blob, fn):
+                return
+        except FileNotFoundError:
+            pass
+        # unique per call so concurrent links of the same name don't collide
+        tmp = f"{fn}.{os.urandom(8).hex()}.link"
+        try:
+            os.link(blob, tmp)
+            os.replace(tmp, fn)
+        finally:
+            try:
+                os.remove(tmp)
+            except FileNotFoundError:
+                pass
+
+    def intern(self, fn, digest=None, bufferSize=65536):
+        """stores a completely written file, it becomes the blob of its contents or, if the
+        contents are held already, a link to the existing blob
+
+        Args:
+            fn (str): filename
+            digest (bytes, optional): digest taken while the file was written, the file is
+                read to take it if None. Defaults to None.
+            bufferSize (int, optional): size of every read. Defaults to 65536.
+
+        Returns:
+            bytes: digest of the contents
+        """
+        if digest is None:
+            with open(fn, 'rb') as file:
+                digest = digestFile(file, bufferSize)
+        blob = self.path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(fn, blob)
+        except FileExistsError:
+            if not os.path.samefile(fn, blob):
+                self.link(digest, fn)
+        return digest
+
+    def collect(self):
+        """removes every blob no name links to any more
+
+        Returns:
+            int: number of blobs removed
+        """
+        removed = 0
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            for blob in os.scandir(entry.path):
+                if blob.stat().st_nlink == 1:
+                    os.remove(blob.path)
+                    removed += 1
+        return removed
@@ -0,0 +1,204 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared tracing file
+
+Opt-in timing spans and cProfile samples for finding out where a slow transfer spends its
+time. Spans are written in the Chrome trace event format, a JSON array of complete events
+that chrome://tracing, Perfetto and speedscope open as they are. Nothing is patched unless
+tracing is turned on: instrument replaces the named methods with timed wrappers when it is
+called, so a server or client started without a tracer runs exactly the code it always did.
+
+Tracing is turned on with the FTP_TRACE environment variable naming the trace file, or the
+--trace flag of the servers. Per connection cProfile dumps are turned on with FTP_PROFILE or
+--profile naming a directory, FTP_PROFILE_RATE or --profile-rate sets the share of
+connections that are profiled.
+"""
+import atexit, cProfile, functools, inspect, itertools, json, os, random, threading, time
+import asyncio
+
+TRACE_ENV = "FTP_TRACE"
+PROFILE_ENV = "FTP_PROFILE"
+PROFILE_RATE_ENV = "FTP_PROFILE_RATE"
+
+_tracers = {}
+_lock = threading.Lock()
+
+
+class Tracer:
+    def __init__(self, path):
+        """writes spans to a trace file as they end, one line each so a server that is
+        killed leaves every finished span behind. Trace viewers accept the array without
+        its closing bracket
+
+        Args:
+            path (str): trace file
+        """
+        self.file = open(path, 'w', buffering=1)
+        self.file.write("[\n")
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.origin = time.perf_counter()
+        atexit.register(self.close)
+
+    def event(self, name, category, start, end, tid):
+        """writes one complete span
+
+        Args:
+            name (str): span name
+            category (str): span category, "server", "client" or "recv"
+            start (float): perf_counter when the span began
+            end (float): perf_counter when the span ended
+            tid (int): track the span is drawn on, a thread or an asyncio task
+        """
+        line = json.dumps({"name": name, "cat": category, "ph": "X", "pid": self.pid, "tid": tid,
+                           "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6})
+        with self.lock:
+            if not self.file.closed:
+                self.file.write(line + ",\n")
+
+    def close(self):
+        """flushes and closes the trace file
+        """
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+class Profiler:
+    def __init__(self, directory, rate=1.0):
+        """picks the connections to profile and dumps their cProfile stats
+
+        Args:
+            directory (str): directory the .prof files are written to
+            rate (float, optional): share of connections profiled. Defaults to 1.0.
+        """
+        self.directory = directory
+        self.rate = rate
+        self.counter = itertools.count()
+        os.makedirs(directory, exist_ok=True)
+
+    def sample(self):
+        """a profile for a new connection, if it is picked
+
+        Returns:
+            cProfile.Profile: profile to enable while the connection is served, None if not picked
+        """
+        return cProfile.Profile() if random.random() < self.rate else None
+
+    def dump(self, profile, label):
+        """writes the stats of a profile, they load with pstats or snakeviz
+
+        Args:
+            profile (cProfile.Profile): profile of a connection
+            label (str): start of the filename
+        """
+        profile.dump_stats(os.path.join(self.directory, f"{label}-{os.getpid()}-{next(self.counter)}.prof"))
+
+
+def tracer(path=None):
+    """the tracer writing to a file, shared by everything tracing to the same file
+
+    Args:
+        path (str, optional): trace file. Defaults to the FTP_TRACE environment variable.
+
+    Returns:
+        Tracer: tracer, None if tracing is off
+    """
+    path = path or os.environ.get(TRACE_ENV)
+    if not path:
+        return None
+    with _lock:
+        if path not in _tracers:
+            _tracers[path] = Tracer(path)
+        return _tracers[path]
+
+def profiler(directory=None, rate=None):
+    """the profiler sampling connections into a directory
+
+    Args:
+        directory (str, optional): directory for the dumps. Defaults to the FTP_PROFILE environment variable.
+        rate (float, optional): share of connections profiled. Defaults to FTP_PROFILE_RATE or 1.
+
+    Returns:
+        Profiler: profiler, None if profiling is off
+    """
+    directory = directory or os.environ.get(PROFILE_ENV)
+    if not directory:
+        return None
+    if rate is None:
+        rate = float(os.environ.get(PROFILE_RATE_ENV, 1.0))
+    return Profiler(directory, rate)
+
+def enable(profile):
+    """starts a profile on the current thread, profilers that can't run next to another
+    one are skipped instead of failing the request
+
+    Args:
+        profile (cProfile.Profile): profile to enable
+
+    Returns:
+        bool: True if the profile is running
+    """
+    try:
+        profile.enable()
+        return True
+    except ValueError:
+        return False
+
+def instrument(target, names, tracer, category):
+    """replaces methods of an object, or functions of a class or module, with wrappers
+    writing a span for every call. Methods that are wrapped already are left as they are
+
+    Args:
+        target (object): instance, class or module
+        names (list[str]): attributes to wrap
+        tracer (Tracer): tracer the spans go to
+        category (str): category and name prefix of the spans
+    """
+    for name in names:
+        fn = getattr(target, name)
+        if getattr(fn, "traced", False):
+            continue
+        setattr(target, name, _wrap(fn, f"{category}.{name.lstrip('_')}", category, tracer))
+
+def _track():
+    """the track a coroutine's spans are drawn on, its task, so concurrent connections
+    served on the same thread don't overlap
+
+    Returns:
+        int: track id
+    """
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) if task is not None else threading.get_ident()
+
+def _wrap(fn, name, category, tracer):
+    """timed wrapper of a function or coroutine function
+
+    Returns:
+        function: wrapper
+    """
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def timedCoroutine(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                tracer.event(name, category, start, time.perf_counter(), _track())
+        timedCoroutine.traced = True
+        return timedCoroutine
+
+    @functools.wraps(fn)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            tracer.event(name, category, start, time.perf_counter(), threading.get_ident())
+    timed.traced = True
+    return timed
@@ -0,0 +1,171 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared tree transfer file
+
+A directory tree goes as one stream of entries, tar style. Every entry is an ENTRY struct
+holding its kind, its size and the length of its path relative to the root, followed by the
+path and, for files, the contents. Directories come before what they hold and END closes the
+stream. Small files are gathered with their headers into buffers of about bufferSize bytes so
+thousands of them cost a few sends, larger ones go with sendfile.
+"""
+import os, struct
+from common import checksum
+
+# kind, file size and path length of an entry, the path and the contents follow
+ENTRY = struct.Struct('>BQH')
+KIND_END = 0
+KIND_DIR = 1
+KIND_FILE = 2
+END = ENTRY.pack(KIND_END, 0, 0)
+
+def walk(root):
+    """every directory and file below root, a directory before its contents. Symlinks are
+    skipped, so a tree never sends what lies outside it
+
+    Args:
+        root (str): directory to walk
+
+    Yields:
+        tuple(int,str,str,int): kind, path relative to root with / separators, path and file size
+    """
+    stack = [("", root)]
+    while stack:
+        rel, path = stack.pop()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+        for each in entries:
+            name = f"{rel}{each.name}"
+            if each.is_dir(follow_symlinks=False):
+                yield KIND_DIR, name, each.path, 0
+                stack.append((f"{name}/", each.path))
+            elif each.is_file(follow_symlinks=False):
+                yield KIND_FILE, name, each.path, each.stat(follow_symlinks=False).st_size
+
+def header(kind, name, size=0):
+    """packs the header of an entry
+
+    Args:
+        kind (int): KIND_DIR or KIND_FILE
+        name (str): path relative to the root
+        size (int, optional): file size. Defaults to 0.
+
+    Returns:
+        bytes: header followed by the path
+    """
+    raw = name.encode('utf-8', 'surrogateescape')
+    return ENTRY.pack(kind, size, len(raw)) + raw
+
+def stream(root, bufferSize=65536):
+    """what has to be sent for a tree, files smaller than bufferSize are read and gathered
+    with the headers while larger ones are left to the caller to send with sendfile
+
+    Args:
+        root (str): directory to send
+        bufferSize (int, optional): size of the gathered buffers. Defaults to 65536.
+
+    Yields:
+        bytes/tuple(str,int): a buffer to send as it is, or the path and size of a file to
+            send right after the buffers before it
+    """
+    buf = bytearray()
+    for kind, name, path, size in walk(root):
+        if kind == KIND_FILE and size < bufferSize:
+            with open(path, 'rb') as file:
+                data = file.read(size)
+            buf += header(kind, name, len(data))
+            buf += data
+        else:
+            buf += header(kind, name, size)
+            if kind == KIND_FILE:
+                yield bytes(buf)
+                buf.clear()
+                yield path, size
+                continue
+        if len(buf) >= bufferSize:
+            yield bytes(buf)
+            buf.clear()
+    buf += END
+    yield bytes(buf)
+
+def sendTree(sock, root, bufferSize=65536):
+    """sends a tree as one stream of entries
+
+    Args:
+        sock (socket): socket to send on
+        root (str): directory to send
+        bufferSize (int, optional): size of the gathered buffers. Defaults to 65536.
+
+    Returns:
+        int: number of bytes sent
+    """
+    sent = 0
+    for each in stream(root, bufferSize):
+        if isinstance(each, bytes):
+            sock.sendall(each)
+            sent += len(each)
+            continue
+        path, size = each
+        with open(path, 'rb') as file:
+            n = sock.sendfile(file, 0, size)
+        if n != size:
+            raise OSError(f"{path} changed size while being sent, sent {n} of {size} bytes")
+        sent += n
+    return sent
+
+def target(root, name):
+    """local path of an entry, paths leaving the root are refused
+
+    Args:
+        root (str): directory the tree is written to
+        name (str): path relative to the root with / separators
+
+    Returns:
+        str: path
+    """
+    parts = name.split("/")
+    if not name or name.startswith("/") or any(part in ["", ".", ".."] for part in parts):
+        raise ValueError(f"tree entry {name!r} leaves the root")
+    return os.path.join(root, *parts)
+
+def recvTree(receiver, root, partName, install, bufferSize=65536, newDigest=None):
+    """receives a tree, directories are made and files written as their entries arrive.
+    Every file is written to a partial file first and installed once complete
+
+    Args:
+        receiver (framing.Receiver): buffered receiver of the connection
+        root (str): directory the tree is written to
+        partName (function): returns the partial filename for a path
+        install (function): called with the partial filename and the path of a complete file,
+            and the digest of its contents if newDigest is given
+        bufferSize (int, optional): size of the receive buffer. Defaults to 65536.
+        newDigest (function, optional): returns a digest fed with every file as it is
+            written. Defaults to None.
+
+    Returns:
+        int: number of files received
+    """
+    os.makedirs(root, exist_ok=True)
+    files = 0
+    while True:
+        kind, size, n = ENTRY.unpack(receiver.recvExact(ENTRY.size))
+        if kind == KIND_END:
+            return files
+        path = target(root, receiver.recvExact(n).decode('utf-8', 'surrogateescape'))
+        if kind == KIND_DIR:
+            os.makedirs(path, exist_ok=True)
+            continue
+        if kind != KIND_FILE:
+            raise ValueError(f"unknown tree entry {kind}")
+        part = partName(path)
+        if newDigest is None:
+            with open(part, 'wb') as file:
+                receiver.recvToFile(file, size, bufferSize)
+            install(part, path)
+        else:
+            hasher = newDigest()
+            with open(part, 'wb') as file:
+                receiver.recvToFile(checksum.Writer(file, hasher), size, bufferSize)
+            install(part, path, hasher)
+        files += 1
@@ -0,0 +1,201 @@
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared tuning file
+
+Transfer tuning: the chunk size a connection reads, writes and sendfiles framed transfers
+in, its socket buffer sizes and its TCP options. Every side has Settings of its own, a
+client may offer its settings to the server with a tune request and both go on with the
+values they agreed on. Settings of 0 mean no preference, a zero chunk size in the request
+or reply stands for auto tuning, where an AutoTuner grows the chunk size as long as it makes
+transfers faster.
+
+Small control requests and responses go out straight away with TCP_NODELAY, so a request
+never waits on Nagle's algorithm for the delayed ACK of the one before. Bulk data is sent
+inside cork, which holds partial segments back until the header and the file that follows
+it can leave in full sized ones.
+
+The chunk size of the legacy framing is part of its wire format and stays at 1024 bytes.
+"""
+import socket
+from contextlib import contextmanager
+
+MIN_CHUNK = 16 << 10
+MAX_CHUNK = 4 << 20
+DEFAULT_CHUNK = 64 << 10
+# a transfer has to be this many chunks long for its throughput to say anything
+MIN_SAMPLE = 8
+# the smallest speedup a bigger chunk size has to bring to be kept
+MIN_GAIN = 1.05
+# measured transfers at a settled chunk size before the next size up is tried again
+REPROBE = 32
+
+# TCP_CORK on Linux, TCP_NOPUSH on the BSDs and macOS
+CORK = getattr(socket, "TCP_CORK", None) or getattr(socket, "TCP_NOPUSH", None)
+
+
+class Settings:
+    def __init__(self, chunkSize=DEFAULT_CHUNK, sndbuf=0, rcvbuf=0, nodelay=True, auto=False):
+        """tuning of one side of a connection
+
+        Args:
+            chunkSize (int, optional): bytes read, written or sent at a time. Defaults to DEFAULT_CHUNK.
+            sndbuf (int, optional): SO_SNDBUF in bytes, 0 keeps the system default. Defaults to 0.
+            rcvbuf (int, optional): SO_RCVBUF in bytes, 0 keeps the system default. Defaults to 0.
+            nodelay (bool, optional): whether to set TCP_NODELAY and cork bulk data. Defaults to True.
+            auto (bool, optional): whether to tune the chunk size from measured throughput,
+                starting from chunkSize. Defaults to False.
+        """
+        self.chunkSize = clamp(chunkSize)
+        self.sndbuf = sndbuf
+        self.rcvbuf = rcvbuf
+        self.nodelay = nodelay
+        self.auto = auto
+
+    def __repr__(self):
+        return f"Settings(chunkSize={self.chunkSize}, sndbuf={self.sndbuf}, rcvbuf={self.rcvbuf}, nodelay={self.nodelay}, auto={self.auto})"
+
+    def isDefault(self):
+        """whether there is nothing to offer the other side
+
+        Returns:
+            bool: True for the settings every side starts with
+        """
+        return self.chunkSize == DEFAULT_CHUNK and not (self.sndbuf or self.rcvbuf or self.auto)
+
+
+def clamp(chunkSize):
+    """keeps a chunk size between MIN_CHUNK and MAX_CHUNK
+
+    Args:
+        chunkSize (int): requested chunk size
+
+    Returns:
+        int: usable chunk size
+    """
+    return max(MIN_CHUNK, min(MAX_CHUNK, chunkSize))
+
+def agree(ours, theirs):
+    """the value two sides agree on, the smaller one unless a side has no preference
+
+    Args:
+        ours (int): our value, 0 for no preference
+        theirs (int): the other side's value, 0 for no preference
+
+    Returns:
+        int: agreed value, 0 if neither side cares
+    """
+    return min(ours, theirs) if ours and theirs else ours or theirs
+
+def configure(sock, sndbuf=0, rcvbuf=0, nodelay=True):
+    """applies socket options, options the platform doesn't have are left alone. Buffers
+    have to be set before connect or listen for the window scale to account for them
+
+    Args:
+        sock (socket): TCP socket
+        sndbuf (int, optional): SO_SNDBUF in bytes, 0 to keep it. Defaults to 0.
+        rcvbuf (int, optional): SO_RCVBUF in bytes, 0 to keep it. Defaults to 0.
+        nodelay (bool, optional): TCP_NODELAY. Defaults to True.
+    """
+    options = [(socket.SOL_SOCKET, socket.SO_SNDBUF, sndbuf), (socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)]
+    options = [each for each in options if each[2]]
+    options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, int(nodelay)))
+    for level, option, value in options:
+        try:
+            sock.setsockopt(level, option, value)
+        except OSError:
+            pass
+
+def buffers(sock):
+    """socket buffer sizes the kernel settled on, Linux reports double what was asked for
+
+    Args:
+        sock (socket): TCP socket
+
+    Returns:
+        tuple(int,int): SO_SNDBUF and SO_RCVBUF
+    """
+    return sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF), sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+
+@contextmanager
+def cork(sock, enabled=True):
+    """holds back partial segments while the block runs and flushes them at its end, so a
+    header written just before a file doesn't leave in a segment of its own
+
+    Args:
+        sock (socket): TCP socket
+        enabled (bool, optional): False to run the block uncorked. Defaults to True.
+    """
+    if not enabled or CORK is None:
+        yield
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, CORK, 1)
+    except OSError:
+        yield
+        return
+    try:
+        yield
+    finally:
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, CORK, 0)
+        except OSError:
+            pass
+
+
+class AutoTuner:
+    def __init__(self, chunkSize=DEFAULT_CHUNK, minimum=MIN_CHUNK, maximum=MAX_CHUNK):
+        """grows the chunk size of a connection while transfers get faster from it. Every
+        transfer long enough to be measured is compared with the best rate so far, the chunk
+        size doubles as long as that pays off by MIN_GAIN and goes back to the last size
+        that did once it stops paying off. The network and the load change over the life of
+        a connection, so after REPROBE measured transfers at that size the next size up is
+        tried again against the rate of the latest one
+
+        Args:
+            chunkSize (int, optional): starting chunk size. Defaults to DEFAULT_CHUNK.
+            minimum (int, optional): smallest chunk size. Defaults to MIN_CHUNK.
+            maximum (int, optional): largest chunk size. Defaults to MAX_CHUNK.
+        """
+        self.chunkSize = chunkSize
+        self.minimum = minimum
+        self.maximum = maximum
+        self.best = 0.0
+        self.bestSize = chunkSize
+        self.settled = False
+        self.settledFor = 0
+
+    def observe(self, nbytes, seconds):
+        """takes the throughput of a finished transfer into account
+
+        Args:
+            nbytes (int): bytes transferred
+            seconds (float): time the transfer took
+
+        Returns:
+            int: chunk size for the next transfer
+        """
+        if seconds <= 0 or nbytes < self.chunkSize * MIN_SAMPLE:
+            return self.chunkSize
+        rate = nbytes / seconds
+        if self.settled:
+            self.settledFor += 1
+            if self.settledFor < REPROBE or self.chunkSize >= self.maximum:
+                return self.chunkSize
+            self.settled = False
+            self.best = rate
+            self.bestSize = self.chunkSize
+            self.chunkSize = min(self.maximum, self.chunkSize * 2)
+            return self.chunkSize
+        if rate >= self.best * MIN_GAIN and self.chunkSize < self.maximum:
+            self.best = rate
+            self.bestSize = self.chunkSize
+            self.chunkSize = min(self.maximum, self.chunkSize * 2)
+            return self.chunkSize
+        if rate > self.best:
+            self.bestSize = self.chunkSize
+        self.chunkSize = self.bestSize
+        self.settled = True
+        self.settledFor = 0
+        return self.chunkSize
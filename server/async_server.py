@@ -0,0 +1,745 @@
+import asyncio, argparse, cProfile, logging, os, time, constants
+from concurrent.futures import ThreadPoolExecutor
+from server import Server, Connection
+from common import checksum, chunking, codec, compression, delta, framing, metrics, progress, tracing, tree, tuning
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+asyncio server script file
+"""
+
+class AsyncConnection(Connection):
+    def __init__(self, reader, writer):
+        """state of a single client connection served by the asyncio server
+
+        Args:
+            reader (asyncio.StreamReader): incoming stream of the client
+            writer (asyncio.StreamWriter): outgoing stream of the client
+        """
+        super().__init__(writer.get_extra_info('socket'), writer.get_extra_info('peername'))
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        """closes the client stream, ignoring errors from an already dead peer
+        """
+        try:
+            self.writer.close()
+        except OSError:
+            pass
+
+
+class AsyncServer(Server):
+    def __init__(self, port, loglevel=0, workers=constants.DEFAULT_WORKERS, storeDir=None, cacheSize=constants.CACHE_SIZE,
+                 trace=None, profile=None, progress=None, tune=None):
+        """ftp server speaking the same protocol as Server on top of asyncio streams,
+        every connection is a coroutine and disk work runs in a thread pool executor
+
+        Args:
+            port (str): port number for the server
+            loglevel (int, optional): logging level. Defaults to 0.
+            workers (int, optional): size of the executor used for file I/O. Defaults to constants.DEFAULT_WORKERS.
+            storeDir (str, optional): directory of the content addressed store. Defaults to None.
+            cacheSize (int, optional): bytes of small files kept in memory for get. Defaults to constants.CACHE_SIZE.
+            trace (str, optional): file to write timing spans to. Defaults to the FTP_TRACE environment variable.
+            profile (str, optional): directory to write a cProfile dump of the event loop to when the
+                server stops, connections share the loop so they aren't profiled one by one.
+                Defaults to the FTP_PROFILE environment variable.
+            progress (function, optional): called with a progress.Report of every plain file sent
+                or received, on the event loop. Defaults to None.
+            tune (tuning.Settings, optional): chunk size, socket buffers and TCP options of the
+                connections. Defaults to tuning.Settings().
+        """
+        super().__init__(port, loglevel, workers=workers, storeDir=storeDir, cacheSize=cacheSize, trace=trace, profile=profile,
+                         progress=progress, tune=tune)
+
+    def operate(self):
+        """Entry function for the user
+        """
+        asyncio.run(self._serve())
+
+    async def _serve(self):
+        """binds the listening socket and serves connections until cancelled
+        """
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=self.workers))
+        self.server.bind((self.host, self.port))
+        self.server.listen(constants.LISTEN_BACKLOG)
+        srv = await asyncio.start_server(self._initiateSocket, sock=self.server)
+        self.logger.info(f'Listening on {self.host}:{self.port} with asyncio')
+        profile = cProfile.Profile() if self.profiler is not None else None
+        profiling = profile is not None and tracing.enable(profile)
+        try:
+            async with srv:
+                await srv.serve_forever()
+        finally:
+            if profiling:
+                profile.disable()
+                self.profiler.dump(profile, "loop")
+
+    async def _initiateSocket(self, reader, writer):
+        """Main coroutine after connection to a client
+
+        Args:
+            reader (asyncio.StreamReader): incoming stream of the client
+            writer (asyncio.StreamWriter): outgoing stream of the client
+        """
+        traffic = metrics.Traffic()
+        self.metrics.opened(traffic)
+        conn = AsyncConnection(metrics.CountingReader(reader, traffic), metrics.CountingWriter(writer, traffic))
+        conn.traffic = traffic
+        self._tuneConnection(conn)
+        self.logger.info(f'Connected to {conn.addr}')
+        try:
+            while await self._serveRequest(conn):
+                continue
+        except (OSError, asyncio.IncompleteReadError) as e:
+            self.logger.info(f'Connection to {conn.addr} lost: {e}')
+        except Exception:
+            self.logger.exception(f'Failed serving {conn.addr}')
+        self._close(conn)
+
+    async def _serveRequest(self, conn):
+        """receives, processes and answers a single request from the client
+
+        Args:
+            conn (AsyncConnection): connection with the client
+
+        Returns:
+            bool: False if the client disconnected
+        """
+        conn.BUFFER = []
+        fb = await conn.reader.read(1)
+        if not fb:
+            self.logger.info(f'Disconnected from {conn.addr}')
+            if self.cache is not None:
+                self.logger.debug(f'File cache {self.cache.stats()}')
+            return False
+        process, FL = self._getOp(conn, fb)
+        self.logger.debug(f"new request {process} {FL}")
+        self.metrics.request(process, FL)
+        if process == "000":
+            if conn.version >= framing.VERSION_FRAMED:
+                conn.BUFFER = [fb + await conn.reader.readexactly(codec.headerSize(FL, conn.version >= framing.VERSION_WIDE)-1)]
+            else:
+                conn.BUFFER = [fb + await conn.reader.readexactly(self.ChunkSize-1)]
+        elif process == "001":
+            conn.BUFFER = [fb + await conn.reader.readexactly(FL)]
+        elif process == "010":
+            part = await conn.reader.readexactly(FL+1)
+            FLN = int(part[len(part)-1])
+            conn.BUFFER = [fb + part + await conn.reader.readexactly(FLN)]
+        elif process == "011":
+            conn.BUFFER = [fb]
+        elif process == codec.EXTENDED and conn.version >= framing.VERSION_FRAMED:
+            size = await conn.reader.readexactly(codec.SIZE.size)
+            conn.BUFFER = [fb + size + await conn.reader.readexactly(codec.unpackSize(size))]
+        else:
+            self.logger.info(f"Unknown request {process}")
+            await self._sendError("011", conn)
+            return True
+        self.logger.info("Finished receiving request.")
+        start = time.perf_counter()
+        code = await self._processRequest(conn)
+        processed = time.perf_counter()
+        await self._sendResponse(code, conn)
+        self.metrics.observe("process", processed - start)
+        self.metrics.observe("send", time.perf_counter() - processed)
+        return True
+
+    async def _processRequest(self, conn):
+        """runs the blocking request processing of Server in the executor so disk
+        access never stalls the event loop, uploads are streamed by the coroutine itself
+
+        Args:
+            conn (AsyncConnection): connection the request came from
+
+        Returns:
+            str: response code
+        """
+        operation, FL = self._getOp(conn)
+        if operation == "000":
+            await self._handlePut(conn, FL)
+            return operation
+        if operation == codec.EXTENDED and FL == codec.EXT_RANGE_PUT:
+            return await self._handleRangePut(conn)
+        if operation == codec.EXTENDED and FL == codec.EXT_RESUME_PUT:
+            return await self._handleResumePut(conn)
+        if operation == codec.EXTENDED and FL == codec.EXT_COMPRESSED_PUT:
+            return await self._handleCompressedPut(conn)
+        if operation == codec.EXTENDED and FL == codec.EXT_DELTA_PUT:
+            return await self._handleDeltaPut(conn)
+        if operation == codec.EXTENDED and FL == codec.EXT_TREE_PUT:
+            return await self._handleTreePut(conn)
+        if operation == codec.EXTENDED and FL == codec.EXT_CHECKED_PUT:
+            return await self._handleCheckedPut(conn)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, Server._processRequest, self, conn)
+
+    async def _handlePut(self, conn, fl):
+        """handle the backend processing for put request
+
+        Args:
+            conn (AsyncConnection): client connection
+            fl (int): filename length
+        """
+        wide = conn.version >= framing.VERSION_WIDE
+        opcode, fn, fs = codec.unpackHeader(conn.BUFFER[0], wide)
+        await self._getFile(conn, codec.headerSize(fl, wide), fn, fs)
+
+    async def _handleCompressedPut(self, conn):
+        """handle a put request offering a compressed transfer, the server answers with the
+        codec it accepts, or an empty name if it doesn't know the codec
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            str: response code
+        """
+        codecName, fn, fs = codec.unpackCompressed(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        if codecName not in compression.CODECS:
+            codecName = ""
+        conn.writer.write(codec.packCompressedReply(codec.EXT_COMPRESSED_PUT, codecName, wide=conn.version >= framing.VERSION_WIDE))
+        await conn.writer.drain()
+        conn.compression = codecName or None
+        try:
+            await self._getFile(conn, len(conn.BUFFER[0]), fn, fs)
+        finally:
+            conn.compression = None
+        return "000"
+
+    async def _handleCheckedPut(self, conn):
+        """handle a put request offering a digest trailer, the digest is fed in the executor
+        together with the writes and an upload that doesn't match it is thrown away
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            str: response code
+        """
+        loop = asyncio.get_running_loop()
+        wide = conn.version >= framing.VERSION_WIDE
+        algorithm, fn, fs = codec.unpackChecked(conn.BUFFER[0], wide)
+        if algorithm not in checksum.ALGORITHMS:
+            algorithm = ""
+        conn.writer.write(codec.packCheckedReply(codec.EXT_CHECKED_PUT, algorithm, wide=wide))
+        await conn.writer.drain()
+        if not algorithm:
+            await self._getFile(conn, len(conn.BUFFER[0]), fn, fs)
+            return "000"
+        hasher = checksum.new(algorithm)
+        part = self._getPartialName(conn, fn)
+        file = await loop.run_in_executor(None, open, part, 'wb')
+        target, stored = self._digesting(file)
+        try:
+            await self._recvFile(conn, checksum.Writer(target, hasher), fs, b'')
+            trailer = await conn.reader.readexactly(checksum.digestSize(algorithm))
+        except BaseException:
+            await loop.run_in_executor(None, file.close)
+            await loop.run_in_executor(None, os.replace, part, self._getResumeName(fn))
+            raise
+        await loop.run_in_executor(None, file.close)
+        if hasher.digest() != trailer:
+            await loop.run_in_executor(None, os.remove, part)
+            self.logger.warning(f"{fn} failed its {algorithm} check, upload dropped")
+            return "100"
+        await loop.run_in_executor(None, self._install, part, fn, stored)
+        return "000"
+
+    async def _getFile(self, conn, offset, fn, fs):
+        """writes an upload to a partial file while it is being received, the partial file
+        replaces fn once the whole upload arrived or is kept as the resumable partial file
+        of fn if it breaks off
+
+        Args:
+            conn (AsyncConnection): client connection
+            offset (int): offset of bytes where the file starts in the buffered request
+            fn (str): filename
+            fs (int): file size in bytes
+        """
+        loop = asyncio.get_running_loop()
+        part = self._getPartialName(conn, fn)
+        file = await loop.run_in_executor(None, open, part, 'wb')
+        target, hasher = self._digesting(file)
+        try:
+            await self._recvFile(conn, target, fs, conn.BUFFER[0][offset:])
+        except BaseException:
+            await loop.run_in_executor(None, file.close)
+            await loop.run_in_executor(None, os.replace, part, self._getResumeName(fn))
+            raise
+        await loop.run_in_executor(None, file.close)
+        await loop.run_in_executor(None, self._install, part, fn, hasher)
+
+    async def _handleRangePut(self, conn):
+        """handle a range put request, the range is written at its offset in the partial
+        file shared by every connection uploading a range of the same file. Ranges that don't
+        fit the upload are read and dropped like in Server._handleRangePut
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            str: response code
+        """
+        fn, offset, length, fs = codec.unpackRange(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        loop = asyncio.get_running_loop()
+        part, upload, file = await loop.run_in_executor(None, self._openRangePart, fn, offset, length, fs)
+        if file is None:
+            file = await loop.run_in_executor(None, open, os.devnull, 'wb')
+            try:
+                await self._recvFile(conn, file, length, b'')
+            finally:
+                await loop.run_in_executor(None, file.close)
+            self.logger.warning(f"Range {offset}+{length} of {fn} doesn't fit a file of {fs} bytes, dropped")
+            return "010"
+        try:
+            await self._recvFile(conn, file, length, b'')
+        except BaseException:
+            await loop.run_in_executor(None, file.close)
+            await loop.run_in_executor(None, self._dropRanges, part, upload)
+            raise
+        await loop.run_in_executor(None, file.close)
+        await loop.run_in_executor(None, self._rangeReceived, part, upload, fn, offset, length)
+        return "000"
+
+    async def _handleResumePut(self, conn):
+        """handle a resumed upload, the data from offset on is appended to the resumable
+        partial file which replaces fn once it reaches the announced file size
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            str: response code
+        """
+        fn, offset, length, fs = codec.unpackRange(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        loop = asyncio.get_running_loop()
+        file = await loop.run_in_executor(None, self._openResumePart, fn, offset)
+        code = "000"
+        if file is None:
+            file = await loop.run_in_executor(None, open, os.devnull, 'wb')
+            code = "010"
+        try:
+            await self._recvFile(conn, file, length, b'')
+        finally:
+            await loop.run_in_executor(None, file.close)
+        if code == "000" and offset + length == fs:
+            await loop.run_in_executor(None, self._install, self._getResumeName(fn), fn)
+        return code
+
+    async def _handleDeltaPut(self, conn):
+        """handle a delta put, the new file is rebuilt in a partial file from blocks of the
+        server's copy, copied in the executor, and literals streamed from the client. If the
+        server's copy changed since the signatures were sent, before or during the transfer,
+        the delta is read and dropped and the client told with "010"
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            str: response code
+        """
+        fn, n, baseSize, fs = codec.unpackDelta(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        loop = asyncio.get_running_loop()
+        usable = await loop.run_in_executor(None, lambda: os.path.isfile(fn) and os.path.getsize(fn) == baseSize)
+        if not usable:
+            file = await loop.run_in_executor(None, open, os.devnull, 'wb')
+            try:
+                await self._recvDelta(conn, None, file, n, 0)
+            finally:
+                await loop.run_in_executor(None, file.close)
+            return "010"
+        part = self._getPartialName(conn, fn)
+        base = await loop.run_in_executor(None, open, fn, 'rb')
+        file = await loop.run_in_executor(None, open, part, 'wb')
+        target, hasher = self._digesting(file)
+        try:
+            written = await self._recvDelta(conn, base, target, n, baseSize // n)
+            if written != fs:
+                raise ValueError(f"delta rebuilt {written} bytes, the header announced {fs}")
+        except ValueError as e:
+            await loop.run_in_executor(None, file.close)
+            await loop.run_in_executor(None, os.remove, part)
+            self.logger.warning(f"Delta of {fn} dropped: {e}")
+            return "010"
+        except BaseException:
+            await loop.run_in_executor(None, file.close)
+            await loop.run_in_executor(None, os.remove, part)
+            raise
+        finally:
+            await loop.run_in_executor(None, base.close)
+        await loop.run_in_executor(None, file.close)
+        await loop.run_in_executor(None, self._install, part, fn, hasher)
+        self.logger.info(f"Rebuilt {fn} from a delta")
+        return "000"
+
+    async def _recvDelta(self, conn, base, file, n, blocks):
+        """receives delta instructions until the end instruction, literals are streamed to
+        the file and copies of the server's copy run in the executor. Like delta.recvFile a
+        copy that can't be made is only raised once the end instruction arrived
+
+        Args:
+            conn (AsyncConnection): client connection
+            base (file): server's copy open for reading, None to drop the data
+            file (file): open file the rebuilt file is written to
+            n (int): block size
+            blocks (int): number of whole blocks in the server's copy
+
+        Returns:
+            int: number of bytes written
+        """
+        loop = asyncio.get_running_loop()
+        written = 0
+        error = None
+        while True:
+            kind, first, count = delta.INSTRUCTION.unpack(await conn.reader.readexactly(delta.INSTRUCTION.size))
+            if kind == delta.KIND_END:
+                if error is not None:
+                    raise error
+                return written
+            if kind == delta.KIND_LITERAL:
+                await self._recvFile(conn, file, first, b'')
+                written += first
+            elif kind == delta.KIND_COPY and base is not None:
+                try:
+                    written += await loop.run_in_executor(None, delta.copyBlocks, base, file, n, blocks, first, count, constants.IO_BUFFER_SIZE)
+                except ValueError as e:
+                    error, base = e, None
+            elif kind != delta.KIND_COPY:
+                raise ConnectionError(f"unknown delta instruction {kind}")
+
+    async def _handleTreePut(self, conn):
+        """handle a tree put, directories are made and files written and installed one by
+        one in the executor while the stream of entries arrives
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            str: response code
+        """
+        root = codec.unpackQuery(conn.BUFFER[0])
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: os.makedirs(root, exist_ok=True))
+        files = 0
+        while True:
+            kind, size, n = tree.ENTRY.unpack(await conn.reader.readexactly(tree.ENTRY.size))
+            if kind == tree.KIND_END:
+                break
+            path = tree.target(root, (await conn.reader.readexactly(n)).decode('utf-8', 'surrogateescape'))
+            if kind == tree.KIND_DIR:
+                await loop.run_in_executor(None, lambda: os.makedirs(path, exist_ok=True))
+                continue
+            if kind != tree.KIND_FILE:
+                raise ValueError(f"unknown tree entry {kind}")
+            part = self._getPartialName(conn, path)
+            file = await loop.run_in_executor(None, open, part, 'wb')
+            target, hasher = self._digesting(file)
+            try:
+                await self._recvFile(conn, target, size, b'')
+            finally:
+                await loop.run_in_executor(None, file.close)
+            await loop.run_in_executor(None, self._install, part, path, hasher)
+            files += 1
+        self.logger.info(f"Received {files} files into {root}")
+        return "000"
+
+    async def _recvFile(self, conn, file, fs, data):
+        """receive an uploaded file and write it while it arrives, chunks are gathered
+        into writes of at least a chunk handed to the executor
+
+        Args:
+            conn (AsyncConnection): client connection
+            file (file): open file the data is written to
+            fs (int): file size announced in the request header
+            data (bytes): file data that arrived in the same chunk as the header
+        """
+        loop = asyncio.get_running_loop()
+        if conn.compression:
+            await self._recvCompressed(conn, file, fs)
+            return
+        framed = conn.version >= framing.VERSION_FRAMED
+        remaining = fs
+        pending = []
+        pendingSize = 0
+        start = time.perf_counter()
+        with progress.track(self.progress, f"receiving from {conn.addr}", fs) as bar:
+            while remaining:
+                part = data[:remaining]
+                pending.append(part)
+                pendingSize += len(part)
+                remaining -= len(part)
+                bar.update(len(part))
+                if pendingSize >= conn.chunkSize or not remaining:
+                    await loop.run_in_executor(None, file.write, b''.join(pending))
+                    pending = []
+                    pendingSize = 0
+                if remaining and framed:
+                    data = await conn.reader.read(min(conn.chunkSize, remaining))
+                    if not data:
+                        raise ConnectionError("client disconnected mid transfer")
+                elif remaining:
+                    data = await conn.reader.readexactly(self.ChunkSize)
+        if framed:
+            self._observe(conn, fs, time.perf_counter() - start)
+        while not framed and await conn.reader.readexactly(self.ChunkSize) != bytes(self.ChunkSize):
+            continue
+
+    async def _recvCompressed(self, conn, file, fs):
+        """receives compressed blocks until the empty end block, decompressing and writing
+        every block in the executor
+
+        Args:
+            conn (AsyncConnection): client connection
+            file (file): open file the data is written to
+            fs (int): uncompressed file size announced in the request
+        """
+        loop = asyncio.get_running_loop()
+        decomp = compression.decompressor(conn.compression)
+        written = 0
+        while True:
+            n = compression.blockSize(await conn.reader.readexactly(len(compression.END)))
+            if not n:
+                break
+            data = await conn.reader.readexactly(n)
+            written += await loop.run_in_executor(None, compression.writeBlock, decomp, data, file, fs - written, conn.chunkSize)
+        if written != fs:
+            raise ValueError(f"decompressed {written} bytes, the header announced {fs}")
+
+    async def _sendCompressed(self, conn):
+        """sends the file left open on the connection as compressed blocks followed by the
+        empty end block, reading and compressing happen in the executor
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            int: number of bytes sent
+        """
+        loop = asyncio.get_running_loop()
+        comp = compression.compressor(conn.compression)
+        sent = 0
+        remaining = conn.fileSize
+        while remaining:
+            data = await loop.run_in_executor(None, conn.file.read, min(conn.chunkSize, remaining))
+            if not data:
+                raise OSError(f"file changed size while being sent, {remaining} bytes missing")
+            remaining -= len(data)
+            for each in compression.blocks(await loop.run_in_executor(None, comp.compress, data)):
+                conn.writer.write(each)
+                await conn.writer.drain()
+                sent += len(each)
+        for each in compression.blocks(comp.flush()):
+            conn.writer.write(each)
+            sent += len(each)
+        conn.writer.write(compression.END)
+        await conn.writer.drain()
+        return sent + len(compression.END)
+
+    async def _sendChecked(self, conn):
+        """sends the file left open on the connection followed by its digest, reading and
+        adding every block to the digest happen in the executor
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            int: number of bytes sent, with the trailer
+        """
+        loop = asyncio.get_running_loop()
+        hasher = checksum.new(conn.checksum)
+        reader = checksum.Reader(conn.file, hasher)
+        remaining = conn.fileSize
+        while remaining:
+            data = await loop.run_in_executor(None, reader.read, min(conn.chunkSize, remaining))
+            if not data:
+                raise OSError(f"file changed size while being sent, {remaining} bytes missing")
+            remaining -= len(data)
+            conn.writer.write(data)
+            await conn.writer.drain()
+        trailer = hasher.digest()
+        conn.writer.write(trailer)
+        await conn.writer.drain()
+        return conn.fileSize + len(trailer)
+
+    async def _sendResponse(self, code, conn):
+        """Send response to the client
+
+        Args:
+            code (str): response code
+            conn (AsyncConnection): client connection
+        """
+        if code == "000":
+            conn.writer.write(codec.packOp("000"))
+            await conn.writer.drain()
+        if code == "111":
+            await self._sendExtended(conn)
+        if code in ["001", "110"]:
+            await self._sendFile(conn)
+        if code == "100":
+            await self._sendError("100", conn)
+        # unknown requests keep their own code, so they aren't counted as refused ones
+        if code == "011":
+            await self._sendError("011", conn)
+        if code in ["010", "101"]:
+            await self._sendError("010", conn)
+
+    async def _sendExtended(self, conn):
+        """sends the buffered extended response and the file range left open on the
+        connection, if any. A batch header is followed by one ordinary get response per
+        requested file, the files are looked up in the executor
+
+        Args:
+            conn (AsyncConnection): client connection
+        """
+        loop = asyncio.get_running_loop()
+        await self._sendFile(conn)
+        root, conn.tree = conn.tree, None
+        if root is not None:
+            await self._sendTree(conn, root)
+        batch, conn.batch = conn.batch, []
+        for each in batch:
+            conn.BUFFER = [codec.packName("001", each)]
+            res = await loop.run_in_executor(None, self._handleGet, conn)
+            await self._sendResponse("001" if res == True else res, conn)
+
+    async def _sendTree(self, conn, root):
+        """streams a tree to the client, walking it and reading small files happen in the
+        executor and larger files go through loop.sendfile
+
+        Args:
+            conn (AsyncConnection): client connection
+            root (str): directory to send
+        """
+        loop = asyncio.get_running_loop()
+        entries = tree.stream(root, conn.chunkSize)
+        sent = 0
+        while True:
+            each = await loop.run_in_executor(None, next, entries, None)
+            if each is None:
+                break
+            if isinstance(each, bytes):
+                conn.writer.write(each)
+                await conn.writer.drain()
+                sent += len(each)
+                continue
+            path, size = each
+            file = await loop.run_in_executor(None, open, path, 'rb')
+            try:
+                n = await loop.sendfile(conn.writer.transport, file, 0, size)
+                conn.traffic.sent += n
+            finally:
+                await loop.run_in_executor(None, file.close)
+            if n != size:
+                raise OSError(f"{path} changed size while being sent, sent {n} of {size} bytes")
+            sent += n
+        self.logger.info(f'Sent {sent} bytes of {root}')
+
+    async def _sendError(self, code, conn):
+        """send error response to the client
+
+        Args:
+            code (str): response code
+            conn (AsyncConnection): client connection
+        """
+        self.metrics.error(code)
+        conn.writer.write(codec.packOp(code))
+        await conn.writer.drain()
+
+    async def _sendFile(self, conn):
+        """sends whatever data that's in the buffer to the client followed by the file left
+        open on the connection. The file goes through loop.sendfile, which uses os.sendfile
+        where the transport allows it and otherwise reads the file in the executor
+
+        Args:
+            conn (AsyncConnection): client connection
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            if conn.version >= framing.VERSION_FRAMED:
+                conn.writer.write(conn.BUFFER[0])
+                sent = len(conn.BUFFER[0])
+                if conn.compression:
+                    sent += await self._sendCompressed(conn)
+                elif conn.checksum:
+                    sent += await self._sendChecked(conn)
+                elif conn.file is not None and conn.fileSize:
+                    await conn.writer.drain()
+                    with progress.track(self.progress, f"sending to {conn.addr}", conn.fileSize) as bar:
+                        n = await loop.sendfile(conn.writer.transport, conn.file, conn.file.tell(), conn.fileSize)
+                        bar.update(n)
+                    conn.traffic.sent += n
+                    if n != conn.fileSize:
+                        raise OSError(f"file changed size while being sent, sent {n} of {conn.fileSize} bytes")
+                    sent += n
+                await conn.writer.drain()
+            else:
+                sent = await self._sendChunked(conn)
+        finally:
+            conn.compression = None
+            conn.checksum = None
+            if conn.file is not None:
+                await loop.run_in_executor(None, conn.file.close)
+                conn.file = None
+        self.logger.info(f'Sent {sent} bytes')
+
+    async def _sendChunked(self, conn):
+        """sends the buffer and the open file with the legacy framing, each chunk is drained
+        before the next one is written so no send carries more than a chunk, the file is read
+        in blocks through the executor
+
+        Args:
+            conn (AsyncConnection): client connection
+
+        Returns:
+            int: number of bytes sent, without the padding and end chunk
+        """
+        loop = asyncio.get_running_loop()
+        rest = conn.BUFFER[0]
+        sent = len(rest)
+        remaining = conn.fileSize if conn.file is not None else 0
+        last = False
+        while not last:
+            if remaining:
+                block = await loop.run_in_executor(None, conn.file.read, min(conn.chunkSize, remaining))
+                if not block:
+                    raise OSError(f"file changed size while being sent, {remaining} bytes missing")
+                remaining -= len(block)
+                sent += len(block)
+                data = rest + block
+            else:
+                data = rest
+            last = not remaining
+            whole = len(data) if last else len(data) - len(data) % self.ChunkSize
+            for chunk in chunking.chunker(memoryview(data)[:whole], self.ChunkSize):
+                conn.writer.write(chunk)
+                await conn.writer.drain()
+            rest = data[whole:]
+        conn.writer.write(bytes(self.ChunkSize))
+        await conn.writer.drain()
+        return sent
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="asyncio ftp server")
+    parser.add_argument("port", help="port number for the server")
+    parser.add_argument("loglevel", nargs="?", type=int, default=0, help="0 no logging, 1 terminal debug, 2 terminal and file logging")
+    parser.add_argument("--workers", type=int, default=constants.DEFAULT_WORKERS, help="size of the executor used for file I/O")
+    parser.add_argument("--store", nargs="?", const=constants.STORE_DIR, help="deduplicate stored files through a content addressed store in this directory")
+    parser.add_argument("--cache", type=int, default=constants.CACHE_SIZE >> 20, help="megabytes of small files kept in memory for get, 0 disables the cache")
+    parser.add_argument("--trace", help="write timing spans of every request stage to this file, in the Chrome trace format")
+    parser.add_argument("--profile", help="write a cProfile dump of the event loop to this directory when the server stops")
+    parser.add_argument("--progress", action="store_true", help="log the progress of every transfer")
+    parser.add_argument("--chunk-size", default=str(tuning.DEFAULT_CHUNK >> 10), help="kilobytes framed transfers are moved in, or auto to tune it from measured throughput")
+    parser.add_argument("--sndbuf", type=int, default=0, help="socket send buffer in kilobytes, 0 keeps the system default")
+    parser.add_argument("--rcvbuf", type=int, default=0, help="socket receive buffer in kilobytes, 0 keeps the system default")
+    parser.add_argument("--no-nodelay", action="store_true", help="leave Nagle's algorithm on")
+    args = parser.parse_args()
+    auto = args.chunk_size == "auto"
+    tune = tuning.Settings(tuning.DEFAULT_CHUNK if auto else int(args.chunk_size) << 10, args.sndbuf << 10, args.rcvbuf << 10, not args.no_nodelay, auto)
+    s = AsyncServer(args.port, args.loglevel, args.workers, args.store, args.cache << 20, args.trace, args.profile,
+                    progress.LogProgress(logging.getLogger()) if args.progress else None, tune)
+    s.operate()
@@ -13,4 +13,20 @@ ERROR_FILENAME = "Your file name is too long, it has to be 31 characters or less
 ERROR_FILESIZE = "Your file size is too big."
 ERROR_ARG_FILE = "Could not find the specified file. Check for typos and make sure you open the terminal from the scripts directory."
 ERROR_ARG = "Incorrect number of arguments, if you're lost type (help) to see the list of instructions"
-HELP = "put\nget\nchange\ndetails\nbye"
+# every command of the client, in the order of its details
+COMMANDS = ["put", "get", "mget", "tput", "tget", "list", "pget", "pput", "reget", "reput", "dput", "compress",
+            "verify", "dedup", "change", "help", "stats", "tune", "pipelining", "details", "bye"]
+HELP = "\n".join(COMMANDS)
+
+MODE_THREAD = "thread"
+MODE_SELECTOR = "selector"
+MODES = [MODE_THREAD, MODE_SELECTOR]
+DEFAULT_WORKERS = 32
+LISTEN_BACKLOG = 128
+PARTIAL_SUFFIX = ".part"
+RANGES_SUFFIX = ".ranges.part"
+IO_BUFFER_SIZE = 65536
+STORE_DIR = ".store"
+CACHE_SIZE = 64 << 20
+CACHE_MAX_FILE = 1 << 20
+LIST_PAGE = 1000
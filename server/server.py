@@ -1,7 +1,8 @@
-import socket, logging, sys, os, constants
+import socket, logging, sys, os, selectors, queue, argparse, threading, time, json, constants
 from typing import Union
-from tqdm import tqdm
-from itertools import zip_longest
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from common import cache, checksum, chunking, codec, compression, delta, framing, index, metrics, progress, store, tracing, tree, tuning
 """
 Name: Maxim Hermez
 ID: 201706267
@@ -9,20 +10,111 @@ user: mnh34
 server script file
 """
 
+class Connection:
+    def __init__(self, sock, addr):
+        """state of a single client connection, every request handler works on
+        the buffer of the connection it was called for instead of a shared one
+
+        Args:
+            sock (socket): TCP socket connection with the client
+            addr (tuple): client's address
+        """
+        self.sock = sock
+        self.addr = addr
+        self.BUFFER = []
+        self.file = None
+        self.fileSize = 0
+        self.version = framing.VERSION_LEGACY
+        self.batch = []
+        self.compression = None
+        self.checksum = None
+        self.tree = None
+        self.profile = None
+        self.chunkSize = constants.IO_BUFFER_SIZE
+        self.tuner = None
+        self.traffic = None
+        self.receiver = framing.Receiver(sock, self.chunkSize)
+
+    def resize(self, chunkSize):
+        """changes the chunk size framed transfers on the connection are moved in
+
+        Args:
+            chunkSize (int): bytes read, written or sent at a time
+        """
+        self.chunkSize = chunkSize
+        self.receiver.bufferSize = chunkSize
+
+    def close(self):
+        """closes the client socket, ignoring errors from an already dead peer
+        """
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
 class Server:
     ChunkSize = 1024
-    BUFFER = []
-    def __init__(self, port, loglevel=0):
+    UseSendfile = True
+    # stages of the dispatch timed when tracing is on
+    Traced = ["_serveRequest", "_getOp", "_processRequest", "_handlePut", "_handleGet", "_handleChange",
+              "_handleExtended", "_recvFile", "_getFile", "_install", "_sendResponse", "_sendFile",
+              "_sendFileData", "_sendChunked"]
+    def __init__(self, port, loglevel=0, mode=constants.MODE_THREAD, workers=constants.DEFAULT_WORKERS, storeDir=None, cacheSize=constants.CACHE_SIZE,
+                 trace=None, profile=None, profileRate=None, progress=None, tune=None):
         """ftp server class
 
         Args:
             port (str): port number for the server
             loglevel (str, optional): logging level. Defaults to 0.
-        """         
+            mode (str, optional): "thread" to give every connection its own worker or
+                "selector" to only hand connections to a worker when a request arrives. Defaults to "thread".
+            workers (int, optional): size of the worker pool. Defaults to constants.DEFAULT_WORKERS.
+            storeDir (str, optional): directory of the content addressed store, stored files are
+                deduplicated through it if given. Defaults to None.
+            cacheSize (int, optional): bytes of small files kept in memory for get, 0 disables
+                the cache. Defaults to constants.CACHE_SIZE.
+            trace (str, optional): file to write timing spans of every request stage to.
+                Defaults to the FTP_TRACE environment variable, no tracing if unset.
+            profile (str, optional): directory to write cProfile dumps of connections to.
+                Defaults to the FTP_PROFILE environment variable, no profiling if unset.
+            profileRate (float, optional): share of connections profiled. Defaults to
+                FTP_PROFILE_RATE or 1.
+            progress (function, optional): called with a progress.Report of every file sent or
+                received, from the thread serving the connection. Defaults to None.
+            tune (tuning.Settings, optional): chunk size, socket buffers and TCP options of the
+                connections, clients may agree on other ones with a tune request. Defaults to tuning.Settings().
+        """
+        if mode not in constants.MODES:
+            raise ValueError(f'Unknown serving mode {mode}, expected one of {constants.MODES}')
         self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.tune = tune or tuning.Settings()
+        # accepted sockets inherit the buffer sizes, the window scale is fixed by then
+        tuning.configure(self.server, self.tune.sndbuf, self.tune.rcvbuf, self.tune.nodelay)
         self.host = "localhost"
         self.port = int(port)
+        self.mode = mode
+        self.workers = int(workers)
+        # connections holding or waiting for a worker in thread mode
+        self.active = 0
+        self.activeLock = threading.Lock()
         self.logger = self._getLogger(loglevel)
+        # range uploads in progress by partial file, with their size and the ranges covered so far
+        self.ranges = {}
+        self.rangeLock = threading.Lock()
+        self.store = None
+        if storeDir:
+            self.store = store.Store(storeDir)
+            self.logger.info(f'Removed {self.store.collect()} unreferenced blobs from {storeDir}')
+        self.cache = cache.FileCache(cacheSize, constants.CACHE_MAX_FILE) if cacheSize else None
+        self.index = index.DirIndex()
+        self.metrics = metrics.Metrics()
+        self.progress = progress
+        self.tracer = tracing.tracer(trace)
+        self.profiler = tracing.profiler(profile, profileRate)
+        if self.tracer is not None:
+            tracing.instrument(self, self.Traced, self.tracer, "server")
     
     def _getLogger(self, loglevel=0):
         """handles initializing the right level of logging
@@ -46,355 +138,1172 @@ class Server:
 
     def operate(self):
         """Entry function for the user
-        """        
+        """
+        self.server.bind((self.host, self.port))
+        self.server.listen(constants.LISTEN_BACKLOG)
+        self.logger.info(f'Listening on {self.host}:{self.port} in {self.mode} mode')
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            if self.mode == constants.MODE_SELECTOR:
+                self._operateSelector(pool)
+            else:
+                self._operateThreaded(pool)
+
+    def _operateThreaded(self, pool):
+        """accept loop that hands every new connection to a worker for its whole lifetime,
+        connections beyond the size of the pool wait in its queue until a worker frees up
+
+        Args:
+            pool (ThreadPoolExecutor): worker pool
+        """
         while True:
-            self.server.bind((self.host, self.port))
-            self.server.listen(2)
             c, addr = self.server.accept()
             self.logger.info(f'Connected to {addr}')
-            self._initiateSocket(c)
+            with self.activeLock:
+                self.active += 1
+                waiting = self.active - self.workers
+            if waiting > 0:
+                self.logger.warning(f'All {self.workers} workers are busy, {addr} waits for one of them with {waiting - 1} connections ahead of it')
+            pool.submit(self._initiateSocket, self._accept(c, addr))
 
-    def _initiateSocket(self, c):
-        """Main server loop after connection to a client
+    def _operateSelector(self, pool):
+        """selector loop over the listening socket and all idle connections, a connection
+        is only handed to a worker while it has a request to serve, then handed back
 
         Args:
-            c (socket): TCP socket connection with the client
-        """        
+            pool (ThreadPoolExecutor): worker pool
+        """
+        sel = selectors.DefaultSelector()
+        ready = queue.Queue()
+        wakeR, wakeW = socket.socketpair()
+        wakeR.setblocking(False)
+        sel.register(self.server, selectors.EVENT_READ)
+        sel.register(wakeR, selectors.EVENT_READ)
+
+        def serve(conn):
+            alive = self._serveGuarded(conn)
+            ready.put((conn, alive))
+            wakeW.send(b'\x00')
+
         while True:
-            self.BUFFER = []
-            fb = c.recv(1, socket.MSG_PEEK)
-            fb = self._byteToBit(fb)
-            self.logger.debug(f"new response receiver{fb}")
-            process, FL = self._getOp(fb)
-            if process == "000":
-                self._recvFile(c)
-                code = self._processRequest()
-                self._sendResponse(code, c)
-                continue
-            elif process == "001":
-                self.BUFFER = [c.recv(FL+1)]
-                self.logger.info("Finished receiving request.")
-                code = self._processRequest()
-                self._sendResponse(code, c)
-                continue
-            elif process == "010":
-                part = c.recv(FL+2, socket.MSG_PEEK)
-                FLN = int(part[len(part)-1])
-                self.BUFFER = [c.recv(FL+FLN+2)]
-                self.logger.info("Finished receiving request.")
-                code = self._processRequest(FLN)
-                self._sendResponse(code, c)
-                continue
-            elif process == "011":
-                self.BUFFER = [c.recv(1)]
+            for key, _ in sel.select():
+                if key.fileobj is self.server:
+                    c, addr = self.server.accept()
+                    self.logger.info(f'Connected to {addr}')
+                    conn = self._accept(c, addr)
+                    sel.register(conn.sock, selectors.EVENT_READ, conn)
+                elif key.fileobj is wakeR:
+                    try:
+                        wakeR.recv(4096)
+                    except BlockingIOError:
+                        pass
+                else:
+                    sel.unregister(key.fileobj)
+                    pool.submit(serve, key.data)
+            while not ready.empty():
+                conn, alive = ready.get()
+                if alive and conn.receiver.pending():
+                    # the next request already arrived with the last one, the socket won't signal it
+                    pool.submit(serve, conn)
+                elif alive:
+                    sel.register(conn.sock, selectors.EVENT_READ, conn)
+                else:
+                    self._close(conn)
+
+    def _accept(self, sock, addr):
+        """wraps a newly accepted socket so the bytes crossing it are counted
+
+        Args:
+            sock (socket): TCP socket connection with the client
+            addr (tuple): client's address
+
+        Returns:
+            Connection: connection with the client
+        """
+        traffic = metrics.Traffic()
+        self.metrics.opened(traffic)
+        conn = Connection(metrics.CountingSocket(sock, traffic), addr)
+        conn.traffic = traffic
+        self._tuneConnection(conn)
+        if self.tracer is not None:
+            tracing.instrument(conn.receiver, conn.receiver.Traced, self.tracer, "recv")
+        if self.profiler is not None:
+            conn.profile = self.profiler.sample()
+        return conn
+
+    def _tuneConnection(self, conn):
+        """gives a new connection the server's chunk size and TCP options
+
+        Args:
+            conn (Connection): connection with the client
+        """
+        tuning.configure(conn.sock, nodelay=self.tune.nodelay)
+        conn.resize(self.tune.chunkSize)
+        if self.tune.auto:
+            conn.tuner = tuning.AutoTuner(self.tune.chunkSize)
+
+    def _observe(self, conn, nbytes, seconds):
+        """lets the auto tuner of the connection, if any, learn from a finished transfer
+
+        Args:
+            conn (Connection): connection with the client
+            nbytes (int): bytes transferred
+            seconds (float): time the transfer took
+        """
+        if conn.tuner is not None:
+            conn.resize(conn.tuner.observe(nbytes, seconds))
+
+    def _close(self, conn):
+        """closes a connection that is done being served
+
+        Args:
+            conn (Connection): connection with the client
+        """
+        conn.close()
+        self.metrics.closed(conn.traffic)
+        if conn.profile is not None:
+            self.profiler.dump(conn.profile, f"conn-{conn.addr[1]}")
+
+    def _initiateSocket(self, conn):
+        """Main server loop after connection to a client
+
+        Args:
+            conn (Connection): connection with the client
+        """
+        while self._serveGuarded(conn):
+            continue
+        self._close(conn)
+        with self.activeLock:
+            self.active -= 1
+
+    def _serveGuarded(self, conn):
+        """serves one request, a failing connection is logged and dropped instead
+        of taking the whole server down
+
+        Args:
+            conn (Connection): connection with the client
+
+        Returns:
+            bool: False once the connection should be closed
+        """
+        profiling = conn.profile is not None and tracing.enable(conn.profile)
+        try:
+            return self._serveRequest(conn)
+        except OSError as e:
+            self.logger.info(f'Connection to {conn.addr} lost: {e}')
+            return False
+        except Exception:
+            self.logger.exception(f'Failed serving {conn.addr}')
+            return False
+        finally:
+            if profiling:
+                conn.profile.disable()
+
+    def _serveRequest(self, conn):
+        """receives, processes and answers a single request from the client
+
+        Args:
+            conn (Connection): connection with the client
+
+        Returns:
+            bool: False if the client disconnected
+        """
+        conn.BUFFER = []
+        framed = conn.version >= framing.VERSION_FRAMED
+        request = conn.receiver.recvMessage(codec.requestSize, framed, self.ChunkSize, conn.version >= framing.VERSION_WIDE)
+        if not request:
+            self.logger.info(f'Disconnected from {conn.addr}')
+            if self.cache is not None:
+                self.logger.debug(f'File cache {self.cache.stats()}')
+            return False
+        process, FL = self._getOp(conn, request)
+        self.logger.debug(f"new request {process} {FL}")
+        self.metrics.request(process, FL)
+        if process in ["000", "001", "010", "011"] or (process == codec.EXTENDED and framed):
+            conn.BUFFER = [request]
+            if process != "000":
                 self.logger.info("Finished receiving request.")
-                code = self._processRequest()
-                self._sendResponse(code, c)
-                continue
+            start = time.perf_counter()
+            code = self._processRequest(conn)
+            processed = time.perf_counter()
+            self._sendResponse(code, conn)
+            self.metrics.observe("process", processed - start)
+            self.metrics.observe("send", time.perf_counter() - processed)
+        else:
+            self.logger.info(f"Unknown request {process}")
+            self._sendError("011", conn)
+        return True
 
-    def _processRequest(self, FLN=None):
-        """begins processing of any request saved in the buffer variable
+    def _processRequest(self, conn):
+        """begins processing of any request saved in the connection's buffer
 
         Args:
-            FLN (str, optional): new filename's length. Defaults to None.
+            conn (Connection): connection the request came from
 
         Returns:
             str: response code
         """
-                
-        operation, FL = self._getOp()
+        operation, FL = self._getOp(conn)
         if operation == "000":
-            self._handlePut(FL)
+            self._handlePut(conn, FL)
         elif operation == "001":
-            self._handleGet(FL)
+            res = self._handleGet(conn)
+            if res != True:
+                return res
         elif operation == "010":
-            res = self._handleChange(FL, FLN)
+            res = self._handleChange(conn)
             if res == True:
                 return "000"
             else:
                 return res
         elif operation == "011":
-            self._handleHelp()
+            if FL:
+                self._handleHello(conn, FL)
+                return "111"
+            self._handleHelp(conn)
             return "110"
+        elif operation == codec.EXTENDED:
+            return self._handleExtended(conn, FL)
         return operation
 
-    def _getOp(self, firstByte = None):
-        """gets a tuple of two strings representing in binary the operation code
-        and the filename length. The byte is retrieved from the buffer if no arguments
-        are supplied
+    def _getOp(self, conn, firstByte = None):
+        """gets a tuple of the operation code and the filename length. The byte is
+        retrieved from the buffer if no arguments are supplied
 
         Args:
+            conn (Connection): connection whose buffer is read
             firstByte (bytes, optional): alternative byte to read. Defaults to None.
 
         Returns:
-            tuple(str,str): extracted bits tuple
+            tuple(str,int): operation code and filename length
         """
-        if firstByte == None: firstByte = self._byteToBit(self.BUFFER[0][0])
-        return (firstByte[0:3],int(firstByte[3:8], 2))
+        if firstByte == None: firstByte = conn.BUFFER[0]
+        return codec.unpackOp(firstByte)
 
-    def _recvFile(self, c):
-        """recieve a file from the server, handles chunking and adding to the buffer
+    def _recvChunk(self, conn):
+        """receive exactly one chunk from the client, completing short reads
 
         Args:
-            c (socket): client socket
+            conn (Connection): client connection
+
+        Returns:
+            bytes: chunk of ChunkSize bytes
         """
-        finalChunk = False
-        while not finalChunk:
-            data = c.recv(self.ChunkSize)
-            if data == bytes(self.ChunkSize):
-                self.logger.info("Finished receiving request.")
-                finalChunk = True
-                continue
-            self.BUFFER.append(data)
+        return conn.receiver.recvExact(self.ChunkSize)
+
+    def _recvFile(self, conn, file, fs, data):
+        """recieve a file from the client, every chunk is written to the file as soon as
+        it arrives so only one chunk is held in memory whatever the file size
+
+        Args:
+            conn (Connection): client connection
+            file (file): open file the data is written to
+            fs (int): file size announced in the request header
+            data (bytes): file data that arrived in the same chunk as the header
+        """
+        if conn.compression:
+            written = compression.recvFile(conn.receiver, file, conn.compression, fs, conn.chunkSize)
+            if written != fs:
+                raise ValueError(f"decompressed {written} bytes, the header announced {fs}")
+            self.logger.info("Finished receiving request.")
+            return
+        if conn.version >= framing.VERSION_FRAMED:
+            start = time.perf_counter()
+            with progress.track(self.progress, f"receiving from {conn.addr}", fs) as bar:
+                file.write(data)
+                bar.update(len(data))
+                conn.receiver.recvToFile(file, fs - len(data), conn.chunkSize, bar)
+            self._observe(conn, fs, time.perf_counter() - start)
+            self.logger.info("Finished receiving request.")
+            return
+        remaining = fs
+        while remaining:
+            part = data[:remaining]
+            file.write(part)
+            remaining -= len(part)
+            if remaining:
+                data = self._recvChunk(conn)
+        # the padding of the last chunk was dropped above, what's left is the empty end chunk
+        while self._recvChunk(conn) != bytes(self.ChunkSize):
+            continue
+        self.logger.info("Finished receiving request.")
 
-    def _handlePut(self, fl):
+    def _handlePut(self, conn, fl):
         """handle the backend processing for put request
 
         Args:
+            conn (Connection): client connection
             fl (str): filename length
         """
-        fn = self._getFileName(fl)
-        fs = self._getFileSize(fl)
-        self._getFile(fl+5, fn)
+        wide = conn.version >= framing.VERSION_WIDE
+        opcode, fn, fs = codec.unpackHeader(conn.BUFFER[0], wide)
+        self._getFile(conn, codec.headerSize(fl, wide), fn, fs)
 
-    def _handleGet(self, fl):
-        """handle the backend processing for get request
+    def _handleGet(self, conn, cached=True):
+        """handle the backend processing for get request, only the response header is
+        buffered while the file itself is left open on the connection to be sent by _sendFile.
+        Small files are answered from the cache with their header and contents in the buffer
 
         Args:
-            fl (str): filename length
+            conn (Connection): client connection
+            cached (bool, optional): whether the response may come from the cache. Defaults to True.
+
+        Returns:
+            str/bool: True if successful, str(response_code) if failed
         """
-        fileName = self._getFileName(fl)
-        opcode = "001"
-        FL = self._getBitNameLen(fileName)
-        byteName = bytes(fileName, 'utf-8')
-        fileSize = self._getByteFileSize(fileName)
-        fileData = self._getByteFile(fileName)
-        r = self._bitstring_to_bytes(opcode+FL)
-        r += byteName+fileSize+fileData
-        self.BUFFER = [r]
-
-    def _handleChange(self, fl, fln):
+        opcode, fileName = codec.unpackName(conn.BUFFER[0])
+        wide = conn.version >= framing.VERSION_WIDE
+        cached = cached and self.cache is not None
+        if cached:
+            try:
+                response = self.cache.get((fileName, wide), os.stat(fileName))
+            except OSError:
+                response = None
+            if response is not None:
+                conn.BUFFER = [response]
+                return True
+        if not os.path.isfile(fileName):
+            return "010"
+        file = open(fileName, 'rb')
+        st = os.fstat(file.fileno())
+        fs = st.st_size
+        if fs > codec.maxSize(wide):
+            # the size doesn't fit the header of a connection without wide sizes
+            file.close()
+            return "010"
+        if cached and self.cache.fits(fs):
+            with file:
+                data = file.read(fs)
+            conn.BUFFER = [codec.packHeader("001", fileName, len(data), wide) + data]
+            if len(data) == fs:
+                self.cache.put((fileName, wide), st, conn.BUFFER[0])
+            return True
+        conn.BUFFER = [codec.packHeader("001", fileName, fs, wide)]
+        conn.file = file
+        conn.fileSize = fs
+        return True
+
+    def _handleChange(self, conn):
         """handle the backend processing for change request
 
         Args:
-            fl (str): filename length
-            fln (str): new filename length
+            conn (Connection): client connection
 
         Returns:
             str/bool: True if successful, str(response_code) if failed
         """
-        fileName = self._getFileName(fl)
-        newFileName = self._getNewFileName(fl, fln)
+        fileName, newFileName = codec.unpackChange(conn.BUFFER[0])
         if not os.path.isfile(fileName):
             return "010"
+        before = self.index.mtimes(fileName, newFileName)
         os.rename(fileName, newFileName)
+        self._invalidate(before, fileName, newFileName)
         return True
 
-    def _handleHelp(self):
+    def _handleHello(self, conn, version):
+        """handle a help request carrying the client's protocol version, the connection
+        switches to the highest version both sides speak
+
+        Args:
+            conn (Connection): client connection
+            version (int): highest version the client speaks
+        """
+        conn.version = min(version, framing.VERSION)
+        conn.BUFFER = [codec.packOp("111", conn.version)]
+        self.logger.info(f"Negotiated protocol version {conn.version} with {conn.addr}")
+
+    def _handleExtended(self, conn, sub):
+        """handle an extended request, the sub operation comes in the low 5 bits
+
+        Args:
+            conn (Connection): client connection
+            sub (int): sub operation
+
+        Returns:
+            str: response code
+        """
+        if sub == codec.EXT_BATCH:
+            conn.batch = codec.unpackBatch(conn.BUFFER[0])
+            conn.BUFFER = [codec.packOp(codec.EXTENDED, sub) + codec.packSize(len(conn.batch))]
+            self.logger.info(f"Batch of {len(conn.batch)} files requested")
+            return "111"
+        if sub == codec.EXT_RANGE_GET:
+            return self._handleRangeGet(conn)
+        if sub == codec.EXT_RANGE_PUT:
+            return self._handleRangePut(conn)
+        if sub == codec.EXT_QUERY:
+            return self._handleQuery(conn)
+        if sub == codec.EXT_RESUME_PUT:
+            return self._handleResumePut(conn)
+        if sub == codec.EXT_COMPRESSED_GET:
+            return self._handleCompressedGet(conn)
+        if sub == codec.EXT_COMPRESSED_PUT:
+            return self._handleCompressedPut(conn)
+        if sub == codec.EXT_SIGNATURE:
+            return self._handleSignature(conn)
+        if sub == codec.EXT_DELTA_PUT:
+            return self._handleDeltaPut(conn)
+        if sub == codec.EXT_HAVE:
+            return self._handleHave(conn)
+        if sub == codec.EXT_LIST:
+            return self._handleList(conn)
+        if sub == codec.EXT_TREE_PUT:
+            return self._handleTreePut(conn)
+        if sub == codec.EXT_TREE_GET:
+            return self._handleTreeGet(conn)
+        if sub == codec.EXT_CHECKED_GET:
+            return self._handleCheckedGet(conn)
+        if sub == codec.EXT_CHECKED_PUT:
+            return self._handleCheckedPut(conn)
+        if sub == codec.EXT_STATS:
+            return self._handleStats(conn)
+        if sub == codec.EXT_TUNE:
+            return self._handleTune(conn)
+        self.logger.info(f"Unknown extended request {sub}")
+        return "011"
+
+    def _handleHelp(self, conn):
         """handle the backend processing for help request
 
+        Args:
+            conn (Connection): client connection
+
         Returns:
             bool: success
         """
         helpBytes = constants.HELP.encode('utf-8')
-        ln = "{0:b}".format(len(helpBytes))
-        print(ln)
-        if len(ln) < 5:
-            for _ in range(5-len(ln)):
-                out = "0" + out
-        opcode = "110"
-        r = self._bitstring_to_bytes(opcode+ln)
-        r += helpBytes
-        self.BUFFER = [r]
-        print(r)
+        if conn.version >= framing.VERSION_FRAMED:
+            conn.BUFFER = [codec.packOp("110") + codec.packSize(len(helpBytes)) + helpBytes]
+            return True
+        # legacy clients get the length in the low bits, they don't read it anyway
+        conn.BUFFER = [codec.packOp("110", min(len(helpBytes), codec.MAX_NAME)) + helpBytes]
         return True
 
-    def _getFileName(self, fl):
-        """handles getting the string filename from the request in the buffer
+    def _handleRangeGet(self, conn):
+        """handle a range get request, like a get request but only the requested range of the
+        file is left to be sent. The response header carries the size of the whole file, so a
+        client can ask for an empty range first to learn how to split the file
 
         Args:
-            fl (int): filename length
+            conn (Connection): client connection
 
         Returns:
-            str: filename
+            str: response code
         """
-        return self.BUFFER[0][1:fl+1].decode('utf-8')
+        fileName, offset, length, _ = codec.unpackRange(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        if not os.path.isfile(fileName):
+            return "010"
+        file = open(fileName, 'rb')
+        fs = os.fstat(file.fileno()).st_size
+        if fs > codec.maxSize(conn.version >= framing.VERSION_WIDE):
+            file.close()
+            return "010"
+        length = max(0, min(length, fs - offset))
+        file.seek(offset)
+        conn.file = file
+        conn.fileSize = length
+        conn.BUFFER = [codec.packRangeReply(fs, length, conn.version >= framing.VERSION_WIDE)]
+        return "111"
 
-    def _getNewFileName(self, fl, fln):
-        """handles getting the string new filename from the request in the buffer (only used for change request)
+    def _handleRangePut(self, conn):
+        """handle a range put request, the range is written at its offset in a partial file
+        shared by every connection uploading a range of the same file. A range reaching past
+        the file size, or announcing another size than the ranges before it, is read and
+        dropped. A range that breaks off drops the partial file, the upload starts over
 
         Args:
-            fl (int): filename length
-            fln (int): new filename length
+            conn (Connection): client connection
 
         Returns:
-            str: new file name
+            str: response code
         """
-        return self.BUFFER[0][fl+2:fln+fl+2].decode('utf-8')
+        fn, offset, length, fs = codec.unpackRange(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        part, upload, file = self._openRangePart(fn, offset, length, fs)
+        if file is None:
+            with open(os.devnull, 'wb') as file:
+                self._recvFile(conn, file, length, b'')
+            self.logger.warning(f"Range {offset}+{length} of {fn} doesn't fit a file of {fs} bytes, dropped")
+            return "010"
+        try:
+            with file:
+                self._recvFile(conn, file, length, b'')
+        except BaseException:
+            self._dropRanges(part, upload)
+            raise
+        self._rangeReceived(part, upload, fn, offset, length)
+        return "000"
 
-    def _getFileSize(self, fl):
-        """retrieve the file size from a request in the buffer
+    def _openRangePart(self, fn, offset, length, fs):
+        """opens the partial file of a range upload positioned at the range offset, the first
+        range to arrive creates it with the size of the whole file
 
         Args:
-            fl (int): filename length
+            fn (str): filename
+            offset (int): offset of the range
+            length (int): length of the range
+            fs (int): size of the whole file
 
         Returns:
-            int: file size in bytes
+            tuple(str,dict,file): partial filename, the upload it belongs to and the open file,
+                the file is None if the range doesn't fit the upload
         """
-        return int.from_bytes(self.BUFFER[0][fl+1:fl+5], "big")
-    
-    def _getFile(self, offset, fn):
-        """handles writing the file's data to the computer's memory
+        part = f"{fn}{constants.RANGES_SUFFIX}"
+        with self.rangeLock:
+            upload = self.ranges.get(part)
+            if offset + length > fs or (upload is not None and upload["size"] != fs):
+                return part, upload, None
+            if upload is None:
+                with open(part, 'wb') as file:
+                    file.truncate(fs)
+                upload = self.ranges[part] = {"size": fs, "covered": []}
+        file = open(part, 'r+b')
+        file.seek(offset)
+        return part, upload, file
+
+    def _dropRanges(self, part, upload):
+        """forgets a range upload that lost one of its ranges and removes its partial file,
+        unless a new upload of the same file took its place already
+
+        Args:
+            part (str): partial filename
+            upload (dict): the upload from _openRangePart
+        """
+        with self.rangeLock:
+            if self.ranges.get(part) is not upload:
+                return
+            del self.ranges[part]
+            try:
+                os.remove(part)
+            except FileNotFoundError:
+                pass
+
+    def _rangeReceived(self, part, upload, fn, offset, length):
+        """records a completely received range, the partial file replaces fn once the
+        ranges cover the whole file. Covered ranges are merged, so a retried or overlapping
+        range isn't counted twice
 
         Args:
-            offset (int): offset of bytes where the file starts
+            part (str): partial filename
+            upload (dict): the upload from _openRangePart
             fn (str): filename
+            offset (int): offset of the range
+            length (int): length of the range
         """
-        self.BUFFER[0] = self.BUFFER[0][offset:]
-        file = open(fn, 'wb')
-        for each in self.BUFFER:
-            file.write(each)
-        file.close()
+        with self.rangeLock:
+            if self.ranges.get(part) is not upload:
+                # the upload was dropped while this range was on its way
+                return
+            upload["covered"] = chunking.cover(upload["covered"], offset, offset + length)
+            if upload["size"] and upload["covered"] != [(0, upload["size"])]:
+                return
+            del self.ranges[part]
+            before = self.index.mtimes(fn)
+            os.replace(part, fn)
+        self._invalidate(before, part, fn)
+        self._intern(fn)
+        self.logger.info(f"All ranges of {fn} received")
 
-    def _getBitNameLen(self, fn):
-        """get the length of the string in binary
+    def _handleQuery(self, conn):
+        """handle a query for how much of an interrupted upload was kept, the answer is the
+        size of the resumable partial file, which always holds a prefix of the upload
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        fn = codec.unpackQuery(conn.BUFFER[0])
+        part = self._getResumeName(fn)
+        have = os.path.getsize(part) if os.path.isfile(part) else 0
+        conn.BUFFER = [codec.packOp(codec.EXTENDED, codec.EXT_QUERY) + codec.packSize(have, conn.version >= framing.VERSION_WIDE)]
+        return "111"
+
+    def _handleResumePut(self, conn):
+        """handle a resumed upload, the data from offset on is appended to the resumable
+        partial file which replaces fn once it reaches the announced file size. An offset past
+        the end of the partial file can't be resumed, its data is read and dropped
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        fn, offset, length, fs = codec.unpackRange(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        file = self._openResumePart(fn, offset)
+        if file is None:
+            with open(os.devnull, 'wb') as file:
+                self._recvFile(conn, file, length, b'')
+            return "010"
+        with file:
+            self._recvFile(conn, file, length, b'')
+        if offset + length == fs:
+            self._install(self._getResumeName(fn), fn)
+        return "000"
+
+    def _openResumePart(self, fn, offset):
+        """opens the resumable partial file of fn positioned at offset, anything past the
+        offset is dropped
 
         Args:
             fn (str): filename
+            offset (int): offset the upload resumes from
 
         Returns:
-            str/bool: binary string if successful or False if error occured
+            file: open file, None if the partial file is shorter than offset
         """
-        out = "{0:b}".format(len(fn))
-        if len(out) < 5:
-            for _ in range(5-len(out)):
-                out = "0" + out
-            return out
-        elif len(out) > 5:
-            return False
-        else: 
-            return out
-    
-    def _getByteFileSize(self, fn):
-        """get a file's size in a bytes object
+        part = self._getResumeName(fn)
+        have = os.path.getsize(part) if os.path.isfile(part) else 0
+        if offset > have:
+            return None
+        file = open(part, 'r+b' if os.path.isfile(part) else 'wb')
+        file.truncate(offset)
+        file.seek(offset)
+        return file
+
+    def _handleCompressedGet(self, conn):
+        """handle a get request asking for a compressed transfer. Files the server doesn't
+        have the codec for, or that the sample shows don't compress, get an ordinary get
+        response instead, so the client has to accept both
 
         Args:
-            fn (str): filename/path
+            conn (Connection): client connection
 
         Returns:
-            bytes/bool: size of the file if successful or False if error occured
+            str: response code
         """
-        fs = os.path.getsize(fn)
-        if fs > 2**32:
-            return False
-        else: 
-            return fs.to_bytes(4, 'big')
+        codecName, fileName, _ = codec.unpackCompressed(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        conn.BUFFER = [codec.packName("001", fileName)]
+        res = self._handleGet(conn, cached=False)
+        if res != True:
+            return res
+        if codecName not in compression.CODECS or not compression.worthCompressing(compression.readSample(conn.file)):
+            return "001"
+        conn.compression = codecName
+        conn.BUFFER = [codec.packCompressedReply(codec.EXT_COMPRESSED_GET, codecName, conn.fileSize, conn.version >= framing.VERSION_WIDE)]
+        self.logger.info(f"Sending {fileName} compressed with {codecName}")
+        return "111"
+
+    def _handleCompressedPut(self, conn):
+        """handle a put request offering a compressed transfer, the server answers with the
+        codec it accepts, or an empty name if it doesn't know the codec, and the client then
+        sends the file as compressed blocks or as it is
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        codecName, fn, fs = codec.unpackCompressed(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        if codecName not in compression.CODECS:
+            codecName = ""
+        conn.sock.sendall(codec.packCompressedReply(codec.EXT_COMPRESSED_PUT, codecName, wide=conn.version >= framing.VERSION_WIDE))
+        conn.compression = codecName or None
+        try:
+            self._getFile(conn, len(conn.BUFFER[0]), fn, fs)
+        finally:
+            conn.compression = None
+        return "000"
 
-    def _getByteFile(self, fn):
-        """read a file as binary
+    def _handleCheckedGet(self, conn):
+        """handle a get request asking for the contents to be followed by their digest.
+        Algorithms the server doesn't know get an ordinary get response instead
 
         Args:
-            fn (str): filename/path
+            conn (Connection): client connection
 
         Returns:
-            bytes: file content
+            str: response code
         """
+        algorithm, fileName, _ = codec.unpackChecked(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        conn.BUFFER = [codec.packName("001", fileName)]
+        res = self._handleGet(conn, cached=False)
+        if res != True:
+            return res
+        if algorithm not in checksum.ALGORITHMS:
+            return "001"
+        conn.checksum = algorithm
+        conn.BUFFER = [codec.packCheckedReply(codec.EXT_CHECKED_GET, algorithm, conn.fileSize, conn.version >= framing.VERSION_WIDE)]
+        self.logger.info(f"Sending {fileName} checked with {algorithm}")
+        return "111"
+
+    def _handleCheckedPut(self, conn):
+        """handle a put request offering a digest trailer, the server answers with the
+        algorithm it accepts, or an empty name if it doesn't know it. An upload whose digest
+        doesn't match is thrown away and answered with "100"
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        wide = conn.version >= framing.VERSION_WIDE
+        algorithm, fn, fs = codec.unpackChecked(conn.BUFFER[0], wide)
+        if algorithm not in checksum.ALGORITHMS:
+            algorithm = ""
+        conn.sock.sendall(codec.packCheckedReply(codec.EXT_CHECKED_PUT, algorithm, wide=wide))
+        if not algorithm:
+            self._getFile(conn, len(conn.BUFFER[0]), fn, fs)
+            return "000"
+        part = self._getPartialName(conn, fn)
+        try:
+            with open(part, 'wb') as file:
+                target, hasher = self._digesting(file)
+                matched = checksum.recvFile(conn.receiver, target, fs, algorithm, conn.chunkSize)
+        except BaseException:
+            os.replace(part, self._getResumeName(fn))
+            raise
+        if not matched:
+            os.remove(part)
+            self.logger.warning(f"{fn} failed its {algorithm} check, upload dropped")
+            return "100"
+        self._install(part, fn, hasher)
+        return "000"
+
+    def _handleSignature(self, conn):
+        """handle a request for the block signatures of a file, the client matches them
+        against its own copy to send a delta put
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        fn = codec.unpackQuery(conn.BUFFER[0])
+        if not os.path.isfile(fn):
+            return "010"
         with open(fn, 'rb') as file:
-            data = file.read()
-            return data
-    
-    def _bitstring_to_bytes(self, s):
-        """converts a string of 1's and 0's to its bytes object
+            fs = os.fstat(file.fileno()).st_size
+            n = delta.blockSize(fs)
+            signatures = delta.signature(file, n)
+        conn.BUFFER = [codec.packSignatureReply(n, fs, len(signatures) // delta.SIGNATURE.size, conn.version >= framing.VERSION_WIDE) + signatures]
+        self.logger.info(f"Sent {len(signatures) // delta.SIGNATURE.size} block signatures of {fn}")
+        return "111"
+
+    def _handleDeltaPut(self, conn):
+        """handle a delta put, the new file is rebuilt in a partial file from blocks of the
+        server's copy and literals sent by the client, and replaces fn once complete. If the
+        server's copy changed since the signatures were sent, before or during the transfer,
+        the delta is read and dropped and the client told with "010"
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        fn, n, baseSize, fs = codec.unpackDelta(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        if not os.path.isfile(fn) or os.path.getsize(fn) != baseSize:
+            with open(os.devnull, 'wb') as file:
+                delta.recvFile(conn.receiver, None, file, n, conn.chunkSize)
+            return "010"
+        part = self._getPartialName(conn, fn)
+        try:
+            with open(fn, 'rb') as base, open(part, 'wb') as file:
+                target, hasher = self._digesting(file)
+                written = delta.recvFile(conn.receiver, base, target, n, conn.chunkSize)
+            if written != fs:
+                raise ValueError(f"delta rebuilt {written} bytes, the header announced {fs}")
+        except ValueError as e:
+            os.remove(part)
+            self.logger.warning(f"Delta of {fn} dropped: {e}")
+            return "010"
+        except BaseException:
+            os.remove(part)
+            raise
+        self._install(part, fn, hasher)
+        self.logger.info(f"Rebuilt {fn} from a delta")
+        return "000"
+
+    def _handleHave(self, conn):
+        """handle a have request, if the store holds the contents fn becomes a reference to
+        them and the client doesn't send the file. Servers without a store hold nothing
 
         Args:
-            s (str): binary data
+            conn (Connection): client connection
 
         Returns:
-            bytes: output
+            str: response code, "010" if the contents have to be uploaded
         """
-        return int(s.replace(" ", ""), 2).to_bytes((len(s) + 7) // 8, byteorder='big')
-        
-    def _byteToBit(self, b):
-        """convert a bytes string to a string of 1's and 0's
+        fn, digest, fs = codec.unpackHave(conn.BUFFER[0], conn.version >= framing.VERSION_WIDE)
+        if self.store is None or not self.store.has(digest, fs):
+            return "010"
+        before = self.index.mtimes(fn)
+        self.store.link(digest, fn)
+        self._invalidate(before, fn)
+        self.logger.info(f"Stored {fn} as a reference to {digest.hex()}")
+        return "000"
+
+    def _handleList(self, conn):
+        """handle a list request, one page of a directory is answered from the directory index
+        or a single file from its stat, pages are at most constants.LIST_PAGE entries
 
         Args:
-            b (bytes): bytes to convert
+            conn (Connection): client connection
 
         Returns:
-            str: binary string
+            str: response code
         """
-        if isinstance(b, int):
-            b = b.to_bytes(1, 'big')
-        elif isinstance(b, str):
-            b = bytes(b, 'utf-8')
-        return format(int.from_bytes(b, byteorder=sys.byteorder), '#010b')[2:10]
-    
-    def _sendResponse(self, code, c):
+        path, offset, limit = codec.unpackList(conn.BUFFER[0])
+        listing = self.index.list(path, offset, min(limit, constants.LIST_PAGE))
+        if listing is None:
+            return "010"
+        conn.BUFFER = [codec.packListReply(*listing)]
+        return "111"
+
+    def _handleTreePut(self, conn):
+        """handle a tree put, directories are made and files written and installed one by
+        one while the stream of entries arrives
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        root = codec.unpackQuery(conn.BUFFER[0])
+        files = tree.recvTree(conn.receiver, root, lambda path: self._getPartialName(conn, path), self._install, conn.chunkSize,
+                              None if self.store is None else store.new)
+        self.logger.info(f"Received {files} files into {root}")
+        return "000"
+
+    def _handleTreeGet(self, conn):
+        """handle a tree get, the directory is left on the connection for _sendExtended to
+        stream after the response byte
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        root = codec.unpackQuery(conn.BUFFER[0])
+        if not os.path.isdir(root):
+            return "010"
+        conn.tree = root
+        conn.BUFFER = [codec.packOp(codec.EXTENDED, codec.EXT_TREE_GET)]
+        return "111"
+
+    def _handleStats(self, conn):
+        """handle a request for the server's metrics, answered as JSON or in the Prometheus
+        text format
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        fmt = codec.unpackStats(conn.BUFFER[0])
+        snap = self.metrics.snapshot(self.cache.stats() if self.cache is not None else None)
+        if fmt == "prometheus":
+            body = metrics.prometheus(snap).encode('utf-8')
+        elif fmt == "json":
+            body = json.dumps(snap).encode('utf-8')
+        else:
+            return "011"
+        conn.BUFFER = [codec.packOp(codec.EXTENDED, codec.EXT_STATS) + codec.packSize(len(body)) + body]
+        return "111"
+
+    def _handleTune(self, conn):
+        """handle a tune request, the connection takes the client's chunk size within
+        tuning.MIN_CHUNK and tuning.MAX_CHUNK, the server's own only stands in when the client
+        has no preference. Socket buffers mirror the client's, so the side receiving a bulk
+        transfer buffers what the side sending it does. The reply carries the chunk size, 0
+        if either side asked for auto tuning, and the buffer sizes the kernel settled on
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            str: response code
+        """
+        chunkSize, sndbuf, rcvbuf = codec.unpackTune(conn.BUFFER[0])
+        auto = not chunkSize or self.tune.auto
+        chunkSize = tuning.clamp(chunkSize or self.tune.chunkSize)
+        tuning.configure(conn.sock, tuning.agree(rcvbuf, self.tune.sndbuf), tuning.agree(sndbuf, self.tune.rcvbuf), self.tune.nodelay)
+        conn.resize(chunkSize)
+        conn.tuner = tuning.AutoTuner(chunkSize) if auto else None
+        conn.BUFFER = [codec.packTuneReply(0 if auto else chunkSize, *tuning.buffers(conn.sock))]
+        self.logger.info(f"Tuned {conn.addr} to {'auto from ' if auto else ''}{chunkSize} byte chunks")
+        return "111"
+
+    def _install(self, part, fn, hasher=None):
+        """replaces fn with a completely received partial file and adds it to the store
+
+        Args:
+            part (str): partial filename
+            fn (str): filename
+            hasher (object, optional): store digest fed while the file was written, from
+                _digesting. Defaults to None.
+        """
+        before = self.index.mtimes(fn)
+        os.replace(part, fn)
+        self._invalidate(before, part, fn)
+        self._intern(fn, hasher)
+
+    def _digesting(self, file):
+        """wraps the file an upload is written to so the store's digest is taken on the way,
+        instead of reading the file again once it is installed
+
+        Args:
+            file (file): open partial file
+
+        Returns:
+            tuple(file,object): file to write the upload to and the digest fed by it, None
+                if the server keeps no store
+        """
+        if self.store is None:
+            return file, None
+        hasher = store.new()
+        return checksum.Writer(file, hasher), hasher
+
+    def _invalidate(self, before, *fns):
+        """drops cached responses and refreshes the listed entries of files that were
+        replaced or renamed
+
+        Args:
+            before (dict): mtimes of their directories from DirIndex.mtimes, taken before
+                the files were written
+            fns (str): filenames
+        """
+        if self.cache is not None:
+            # responses are cached separately for connections with 4 and 8 byte sizes
+            self.cache.invalidate(*[(fn, wide) for fn in fns for wide in [False, True]])
+        self.index.update(before, *fns)
+
+    def _intern(self, fn, hasher=None):
+        """adds a completely received file to the store, if the server keeps one. Files
+        without a digest fed while they were written, resumed and range uploads, are read
+
+        Args:
+            fn (str): filename
+            hasher (object, optional): digest of the contents. Defaults to None.
+        """
+        if self.store is not None:
+            self.store.intern(fn, None if hasher is None else hasher.digest(), constants.IO_BUFFER_SIZE)
+
+    def _getResumeName(self, fn):
+        """name of the partial file an interrupted upload of fn is kept in
+
+        Args:
+            fn (str): filename
+
+        Returns:
+            str: partial filename
+        """
+        return f"{fn}{constants.PARTIAL_SUFFIX}"
+
+    def _getFile(self, conn, offset, fn, fs):
+        """handles writing the file's data to the disk while it is being received, the data
+        goes to a partial file that only replaces fn once the whole upload arrived. If the
+        upload breaks off, what arrived is kept as the resumable partial file of fn
+
+        Args:
+            conn (Connection): client connection
+            offset (int): offset of bytes where the file starts in the first chunk
+            fn (str): filename
+            fs (int): file size in bytes
+        """
+        part = self._getPartialName(conn, fn)
+        try:
+            with open(part, 'wb') as file:
+                target, hasher = self._digesting(file)
+                self._recvFile(conn, target, fs, conn.BUFFER[0][offset:])
+        except BaseException:
+            os.replace(part, self._getResumeName(fn))
+            raise
+        self._install(part, fn, hasher)
+
+    def _getPartialName(self, conn, fn):
+        """name of the partial file an upload is written to until it completes, unique per
+        connection so concurrent uploads of the same file don't write over each other
+
+        Args:
+            conn (Connection): client connection
+            fn (str): filename
+
+        Returns:
+            str: partial filename
+        """
+        return f"{fn}.{id(conn):x}{constants.PARTIAL_SUFFIX}"
+
+    def _sendResponse(self, code, conn):
         """Send response to the client
 
         Args:
             code (str): response code
-            c (socket): client socket
+            conn (Connection): client connection
         """
         if code == "000":
-            c.send((0).to_bytes(1, 'big'))
+            conn.sock.send(codec.packOp("000"))
+        if code == "111":
+            self._sendExtended(conn)
         if code in ["001", "110"]:
-            self._sendFile(c)
-        if code in ["010", "011", "101"]:
-            self._sendError("010", c)
+            self._sendFile(conn)
+        if code == "100":
+            self._sendError("100", conn)
+        # unknown requests keep their own code, so they aren't counted as refused ones
+        if code == "011":
+            self._sendError("011", conn)
+        if code in ["010", "101"]:
+            self._sendError("010", conn)
+
+    def _sendExtended(self, conn):
+        """sends the buffered extended response and the file range or tree left on the
+        connection, if any. A batch header is followed by one ordinary get response per
+        requested file, in the order they were requested
+
+        Args:
+            conn (Connection): client connection
+        """
+        root, conn.tree = conn.tree, None
+        with tuning.cork(conn.sock, self.tune.nodelay and root is not None):
+            self._sendFile(conn)
+            if root is not None:
+                self.logger.info(f'Sent {tree.sendTree(conn.sock, root, conn.chunkSize)} bytes of {root}')
+        batch, conn.batch = conn.batch, []
+        for each in batch:
+            conn.BUFFER = [codec.packName("001", each)]
+            res = self._handleGet(conn)
+            self._sendResponse("001" if res == True else res, conn)
     
-    def _sendError(self, code, c):
+    def _sendError(self, code, conn):
         """send error response to the client
 
         Args:
             code (str): response code
-            c (socket): client socket
+            conn (Connection): client connection
         """
-        c.send(self._bitstring_to_bytes(code+"00000"))
+        self.metrics.error(code)
+        conn.sock.send(codec.packOp(code))
 
-    def _sendFile(self, c):
-        """handles sending whatever data/file that's in the buffer to the client in chunks
-        equal to the predefined variable
+    def _sendFile(self, conn):
+        """handles sending whatever data that's in the buffer to the client followed by the
+        file left open on the connection, if any
 
         Args:
-            c (socket): client socket
+            conn (Connection): client connection
         """
-        req = self.BUFFER[0]
-        chunks = self._chunker(req, self.ChunkSize)
-        n = len(chunks)
-        self.logger.info(f'File is chunked into {n}')
-        for i in tqdm(range(n), desc="sending file"):
-            c.send(chunks[i])
-        c.send(bytes(self.ChunkSize))
-    
-    def _chunker(self, iterable, n, fillvalue=b'\x00'):
-        """handles chunking any bytes string into n equal chunks, if the last chunk
-        is not of size n it will be padded with the fillvalue
+        try:
+            if conn.version >= framing.VERSION_FRAMED:
+                # the header waits for the first segment of the file instead of leaving alone
+                with tuning.cork(conn.sock, self.tune.nodelay and conn.file is not None):
+                    conn.sock.sendall(conn.BUFFER[0])
+                    sent = len(conn.BUFFER[0])
+                    if conn.file is not None:
+                        sent += self._sendFileData(conn)
+            else:
+                sent = self._sendChunked(conn)
+        finally:
+            conn.compression = None
+            conn.checksum = None
+            if conn.file is not None:
+                conn.file.close()
+                conn.file = None
+        self.logger.info(f'Sent {sent} bytes')
+
+    def _sendChunked(self, conn):
+        """sends the buffer and the open file with the legacy framing, one send call per chunk,
+        the last chunk padded and followed by the empty end chunk. Legacy clients only stay
+        aligned on chunk boundaries if no send carries more than a chunk, so the file is read in
+        blocks and cut into chunks here instead of going through sendfile
+
+        Args:
+            conn (Connection): client connection
+
+        Returns:
+            int: number of bytes sent, without the padding and end chunk
+        """
+        rest = conn.BUFFER[0]
+        sent = len(rest)
+        remaining = conn.fileSize if conn.file is not None else 0
+        while remaining:
+            block = conn.file.read(min(conn.chunkSize, remaining))
+            if not block:
+                raise OSError(f"file changed size while being sent, {remaining} bytes missing")
+            remaining -= len(block)
+            sent += len(block)
+            data = rest + block
+            whole = len(data) - len(data) % self.ChunkSize
+            for chunk in chunking.chunker(memoryview(data)[:whole], self.ChunkSize):
+                conn.sock.sendall(chunk)
+            rest = data[whole:]
+        chunking.sendChunked(conn.sock, rest, self.ChunkSize)
+        return sent
+
+    def _sendFileData(self, conn):
+        """sends the file left open on the connection, the kernel copies it straight from
+        the page cache to the socket with sendfile so the data never enters python. Platforms
+        and files that can't use sendfile fall back to reading into a reused buffer. A file
+        negotiated to go compressed is read and compressed one block at a time instead, and
+        one negotiated to go checked is read so every block can be added to its digest
 
         Args:
-            iterable (bytes): bytes string to chunk
-            n (int): chunk size
-            fillvalue (bytes, optional): padding fill value. Defaults to b'\x00'.
+            conn (Connection): client connection
 
         Returns:
-            list(bytes): list of the bytes chunks
+            int: number of bytes sent
         """
-        args = [iter(iterable)] * n
-        ans = list(zip_longest(fillvalue=fillvalue, *args))
-        fin = []
-        for sub in ans:
-            chunk = b''
-            for each in sub:
-                if isinstance(each, bytes): chunk += each
-                else: chunk += int(each).to_bytes(1, 'big')
-            fin.append(chunk)
-        return fin
+        if conn.compression:
+            return compression.sendFile(conn.sock, conn.file, conn.fileSize, conn.compression, conn.chunkSize)
+        if conn.checksum:
+            return checksum.sendFile(conn.sock, conn.file, conn.fileSize, conn.checksum, conn.chunkSize)
+        if not conn.fileSize:
+            # sendfile takes a count of 0 as "up to the end of the file"
+            return 0
+        if self.UseSendfile and self.progress is None:
+            # socket.sendfile already falls back to send() where os.sendfile is unavailable
+            sent = conn.sock.sendfile(conn.file, conn.file.tell(), conn.fileSize)
+        elif self.UseSendfile:
+            # split so progress can be reported in between
+            sent = 0
+            offset = conn.file.tell()
+            with progress.track(self.progress, f"sending to {conn.addr}", conn.fileSize) as bar:
+                while sent < conn.fileSize:
+                    n = conn.sock.sendfile(conn.file, offset + sent, min(conn.chunkSize << 4, conn.fileSize - sent))
+                    if not n:
+                        break
+                    sent += n
+                    bar.update(n)
+        else:
+            sent = 0
+            buf = memoryview(bytearray(conn.chunkSize))
+            with progress.track(self.progress, f"sending to {conn.addr}", conn.fileSize) as bar:
+                while sent < conn.fileSize:
+                    n = conn.file.readinto(buf[:min(len(buf), conn.fileSize - sent)])
+                    if not n:
+                        break
+                    conn.sock.sendall(buf[:n])
+                    sent += n
+                    bar.update(n)
+        if sent != conn.fileSize:
+            raise OSError(f"file changed size while being sent, sent {sent} of {conn.fileSize} bytes")
+        return sent
 
 
-if len(sys.argv) < 2:
-    raise ValueError('Please provide server hostname and port.')
-if sys.argv[2]:
-    s = Server(sys.argv[1], sys.argv[2])
-else:
-    s = Server(sys.argv[1])
-s.operate()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ftp server")
+    parser.add_argument("port", help="port number for the server")
+    parser.add_argument("loglevel", nargs="?", type=int, default=0, help="0 no logging, 1 terminal debug, 2 terminal and file logging")
+    parser.add_argument("--mode", choices=constants.MODES, default=constants.MODE_THREAD, help="how connections are dispatched to workers")
+    parser.add_argument("--workers", type=int, default=constants.DEFAULT_WORKERS, help="size of the worker pool")
+    parser.add_argument("--store", nargs="?", const=constants.STORE_DIR, help="deduplicate stored files through a content addressed store in this directory")
+    parser.add_argument("--cache", type=int, default=constants.CACHE_SIZE >> 20, help="megabytes of small files kept in memory for get, 0 disables the cache")
+    parser.add_argument("--trace", help="write timing spans of every request stage to this file, in the Chrome trace format")
+    parser.add_argument("--profile", help="write cProfile dumps of the connections to this directory")
+    parser.add_argument("--profile-rate", type=float, help="share of the connections profiled, 1 by default")
+    parser.add_argument("--progress", action="store_true", help="log the progress of every transfer")
+    parser.add_argument("--chunk-size", default=str(tuning.DEFAULT_CHUNK >> 10), help="kilobytes framed transfers are moved in, or auto to tune it from measured throughput")
+    parser.add_argument("--sndbuf", type=int, default=0, help="socket send buffer in kilobytes, 0 keeps the system default")
+    parser.add_argument("--rcvbuf", type=int, default=0, help="socket receive buffer in kilobytes, 0 keeps the system default")
+    parser.add_argument("--no-nodelay", action="store_true", help="leave Nagle's algorithm on and don't cork bulk data")
+    args = parser.parse_args()
+    auto = args.chunk_size == "auto"
+    tune = tuning.Settings(tuning.DEFAULT_CHUNK if auto else int(args.chunk_size) << 10, args.sndbuf << 10, args.rcvbuf << 10, not args.no_nodelay, auto)
+    s = Server(args.port, args.loglevel, args.mode, args.workers, args.store, args.cache << 20, args.trace, args.profile, args.profile_rate,
+               progress.LogProgress(logging.getLogger()) if args.progress else None, tune)
+    s.operate()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import os, sys, socket, subprocess
+import pytest
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.append(ROOT)
+from common import codec, framing
+from common.loopback import freePort, waitListening
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+shared test fixtures
+
+Every test talks to a real server over loopback. The server runs from its command line in a
+child process serving a temporary directory while the test runs in a second one, client and
+server both have a constants module so the server is never imported here. Its stderr goes to
+a file next to both directories so tests can look at what it logged
+"""
+
+@pytest.fixture
+def startServer(tmp_path, monkeypatch):
+    """starts servers serving tmp_path/server, the test runs in tmp_path/client and the stderr
+    of the servers goes to tmp_path/server.err
+
+    Yields:
+        function: called with the extra command line arguments and optionally script="async_server.py",
+            returns the port and the served directory
+    """
+    served = tmp_path / "server"
+    local = tmp_path / "client"
+    served.mkdir()
+    local.mkdir()
+    monkeypatch.chdir(local)
+    procs = []
+    def start(*args, script="server.py", env=None):
+        port = freePort()
+        with open(tmp_path / "server.err", 'ab') as err:
+            procs.append(subprocess.Popen([sys.executable, os.path.join(ROOT, "server", script), str(port), *args],
+                                          cwd=served, stderr=err, env=dict(os.environ, **(env or {}))))
+        waitListening(port)
+        return port, served
+    try:
+        yield start
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+@pytest.fixture(params=["server.py", "async_server.py"])
+def anyServer(request, startServer):
+    """a threaded and an asyncio server with the default options, the test runs against each
+
+    Returns:
+        tuple(int,pathlib.Path): port and served directory
+    """
+    return startServer(script=request.param)
+
+@pytest.fixture
+def server(startServer):
+    """a server with the default options
+
+    Returns:
+        tuple(int,pathlib.Path): port and served directory
+    """
+    return startServer()
+
+def serverCommands(port):
+    """the commands a server lists in its help response
+
+    Args:
+        port (int): port the server listens on
+
+    Returns:
+        list[str]: commands
+    """
+    with socket.create_connection(("localhost", port)) as sock:
+        sock.sendall(codec.packOp("011", framing.VERSION))
+        framing.recvExact(sock, 1)
+        sock.sendall(codec.packOp("011"))
+        header = framing.recvExact(sock, 1+codec.SIZE.size)
+        return framing.recvExact(sock, codec.unpackSize(header, 1)).decode('utf-8').split("\n")
+
+def connected(port, **kwargs):
+    """an interactive client connected to a server, with errors of its own
+
+    Args:
+        port (int): port the server listens on
+        kwargs: passed on to client
+
+    Returns:
+        client: connected and negotiated client
+    """
+    from client.client import client
+    c = client("localhost", port, **kwargs)
+    c.Errors = []
+    c.connect()
+    return c
@@ -0,0 +1,103 @@
+import io, os, subprocess, sys, threading
+import pytest
+from client import api
+from conftest import ROOT
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+client library tests
+
+api.Client borrows negotiated connections from a pool shared between threads and gives them
+back after every call. Refused requests raise TransferError, streams keep their connection
+borrowed until they are read to the end or closed
+"""
+
+def test_put_get_rename(anyServer):
+    port, served = anyServer
+    data = os.urandom(200000)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    with api.Client("localhost", port) as ftp:
+        ftp.put("a.bin", "b.bin")
+        ftp.rename("b.bin", "c.bin")
+        assert ftp.get("c.bin", "d.bin") == "d.bin"
+    assert (served / "c.bin").read_bytes() == data
+    assert not (served / "b.bin").exists()
+    with open("d.bin", 'rb') as file:
+        assert file.read() == data
+
+def test_connection_reused(server):
+    port, served = server
+    (served / "a.txt").write_bytes(b"a")
+    with api.Client("localhost", port, poolSize=2) as ftp:
+        for _ in range(5):
+            ftp.get("a.txt")
+        assert ftp.pool.idle.qsize() == 1
+
+def test_refused_request_raises(server):
+    port, _ = server
+    with api.Client("localhost", port) as ftp:
+        with pytest.raises(api.TransferError):
+            ftp.get("missing")
+        with pytest.raises(api.TransferError):
+            ftp.getStream("missing")
+        # the connections stay usable after a refusal
+        assert ftp.pool.idle.qsize() == 1
+        with pytest.raises(api.TransferError):
+            ftp.rename("missing", "other")
+
+def test_streams(anyServer):
+    port, served = anyServer
+    data = os.urandom(300000)
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        ftp.putStream(io.BytesIO(data), "a.bin", len(data))
+        with open("local.bin", 'wb') as file:
+            file.write(data[:1000])
+        with open("local.bin", 'rb') as file:
+            ftp.putStream(file, "b.bin")
+        with ftp.getStream("a.bin") as stream:
+            assert stream.read() == data
+        # closed halfway, the connection is dropped instead of given back
+        stream = ftp.getStream("a.bin")
+        assert stream.read(10) == data[:10]
+        stream.close()
+        assert ftp.pool.idle.qsize() == 0
+        with ftp.getStream("a.bin") as stream:
+            assert stream.read() == data
+    assert (served / "a.bin").read_bytes() == data
+    assert (served / "b.bin").read_bytes() == data[:1000]
+
+def test_threads_share_pool(anyServer):
+    port, served = anyServer
+    files = {f"f{i}.bin": os.urandom(i * 10000) for i in range(8)}
+    for name, data in files.items():
+        (served / name).write_bytes(data)
+    errors = []
+    with api.Client("localhost", port, poolSize=3) as ftp:
+        def fetch(name):
+            try:
+                ftp.get(name, f"got_{name}")
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=fetch, args=(name,)) for name in files]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert ftp.pool.idle.qsize() <= 3
+    assert not errors
+    for name, data in files.items():
+        with open(f"got_{name}", 'rb') as file:
+            assert file.read() == data
+
+def test_imports_as_package(tmp_path):
+    # the client's constants don't shadow the server's, or anything else named constants
+    os.symlink(os.path.abspath(ROOT), tmp_path / "FTPSocketPy")
+    subprocess.run([sys.executable, "-c", "import sys; from FTPSocketPy.client.api import Client; "
+                    "from FTPSocketPy.client import constants; assert 'constants' not in sys.modules; "
+                    "assert constants.HLIST"], cwd=tmp_path, check=True)
+
+def test_client_runs_as_script():
+    done = subprocess.run([sys.executable, os.path.join(ROOT, "client", "async_client.py")], capture_output=True, text=True)
+    assert "Please provide server hostname" in done.stderr
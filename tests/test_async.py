@@ -0,0 +1,137 @@
+import asyncio, os, socket, threading
+import pytest
+from client import api, constants
+from client.async_client import AsyncClient
+from common import codec, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+asyncio server and client tests
+
+The asyncio server and client speak the same protocol as the threaded ones, so each is
+checked against the other and against its threaded counterpart, on framed and on legacy
+connections. A download the server breaks off has to leave the local file alone and keep
+what arrived in the partial file
+"""
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def connected(port):
+    c = AsyncClient("localhost", port)
+    await c.connect()
+    return c
+
+@pytest.fixture
+def legacy(monkeypatch):
+    monkeypatch.setattr(framing, "VERSION", framing.VERSION_LEGACY)
+
+def test_client_inherits_client_state():
+    c = AsyncClient("localhost", 1)
+    assert c.chunkSize == c.tune.chunkSize
+    assert c.progress is None and c.tuner is None and c.compression is None
+    c._observe(1 << 20, 1.0)
+    c.client.close()
+
+@pytest.mark.parametrize("framed", [True, False])
+def test_put_get_change(anyServer, monkeypatch, framed):
+    port, served = anyServer
+    if not framed:
+        monkeypatch.setattr(framing, "VERSION", framing.VERSION_LEGACY)
+    # whole chunks of zeros end a legacy transfer early
+    data = os.urandom(300000) + (bytes(4096) if framed else b'')
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    async def session():
+        c = await connected(port)
+        try:
+            assert c.version == (framing.VERSION if framed else framing.VERSION_LEGACY)
+            assert await c.put("a.bin") == "000"
+            assert await c.change("a.bin", "b.bin") == "000"
+            os.remove("a.bin")
+            assert await c.get("b.bin") == "001"
+            assert await c.get("missing.bin") == "010"
+        finally:
+            await c.close()
+    run(session())
+    assert (served / "b.bin").read_bytes() == data
+    with open("b.bin", 'rb') as file:
+        got = file.read()
+    assert got[:len(data)] == data
+    # legacy clients keep the padding of the last chunk
+    assert len(got) == len(data) if framed else not got[len(data):].strip(b'\x00')
+    assert not os.path.exists(f"b.bin{constants.PARTIAL_SUFFIX}")
+
+def test_mget_and_pipeline(anyServer):
+    port, served = anyServer
+    for i in range(3):
+        (served / f"f{i}.txt").write_bytes(b"x" * i * 1000)
+    async def session():
+        c = await connected(port)
+        try:
+            assert await c.mget("f0.txt", "f1.txt", "missing.txt", "f2.txt") == ["001", "001", "010", "001"]
+            assert await c.pipeline([["change", "f0.txt", "g0.txt"], ["get", "g0.txt"], ["get", "f1.txt"]]) == ["000", "001", "001"]
+        finally:
+            await c.close()
+    run(session())
+    for i in range(3):
+        assert os.path.getsize(f"f{i}.txt") == i * 1000
+    assert os.path.exists("g0.txt")
+
+@pytest.mark.parametrize("framed", [True, False])
+def test_help_lists_every_command(anyServer, monkeypatch, framed):
+    port, served = anyServer
+    if not framed:
+        monkeypatch.setattr(framing, "VERSION", framing.VERSION_LEGACY)
+    async def session():
+        c = await connected(port)
+        try:
+            return await c.help()
+        finally:
+            await c.close()
+    commands = run(session()).split("\n")
+    assert commands[0] == "put" and commands[-1] == "bye"
+    assert "help" in commands
+
+def test_threaded_client_against_async_server(startServer):
+    port, served = startServer(script="async_server.py")
+    with open("a.bin", 'wb') as file:
+        file.write(os.urandom(200000))
+    with api.Client("localhost", port, poolSize=2) as ftp:
+        ftp.put("a.bin", "b.bin")
+        ftp.get("b.bin", "c.bin")
+    with open("a.bin", 'rb') as a, open("c.bin", 'rb') as c:
+        assert a.read() == c.read()
+
+def test_interrupted_download_keeps_local_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    listener = socket.create_server(("localhost", 0))
+    port = listener.getsockname()[1]
+    def serve():
+        conn, _ = listener.accept()
+        with conn:
+            conn.recv(1)
+            conn.sendall(codec.packOp("111", framing.VERSION))
+            conn.recv(64)
+            conn.sendall(codec.packHeader("001", "a.bin", 1000, wide=True) + b"y" * 100)
+    server = threading.Thread(target=serve)
+    server.start()
+    with open("a.bin", 'wb') as file:
+        file.write(b"old")
+    async def session():
+        c = await connected(port)
+        try:
+            with pytest.raises(ConnectionError):
+                await c.get("a.bin")
+        finally:
+            await c.close()
+    try:
+        run(session())
+    finally:
+        server.join()
+        listener.close()
+    with open("a.bin", 'rb') as file:
+        assert file.read() == b"old"
+    with open(f"a.bin{constants.PARTIAL_SUFFIX}", 'rb') as file:
+        assert file.read() == b"y" * 100
@@ -0,0 +1,28 @@
+import os, sys, json, subprocess
+import pytest
+from conftest import ROOT
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+loopback benchmark tests
+
+A short run of bench_loopback.py in every server mode, the benchmark starts its own server
+and has to write results of every section that can be compared between runs
+"""
+
+@pytest.mark.parametrize("mode", ["thread", "selector", "async"])
+def test_bench_writes_results(tmp_path, mode):
+    out = tmp_path / "results.json"
+    subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "bench_loopback.py"), "--mode", mode, "--sizes", "1", "64",
+                    "--repeat", "1", "--latency", "5", "--clients", "2", "--concurrency-size", "1", "--requests", "3",
+                    "--output", str(out)], check=True, capture_output=True, timeout=120)
+    results = json.loads(out.read_text())
+    assert results["meta"]["args"]["mode"] == mode
+    assert [(r["sizeKB"], r["op"]) for r in results["throughput"]] == [(1, "put"), (1, "get"), (64, "put"), (64, "get")]
+    assert all(r["median"] > 0 for r in results["throughput"])
+    assert set(results["latency"]) == {"help", "change", "get"}
+    assert all(r["n"] == 5 for r in results["latency"].values())
+    assert [r["clients"] for r in results["concurrency"]] == [1, 2]
+    assert [r["requests"] for r in results["concurrency"]] == [3, 6]
+    assert results["rss"]["clientKB"] > 0
@@ -0,0 +1,85 @@
+import os
+import pytest
+from types import SimpleNamespace
+from common import cache
+from conftest import connected
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+file cache tests
+
+The server keeps small files in memory together with their get response header. An entry is
+only served while the inode, mtime and size of the file are unchanged, uploads and renames drop
+it straight away and --cache 0 turns the cache off
+"""
+
+def stat(ino=1, mtime=1, size=3):
+    return SimpleNamespace(st_ino=ino, st_mtime_ns=mtime, st_size=size)
+
+def test_hit_and_miss():
+    c = cache.FileCache(100, 10)
+    assert c.get(("a",), stat()) is None
+    c.put(("a",), stat(), b"abc")
+    assert c.get(("a",), stat()) == b"abc"
+    assert c.stats() == {"hits": 1, "misses": 1, "evictions": 0, "entries": 1, "bytes": 3}
+
+@pytest.mark.parametrize("changed", [stat(ino=2), stat(mtime=2), stat(size=4)])
+def test_stale_entry_dropped(changed):
+    c = cache.FileCache(100, 10)
+    c.put(("a",), stat(), b"abc")
+    assert c.get(("a",), changed) is None
+    assert c.stats()["entries"] == 0 and c.stats()["bytes"] == 0
+
+def test_least_recently_used_evicted():
+    c = cache.FileCache(10, 10)
+    c.put(("a",), stat(), b"x" * 4)
+    c.put(("b",), stat(), b"x" * 4)
+    c.get(("a",), stat())
+    c.put(("c",), stat(), b"x" * 4)
+    assert c.get(("b",), stat()) is None
+    assert c.get(("a",), stat()) is not None and c.get(("c",), stat()) is not None
+    assert c.stats()["evictions"] == 1
+
+def test_invalidate_and_fits():
+    c = cache.FileCache(100, 10)
+    c.put(("a",), stat(), b"abc")
+    c.invalidate(("a",), ("missing",))
+    assert c.get(("a",), stat()) is None
+    assert c.fits(10) and not c.fits(11)
+
+def fetch(c, name):
+    c._request(["get", name])
+    with open(name, 'rb') as file:
+        return file.read()
+
+@pytest.mark.parametrize("args", [[], ["--cache", "0"]])
+def test_get_after_outside_change(startServer, args):
+    port, served = startServer(*args)
+    (served / "a.txt").write_bytes(b"first")
+    c = connected(port)
+    assert fetch(c, "a.txt") == b"first"
+    assert fetch(c, "a.txt") == b"first"
+    # written behind the server's back, a new inode and size
+    os.remove(served / "a.txt")
+    (served / "a.txt").write_bytes(b"second version")
+    assert fetch(c, "a.txt") == b"second version"
+    c.client.close()
+    assert not c.Errors
+
+def test_get_after_put_and_change(server):
+    port, served = server
+    (served / "a.txt").write_bytes(b"served")
+    (served / "b.txt").write_bytes(b"other")
+    c = connected(port)
+    assert fetch(c, "a.txt") == b"served"
+    assert fetch(c, "b.txt") == b"other"
+    with open("a.txt", 'wb') as file:
+        file.write(b"uploaded")
+    c._request(["put", "a.txt"])
+    assert fetch(c, "a.txt") == b"uploaded"
+    os.remove("b.txt")
+    c._request(["change", "a.txt", "b.txt"])
+    assert fetch(c, "b.txt") == b"uploaded"
+    c.client.close()
+    assert not c.Errors
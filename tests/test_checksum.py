@@ -0,0 +1,77 @@
+import io, os, socket, zlib
+import pytest
+from common import checksum, codec, framing
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+checked transfer tests
+
+With verify on, get and put send the digest of the file after its contents. Both sides add
+every block to the digest on the way, a file that doesn't match is thrown away and an upload
+that doesn't match is answered with "100"
+"""
+
+@pytest.mark.parametrize("name", ["crc32", "blake2b"])
+def test_send_and_receive(name):
+    data = os.urandom(100000)
+    a, b = socket.socketpair()
+    with a, b:
+        assert checksum.sendFile(a, io.BytesIO(data), len(data), name, 4096) == len(data) + checksum.digestSize(name)
+        out = io.BytesIO()
+        assert checksum.recvFile(framing.Receiver(b), out, len(data), name, 4096)
+    assert out.getvalue() == data
+
+def test_crc32_matches_zlib():
+    h = checksum.new("crc32")
+    h.update(b"abc")
+    h.update(b"def")
+    assert h.digest() == codec.SIZE.pack(zlib.crc32(b"abcdef"))
+
+@pytest.mark.parametrize("name", ["crc32", "blake2b"])
+@pytest.mark.parametrize("size", [0, 1, 300000])
+def test_checked_put_and_get(anyServer, name, size):
+    port, served = anyServer
+    data = os.urandom(size)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    c = connected(port)
+    c.checksum = name
+    c._checkedPut("a.bin")
+    assert (served / "a.bin").read_bytes() == data
+    os.remove("a.bin")
+    c._checkedGet("a.bin")
+    c.client.close()
+    assert not c.Errors
+    with open("a.bin", 'rb') as file:
+        assert file.read() == data
+
+def test_corrupted_put_thrown_away(anyServer):
+    port, served = anyServer
+    (served / "a.bin").write_bytes(b"old")
+    data = os.urandom(5000)
+    c = connected(port)
+    wide = c.version >= framing.VERSION_WIDE
+    c.client.sendall(codec.packChecked(codec.EXT_CHECKED_PUT, "crc32", "a.bin", len(data), wide))
+    algorithm, _ = codec.unpackCheckedReply(c.receiver.recvMessage(codec.checkedReplySize, wide), wide)
+    assert algorithm == "crc32"
+    c.client.sendall(data + codec.SIZE.pack(zlib.crc32(data) ^ 1))
+    operation, _ = c._getOp(c.receiver.recvExact(1))
+    c.client.close()
+    assert operation == "100"
+    assert os.listdir(served) == ["a.bin"]
+    assert (served / "a.bin").read_bytes() == b"old"
+
+def test_checked_get_missing(anyServer):
+    port, _ = anyServer
+    c = connected(port)
+    c.checksum = "crc32"
+    c._checkedGet("missing")
+    c.client.close()
+    assert c.Errors
+    assert not os.path.exists("missing")
+
+def test_help_lists_verify(server):
+    port, _ = server
+    assert "verify" in serverCommands(port)
@@ -0,0 +1,70 @@
+import os, socket
+import pytest
+from client import api
+from common import chunking, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+chunking tests
+
+The chunker hands out memoryview slices of whole chunks and only copies the padded last
+one, sendChunked sends every chunk in its own call followed by the empty end chunk, and
+ranges splits a file for parallel transfers and cover merges the ranges that arrived. Legacy uploads and downloads cut into chunks
+this way have to arrive intact on both sides of every chunk boundary
+"""
+
+@pytest.mark.parametrize("size", [0, 1, 1023, 1024, 1025, 4096, 5000])
+def test_chunker(size):
+    data = os.urandom(size)
+    chunks = list(chunking.chunker(data, 1024))
+    assert all(len(each) == 1024 for each in chunks)
+    assert b''.join(chunks) == data + chunking.padding(size, 1024)
+    assert all(isinstance(each, memoryview) for each in chunks[:size // 1024])
+
+def test_slices():
+    data = os.urandom(10000)
+    pieces = list(chunking.slices(data, 4096))
+    assert [len(each) for each in pieces] == [4096, 4096, 1808]
+    assert b''.join(pieces) == data
+
+@pytest.mark.parametrize("size,n,minimum,expected", [
+    (0, 4, 1, [(0, 0)]),
+    (10, 4, 1, [(0, 3), (3, 3), (6, 3), (9, 1)]),
+    (100, 4, 50, [(0, 50), (50, 50)]),
+    (100, 4, 1000, [(0, 100)]),
+])
+def test_ranges(size, n, minimum, expected):
+    assert chunking.ranges(size, n, minimum) == expected
+
+@pytest.mark.parametrize("covered,start,end,expected", [
+    ([], 0, 500, [(0, 500)]),
+    ([(0, 500)], 100, 600, [(0, 600)]),
+    ([(0, 500)], 500, 600, [(0, 600)]),
+    ([(0, 100), (200, 300)], 50, 250, [(0, 300)]),
+    ([(200, 300)], 0, 100, [(0, 100), (200, 300)]),
+    ([(0, 100)], 50, 50, [(0, 100)]),
+])
+def test_cover(covered, start, end, expected):
+    assert chunking.cover(covered, start, end) == expected
+
+def test_send_chunked():
+    a, b = socket.socketpair()
+    with a, b:
+        chunking.sendChunked(a, b"x" * 1500, 1024)
+        received = framing.recvExact(b, 3 * 1024)
+    assert received == b"x" * 1500 + bytes(548) + bytes(1024)
+
+@pytest.mark.parametrize("size", [1, 1019, 1020, 2048, 100000])
+def test_legacy_round_trip(server, monkeypatch, size):
+    port, served = server
+    monkeypatch.setattr(framing, "VERSION", framing.VERSION_LEGACY)
+    data = os.urandom(size).replace(b'\x00', b'\x01')
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        ftp.put("a.bin", "b.bin")
+        ftp.get("b.bin")
+    assert (served / "b.bin").read_bytes() == data
+    with open("b.bin", 'rb') as file:
+        assert file.read().rstrip(b'\x00') == data
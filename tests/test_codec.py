@@ -0,0 +1,73 @@
+import socket
+import pytest
+from common import codec, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+header codec tests
+
+Every request and response the codec packs has to come back unchanged from its unpack
+counterpart, requestSize has to tell the length of a request from any prefix of it, and the
+server has to parse requests packed here the same way when they arrive split into pieces
+"""
+
+@pytest.mark.parametrize("opcode", codec.OPCODES)
+@pytest.mark.parametrize("low", [0, 1, 31])
+def test_op_round_trip(opcode, low):
+    assert codec.unpackOp(codec.packOp(opcode, low)) == (opcode, low)
+
+@pytest.mark.parametrize("name", ["a", "file.txt", "é.txt", "x" * codec.MAX_NAME])
+def test_names(name):
+    assert codec.unpackName(codec.packName("001", name)) == ("001", name)
+    assert codec.unpackChange(codec.packChange("010", name, "new.txt")) == (name, "new.txt")
+
+def test_name_too_long():
+    with pytest.raises(ValueError):
+        codec.packName("001", "x" * (codec.MAX_NAME + 1))
+
+@pytest.mark.parametrize("wide", [False, True])
+def test_extended_round_trips(wide):
+    assert codec.unpackBatch(codec.packBatch(["a", "bb", "ccc"])) == ["a", "bb", "ccc"]
+    assert codec.unpackRange(codec.packRange(codec.EXT_RANGE_PUT, "a", 5, 10, 20, wide), wide) == ("a", 5, 10, 20)
+    assert codec.unpackRangeReply(codec.packRangeReply(20, 10, wide), wide) == (20, 10)
+    assert codec.unpackQuery(codec.packQuery("a.txt")) == "a.txt"
+    assert codec.unpackList(codec.packList("logs", 1000, 500)) == ("logs", 1000, 500)
+    assert codec.unpackStats(codec.packStats("prometheus")) == "prometheus"
+    assert codec.unpackTune(codec.packTune(1 << 20, 0, 4096)) == (1 << 20, 0, 4096)
+    assert codec.unpackTuneReply(codec.packTuneReply(1 << 20, 8192, 8192)) == (1 << 20, 8192, 8192)
+    assert codec.unpackSize(codec.packSize(12345, wide), wide=wide) == 12345
+
+def test_list_reply_round_trip():
+    entries = [("a.txt", 0, 10, 123), ("dir", 1, 0, 456)]
+    reply = codec.packListReply(2, entries)
+    assert codec.unpackListReply(reply[1+codec.SIZE.size:]) == (2, entries)
+
+@pytest.mark.parametrize("message", [
+    codec.packName("001", "file.txt"),
+    codec.packChange("010", "old.txt", "new.txt"),
+    codec.packOp("011"),
+    codec.packHeader("000", "file.txt", 10, True),
+    codec.packBatch(["a", "b"]),
+])
+def test_messagesize_from_every_prefix(message):
+    n = len(message)
+    for cut in range(n):
+        needed = codec.requestSize(message[:cut], True, wide=True)
+        assert cut < needed <= n
+    assert codec.requestSize(message, True, wide=True) == n
+    assert codec.requestSize(message + b"trailing", True, wide=True) == n
+
+def test_split_requests_over_loopback(server):
+    port, served = server
+    (served / "a.txt").write_bytes(b"data")
+    requests = codec.packChange("010", "a.txt", "b.txt") + codec.packName("001", "b.txt")
+    with socket.create_connection(("localhost", port)) as sock:
+        sock.sendall(codec.packOp("011", framing.VERSION))
+        assert codec.unpackOp(sock.recv(1)) == ("111", framing.VERSION)
+        for i in range(len(requests)):
+            sock.sendall(requests[i:i+1])
+        assert codec.unpackOp(framing.recvExact(sock, 1)) == ("000", 0)
+        header = framing.recvExact(sock, codec.headerSize(5, True))
+        assert codec.unpackHeader(header, True) == ("001", "b.txt", 4)
+        assert framing.recvExact(sock, 4) == b"data"
@@ -0,0 +1,84 @@
+import io, os, socket, threading
+import pytest
+from conftest import connected, serverCommands
+from common import compression, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+compression tests
+
+Compressible files go as compressed blocks with every registered codec, files whose sample
+doesn't shrink and codecs the server doesn't know fall back to plain transfers. A receiver
+refuses blocks longer than MAX_BLOCK and data decompressing to more than its announced size
+"""
+
+TEXT = b"".join(b"line %d of a very compressible log file\n" % i for i in range(20000))
+
+def transfer(data, name, size=None):
+    """sends data compressed over a socketpair and receives it again
+
+    Returns:
+        bytes: what the receiver wrote
+    """
+    a, b = socket.socketpair()
+    out = io.BytesIO()
+    with a, b:
+        sender = threading.Thread(target=compression.sendFile, args=(a, io.BytesIO(data), len(data), name))
+        sender.start()
+        try:
+            written = compression.recvFile(framing.Receiver(b), out, name, len(data) if size is None else size)
+        finally:
+            sender.join()
+    assert written == len(out.getvalue())
+    return out.getvalue()
+
+def test_worth_compressing():
+    assert compression.worthCompressing(TEXT[:compression.SAMPLE_SIZE])
+    assert not compression.worthCompressing(os.urandom(compression.SAMPLE_SIZE))
+    assert not compression.worthCompressing(b"a" * (compression.MIN_SIZE - 1))
+
+@pytest.mark.parametrize("name", sorted(compression.CODECS))
+def test_round_trip(name):
+    assert transfer(TEXT, name) == TEXT
+
+@pytest.mark.parametrize("name", sorted(compression.CODECS))
+def test_decompressing_past_announced_size(name):
+    with pytest.raises(ValueError):
+        transfer(TEXT, name, len(TEXT) - 1)
+
+def test_block_too_long():
+    with pytest.raises(ValueError):
+        compression.blockSize((compression.MAX_BLOCK + 1).to_bytes(4, 'big'))
+
+@pytest.mark.parametrize("name", sorted(compression.CODECS))
+@pytest.mark.parametrize("data", [TEXT, os.urandom(100000)], ids=["text", "random"])
+def test_compressed_put_get(anyServer, name, data):
+    port, served = anyServer
+    with open("a.txt", 'wb') as file:
+        file.write(data)
+    c = connected(port)
+    c.compression = name
+    c._compressedPut("a.txt")
+    os.remove("a.txt")
+    c._compressedGet("a.txt")
+    c.client.close()
+    assert not c.Errors
+    assert (served / "a.txt").read_bytes() == data
+    with open("a.txt", 'rb') as file:
+        assert file.read() == data
+    assert os.listdir(".") == ["a.txt"]
+
+def test_unknown_codec_falls_back(server):
+    port, served = server
+    (served / "a.txt").write_bytes(TEXT)
+    c = connected(port)
+    c.compression = "bogus"
+    c._compressedGet("a.txt")
+    c.client.close()
+    with open("a.txt", 'rb') as file:
+        assert file.read() == TEXT
+
+def test_help_lists_compress(server):
+    port, served = server
+    assert "compress" in serverCommands(port)
@@ -0,0 +1,101 @@
+import io, os
+import pytest
+from common import codec, delta, framing
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+delta transfer tests
+
+dput sends only the parts of a file that changed since the server's copy. The server sends
+the signatures of its whole blocks, the client answers with copies of those blocks and the
+literal bytes in between. A copy the server can't make drops the upload, the client is told
+with "010" and the connection carries on with the next request
+"""
+
+N = delta.MIN_BLOCK
+
+def rebuild(old, new):
+    """the instructions match produces, applied to old"""
+    blocks = delta.table(delta.signature(io.BytesIO(old), N))
+    out = b''
+    for kind, first, last in delta.match(new, N, blocks):
+        out += old[first*N:(first+1)*N] if kind == delta.KIND_COPY else new[first:last]
+    return out
+
+@pytest.mark.parametrize("change", ["same", "middle", "prefix", "append", "empty"])
+def test_match_rebuilds(change):
+    old = os.urandom(10 * N + 100)
+    new = {"same": old, "middle": old[:3*N] + b"x" * 10 + old[4*N:], "prefix": b"abc" + old,
+           "append": old + os.urandom(N), "empty": b""}[change]
+    assert rebuild(old, new) == new
+
+def test_match_sends_little_for_a_small_change():
+    old = os.urandom(20 * N)
+    new = old[:5*N] + b"changed" + old[5*N:]
+    blocks = delta.table(delta.signature(io.BytesIO(old), N))
+    literal = sum(last - first for kind, first, last in delta.match(new, N, blocks) if kind == delta.KIND_LITERAL)
+    assert literal < 2 * N
+
+def test_copy_past_end_raises():
+    with pytest.raises(ValueError):
+        delta.copyBlocks(io.BytesIO(b"a" * 2 * N), io.BytesIO(), N, 2, 1, 2)
+
+def test_copy_of_shrunk_copy_raises():
+    # the signatures were made when the copy still had 4 blocks
+    with pytest.raises(ValueError, match="shrank"):
+        delta.copyBlocks(io.BytesIO(b"a" * N), io.BytesIO(), N, 4, 0, 4)
+
+def test_delta_put(anyServer):
+    port, served = anyServer
+    old = os.urandom(50 * N + 7)
+    new = old[:10*N] + b"inserted" + old[10*N:40*N] + old[41*N:]
+    (served / "a.bin").write_bytes(old)
+    with open("a.bin", 'wb') as file:
+        file.write(new)
+    c = connected(port)
+    c._deltaPut("a.bin")
+    c.client.close()
+    assert not c.Errors
+    assert (served / "a.bin").read_bytes() == new
+
+def test_delta_put_without_server_copy(anyServer):
+    port, served = anyServer
+    data = os.urandom(5 * N)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    c = connected(port)
+    c._deltaPut("a.bin")
+    c.client.close()
+    assert not c.Errors
+    assert (served / "a.bin").read_bytes() == data
+
+def test_bad_copy_is_reported(anyServer):
+    port, served = anyServer
+    old = os.urandom(4 * N)
+    (served / "a.bin").write_bytes(old)
+    c = connected(port)
+    wide = c.version >= framing.VERSION_WIDE
+    c.client.sendall(codec.packSignature("a.bin"))
+    n, baseSize, count = codec.unpackSignatureReply(c.receiver.recvExact(codec.signatureReplySize(wide)), wide)
+    c.receiver.recvExact(count * delta.SIGNATURE.size)
+    # a copy past the end followed by a literal the server still has to read
+    c.client.sendall(codec.packDelta("a.bin", n, baseSize, 2 * n, wide)
+                     + delta.INSTRUCTION.pack(delta.KIND_COPY, count, 1)
+                     + delta.INSTRUCTION.pack(delta.KIND_LITERAL, n, 0) + b"x" * n + delta.END)
+    c._awaitResponse()
+    assert c.Errors
+    assert (served / "a.bin").read_bytes() == old
+    assert not [p for p in os.listdir(served) if p != "a.bin"]
+    # the connection is still at a request boundary
+    c.Errors = []
+    c._request(["get", "a.bin"])
+    c.client.close()
+    assert not c.Errors
+    with open("a.bin", 'rb') as file:
+        assert file.read() == old
+
+def test_help_lists_dput(server):
+    port, _ = server
+    assert "dput" in serverCommands(port)
@@ -0,0 +1,47 @@
+import os, socket
+import pytest
+from client import api
+from common import codec, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+framing tests
+
+A help request carrying a version is answered with the version both sides speak, one
+without is answered with the help text the way legacy clients expect it. Once framed, a file
+is delimited by its size alone, so files made of whole chunks of zero bytes, which end a
+legacy transfer early, arrive intact
+"""
+
+def hello(port, version):
+    with socket.create_connection(("localhost", port)) as sock:
+        sock.sendall(codec.packOp("011", version))
+        return codec.unpackOp(sock.recv(1))
+
+@pytest.mark.parametrize("offered,agreed", [(framing.VERSION_FRAMED, framing.VERSION_FRAMED), (framing.VERSION, framing.VERSION), (31, framing.VERSION)])
+def test_negotiation(server, offered, agreed):
+    port, served = server
+    assert hello(port, offered) == ("111", agreed)
+
+def test_legacy_help(server):
+    port, served = server
+    with socket.create_connection(("localhost", port)) as sock:
+        sock.sendall(codec.packOp("011"))
+        chunk = framing.recvExact(sock, 1024)
+        assert codec.unpackOp(chunk[:1])[0] == "110"
+        assert framing.recvExact(sock, 1024) == bytes(1024)
+    assert b"put\nget" in chunk
+
+@pytest.mark.parametrize("data", [bytes(4096), b"a" + bytes(8192), bytes(1024) + b"z", b""])
+def test_zero_chunks_survive(server, data):
+    port, served = server
+    with open("zeros.bin", 'wb') as file:
+        file.write(data)
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        ftp.put("zeros.bin")
+        os.remove("zeros.bin")
+        ftp.get("zeros.bin")
+    assert (served / "zeros.bin").read_bytes() == data
+    with open("zeros.bin", 'rb') as file:
+        assert file.read() == data
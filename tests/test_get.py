@@ -0,0 +1,52 @@
+import os
+import pytest
+from client import api, constants
+from common import framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+sendfile get tests
+
+Get responses go out with socket.sendfile, in one call or split so progress can be logged
+in between. Files of every size have to arrive whole with the cache on and off, on framed
+and on legacy connections, and a missing file is refused without breaking the connection
+"""
+
+SIZES = [0, 1, 1024, 65535, 2 * 1024 * 1024 + 7]
+
+@pytest.mark.parametrize("options", [[], ["--cache", "0"], ["--cache", "0", "--progress"]])
+def test_get(startServer, options):
+    port, served = startServer(*options)
+    files = {f"f{size}.bin": os.urandom(size) for size in SIZES}
+    for name, data in files.items():
+        (served / name).write_bytes(data)
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        for _ in range(2):
+            for name, data in files.items():
+                ftp.get(name)
+                with open(name, 'rb') as file:
+                    assert file.read() == data
+
+def test_get_legacy(server, monkeypatch):
+    port, served = server
+    monkeypatch.setattr(framing, "VERSION", framing.VERSION_LEGACY)
+    data = os.urandom(5000)
+    (served / "a.bin").write_bytes(data)
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        ftp.get("a.bin")
+    with open("a.bin", 'rb') as file:
+        got = file.read()
+    # legacy clients keep the padding of the last chunk
+    assert got[:len(data)] == data and not got[len(data):].strip(b'\x00')
+
+def test_get_missing_file(server):
+    port, served = server
+    (served / "a.bin").write_bytes(b"contents")
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        with pytest.raises(api.TransferError, match=constants.ERROR_SERVER):
+            ftp.get("missing.bin")
+        ftp.get("a.bin")
+    assert not os.path.exists("missing.bin")
+    with open("a.bin", 'rb') as file:
+        assert file.read() == b"contents"
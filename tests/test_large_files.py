@@ -0,0 +1,101 @@
+import os, struct
+import pytest
+from client import api, constants
+from common import codec, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+large file tests
+
+Files past 4 GiB only fit the 8 byte size fields of protocol version 2. The header codec
+is checked on both sides of 2**32 for both field widths, a sparse file a few KB past 4 GiB
+is put and fetched over loopback, and a connection that negotiated the narrow fields has to
+refuse such a file in both directions instead of cutting its size down to 32 bits.
+
+Putting and fetching the file writes about 8 GiB of real data, that test only runs with
+FTP_LARGE_TESTS set in the environment
+"""
+
+BOUNDARY = 2**32
+BIG = BOUNDARY + 3 * 1024 + 5
+NAME = "big.bin"
+
+def makeSparse(path, size):
+    """makes a file of size bytes that only takes the disk space of its two ends
+
+    Args:
+        path (str): filename/path
+        size (int): file size
+    """
+    with open(path, 'wb') as file:
+        file.write(b"head")
+        file.seek(size - 4)
+        file.write(b"tail")
+
+def ends(path):
+    """the first and last 4 bytes of a file
+
+    Returns:
+        tuple(bytes,bytes): head and tail
+    """
+    with open(path, 'rb') as file:
+        head = file.read(4)
+        file.seek(-4, os.SEEK_END)
+        return head, file.read()
+
+@pytest.mark.parametrize("size", [BOUNDARY - 1, BOUNDARY, BOUNDARY + 1, BIG, codec.MAX_WIDE_SIZE])
+def test_wide_header_round_trip(size):
+    header = codec.packHeader("001", NAME, size, wide=True)
+    assert len(header) == codec.headerSize(len(NAME), True)
+    assert codec.unpackHeader(header, wide=True) == ("001", NAME, size)
+
+@pytest.mark.parametrize("size", [0, BOUNDARY - 1])
+def test_narrow_header_round_trip(size):
+    header = codec.packHeader("001", NAME, size)
+    assert len(header) == codec.headerSize(len(NAME))
+    assert codec.unpackHeader(header) == ("001", NAME, size)
+
+@pytest.mark.parametrize("size", [BOUNDARY, BIG])
+def test_narrow_header_refuses_wide_sizes(size):
+    assert size > codec.maxSize(False)
+    with pytest.raises(struct.error):
+        codec.packHeader("001", NAME, size)
+
+@pytest.mark.skipif(not os.environ.get("FTP_LARGE_TESTS"), reason="writes about 8 GiB, set FTP_LARGE_TESTS to run it")
+def test_put_get_past_4gib(server):
+    port, served = server
+    makeSparse(NAME, BIG)
+    try:
+        with api.Client("localhost", port, poolSize=1) as ftp:
+            with ftp.pool.connection() as conn:
+                assert conn.version == framing.VERSION_WIDE
+            ftp.put(NAME)
+            assert os.path.getsize(served / NAME) == BIG
+            assert ends(served / NAME) == (b"head", b"tail")
+            ftp.get(NAME, "copy.bin")
+        assert os.path.getsize("copy.bin") == BIG
+        assert ends("copy.bin") == (b"head", b"tail")
+    finally:
+        # the copies aren't sparse, don't leave gigabytes behind in the pytest tmp dirs
+        for path in [NAME, "copy.bin", served / NAME]:
+            if os.path.exists(path):
+                os.remove(path)
+
+def test_narrow_connection_refuses_past_4gib(server, monkeypatch):
+    port, served = server
+    monkeypatch.setattr(framing, "VERSION", framing.VERSION_FRAMED)
+    makeSparse(NAME, BOUNDARY)
+    makeSparse(served / NAME, BOUNDARY)
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        with ftp.pool.connection() as conn:
+            assert conn.version == framing.VERSION_FRAMED
+        with pytest.raises(api.TransferError, match=constants.ERROR_FILESIZE):
+            ftp.put(NAME, "copy.bin")
+        assert not os.path.exists(served / "copy.bin")
+        with pytest.raises(api.TransferError):
+            ftp.get(NAME, "copy.bin")
+        assert not os.path.exists("copy.bin")
+        # the refusals leave the connection usable
+        ftp.rename(NAME, "renamed.bin")
+    assert os.path.exists(served / "renamed.bin")
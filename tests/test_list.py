@@ -0,0 +1,97 @@
+import os
+import pytest
+from common import index
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+listing tests
+
+list prints the entries of a directory on the server in name order, pages of at most 1000
+entries are requested back to back. The server answers from an index that it updates for its
+own uploads and renames, and scans again whenever the directory changed behind its back
+"""
+
+def names(out):
+    return [line.split()[-1] for line in out.splitlines()]
+
+def test_index_pages(tmp_path):
+    for name in ["c", "a", "b"]:
+        (tmp_path / name).write_bytes(b"x" * 3)
+    (tmp_path / "d").mkdir()
+    ix = index.DirIndex()
+    total, page = ix.list(str(tmp_path), 1, 2)
+    assert total == 4
+    assert [entry[:3] for entry in page] == [("b", index.KIND_FILE, 3), ("c", index.KIND_FILE, 3)]
+    assert ix.list(str(tmp_path), 3, 10)[1][0][:2] == ("d", index.KIND_DIR)
+    assert ix.list(str(tmp_path / "missing"), 0, 10) is None
+    assert ix.list(str(tmp_path / "a"), 0, 10)[1][0][:3] == ("a", index.KIND_FILE, 3)
+
+def test_update_changes_only_written_names(tmp_path, monkeypatch):
+    ix = index.DirIndex()
+    for name in ["a", "c", "old"]:
+        (tmp_path / name).write_bytes(b"")
+    ix.list(str(tmp_path), 0, 10)
+    monkeypatch.setattr(index, "_scan", None)
+    before = ix.mtimes(str(tmp_path / "b"), str(tmp_path / "old"))
+    (tmp_path / "b").write_bytes(b"xy")
+    (tmp_path / "old").rename(tmp_path / "new")
+    ix.update(before, str(tmp_path / "b"), str(tmp_path / "old"), str(tmp_path / "new"))
+    assert [entry[:3] for entry in ix.list(str(tmp_path), 0, 10)[1]] == [
+        ("a", index.KIND_FILE, 0), ("b", index.KIND_FILE, 2), ("c", index.KIND_FILE, 0), ("new", index.KIND_FILE, 0)]
+
+def test_update_keeps_outside_changes(tmp_path):
+    ix = index.DirIndex()
+    (tmp_path / "a").write_bytes(b"")
+    ix.list(str(tmp_path), 0, 10)
+    # another process changes the directory before the server writes to it
+    (tmp_path / "outside").write_bytes(b"")
+    mtime = os.stat(tmp_path).st_mtime_ns
+    os.utime(tmp_path, ns=(mtime + 10**9, mtime + 10**9))
+    before = ix.mtimes(str(tmp_path / "b"))
+    (tmp_path / "b").write_bytes(b"")
+    ix.update(before, str(tmp_path / "b"))
+    assert [entry[0] for entry in ix.list(str(tmp_path), 0, 10)[1]] == ["a", "b", "outside"]
+
+def test_list_pages(server, capsys):
+    port, served = server
+    for i in range(2500):
+        (served / f"f{i:05}").write_bytes(b"")
+    c = connected(port)
+    capsys.readouterr()
+    c._list("")
+    c.client.close()
+    assert not c.Errors
+    assert names(capsys.readouterr().out) == [f"f{i:05}" for i in range(2500)]
+
+def test_list_file_and_missing(anyServer, capsys):
+    port, served = anyServer
+    (served / "a.txt").write_bytes(b"12345")
+    c = connected(port)
+    capsys.readouterr()
+    c._list("a.txt")
+    line = capsys.readouterr().out.split()
+    assert line[0] == "-" and line[1] == "5" and line[-1] == "a.txt"
+    c._list("missing")
+    c.client.close()
+    assert c.Errors
+
+def test_list_sees_uploads_and_outside_changes(anyServer, capsys):
+    port, served = anyServer
+    (served / "a.txt").write_bytes(b"")
+    c = connected(port)
+    c._list("")
+    with open("b.txt", 'wb') as file:
+        file.write(b"abc")
+    c._request(["put", "b.txt"])
+    (served / "c.txt").write_bytes(b"")
+    capsys.readouterr()
+    c._list("")
+    c.client.close()
+    assert not c.Errors
+    assert names(capsys.readouterr().out) == ["a.txt", "b.txt", "c.txt"]
+
+def test_help_lists_list(server):
+    port, _ = server
+    assert "list" in serverCommands(port)
@@ -0,0 +1,89 @@
+import json, os, socket
+import pytest
+from client import api
+from common import codec, framing, metrics
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+metrics tests
+
+stats answers with the server's counters as JSON or in the Prometheus text format. Bytes are
+counted per connection and added up when the snapshot is taken, unknown requests are answered
+and counted with code 011 apart from the 010 of refused requests
+"""
+
+def test_traffic_merged_in_snapshot():
+    m = metrics.Metrics()
+    a, b = metrics.Traffic(), metrics.Traffic()
+    m.opened(a)
+    m.opened(b)
+    a.received, b.sent = 10, 5
+    snap = m.snapshot()
+    assert (snap["bytesReceived"], snap["bytesSent"], snap["connections"]) == (10, 5, 2)
+    m.closed(a)
+    a.received += 100
+    b.sent += 1
+    snap = m.snapshot()
+    assert (snap["bytesReceived"], snap["bytesSent"], snap["connections"]) == (10, 6, 1)
+    assert snap["connectionsTotal"] == 2
+
+def test_counting_socket():
+    traffic = metrics.Traffic()
+    a, b = socket.socketpair()
+    with a, b:
+        counted = metrics.CountingSocket(a, traffic)
+        counted.sendall(b"abc")
+        b.sendall(b"de")
+        assert counted.recv(10) == b"de"
+    assert (traffic.received, traffic.sent) == (2, 3)
+
+def test_prometheus_format():
+    m = metrics.Metrics()
+    m.request("001", 3)
+    m.error("011")
+    m.observe("process", 0.002)
+    text = metrics.prometheus(m.snapshot({"hits": 1, "misses": 2, "evictions": 0, "entries": 1, "bytes": 9}))
+    assert 'ftp_requests_total{op="get"} 1' in text
+    assert 'ftp_errors_total{code="011"} 1' in text
+    assert 'ftp_request_phase_seconds_bucket{phase="process",le="+Inf"} 1' in text
+    assert 'ftp_cache_bytes 9' in text
+
+def test_stats_counts_bytes_and_errors(anyServer):
+    port, served = anyServer
+    data = os.urandom(100000)
+    (served / "a.bin").write_bytes(data)
+    with api.Client("localhost", port, poolSize=1) as ftp:
+        ftp.get("a.bin")
+        with pytest.raises(api.TransferError):
+            ftp.get("missing")
+        snap = ftp.stats()
+        assert snap["requests"]["get"] == 2
+        assert snap["errors"] == {"010": 1}
+        assert snap["bytesSent"] > len(data)
+        assert snap["bytesReceived"] > 0
+        assert snap["connections"] == 1
+        assert "ftp_sent_bytes_total" in ftp.stats("prometheus")
+
+@pytest.mark.parametrize("message", [codec.packOp("100"), codec.packOp(codec.EXTENDED, 30) + codec.packSize(0)])
+def test_unknown_request_has_own_code(anyServer, message):
+    port, _ = anyServer
+    c = connected(port)
+    c.client.sendall(message)
+    operation, _ = c._getOp(c.receiver.recvExact(1))
+    assert operation == "011"
+    c.client.sendall(codec.packStats("xml"))
+    operation, _ = c._getOp(c.receiver.recvExact(1))
+    assert operation == "011"
+    c._request(["get", "missing"])
+    c.Errors = []
+    c.client.sendall(codec.packStats("json"))
+    c.receiver.recvExact(1)
+    snap = json.loads(c.receiver.recvExact(codec.unpackSize(c.receiver.recvExact(codec.SIZE.size))))
+    c.client.close()
+    assert snap["errors"] == {"011": 2, "010": 1}
+
+def test_help_lists_stats(server):
+    port, _ = server
+    assert "stats" in serverCommands(port)
@@ -0,0 +1,113 @@
+import os, socket, time
+import pytest
+from client import constants
+from common import codec, framing
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+parallel range transfer tests
+
+pget and pput split a file into ranges of at least PARALLEL_MIN_RANGE bytes and move every
+range over a connection of its own. Both sides assemble the ranges in a partial file that
+replaces the real one once every range arrived, so no partial file is left behind and a
+file the server doesn't have leaves nothing on the client. The server only installs a file
+once its ranges cover every byte, refuses ranges that don't fit the upload and drops the
+upload when one of its ranges breaks off
+"""
+
+SIZE = 5 * constants.PARALLEL_MIN_RANGE + 12345
+
+@pytest.mark.parametrize("n", [1, 4, 8])
+def test_parallel_get(anyServer, n):
+    port, served = anyServer
+    data = os.urandom(SIZE)
+    (served / "big.bin").write_bytes(data)
+    with open("big.bin", 'wb') as file:
+        file.write(b"old")
+    c = connected(port)
+    c._parallelGet("big.bin", n)
+    c.client.close()
+    assert not c.Errors
+    with open("big.bin", 'rb') as file:
+        assert file.read() == data
+    assert os.listdir(".") == ["big.bin"]
+
+@pytest.mark.parametrize("n", [1, 4, 8])
+def test_parallel_put(anyServer, n):
+    port, served = anyServer
+    data = os.urandom(SIZE)
+    (served / "big.bin").write_bytes(b"old")
+    with open("big.bin", 'wb') as file:
+        file.write(data)
+    c = connected(port)
+    c._parallelPut("big.bin", n)
+    c.client.close()
+    assert not c.Errors
+    assert (served / "big.bin").read_bytes() == data
+    assert [each.name for each in served.iterdir()] == ["big.bin"]
+
+def test_parallel_get_missing(server):
+    port, served = server
+    c = connected(port)
+    c._parallelGet("missing.bin", 4)
+    c.client.close()
+    assert c.Errors == [constants.ERROR_SERVER + "010"]
+    assert os.listdir(".") == []
+
+def test_overlapping_ranges_leave_no_hole(anyServer):
+    port, served = anyServer
+    data = os.urandom(1000)
+    (served / "a.bin").write_bytes(b"old")
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    c = connected(port)
+    assert c._putRange("a.bin", 0, 500, 1000)
+    assert c._putRange("a.bin", 100, 500, 1000)
+    # 1000 bytes arrived but 600-999 are still missing
+    assert (served / "a.bin").read_bytes() == b"old"
+    assert c._putRange("a.bin", 600, 400, 1000)
+    c.client.close()
+    assert not c.Errors
+    assert (served / "a.bin").read_bytes() == data
+    assert [each.name for each in served.iterdir()] == ["a.bin"]
+
+@pytest.mark.parametrize("offset,length,size", [(900, 200, 1000), (500, 500, 2000)])
+def test_range_that_does_not_fit_refused(anyServer, offset, length, size):
+    port, served = anyServer
+    data = os.urandom(2000)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    c = connected(port)
+    assert c._putRange("a.bin", 0, 500, 1000)
+    assert c._putRange("a.bin", offset, length, size) is None
+    assert c.Errors == [constants.ERROR_SERVER + "010"]
+    # the refused range was read, the connection goes on with the upload
+    assert c._putRange("a.bin", 500, 500, 1000)
+    c.client.close()
+    assert (served / "a.bin").read_bytes() == data[:1000]
+
+def test_broken_range_drops_upload(anyServer):
+    port, served = anyServer
+    c = connected(port)
+    with open("a.bin", 'wb') as file:
+        file.write(os.urandom(1000))
+    assert c._putRange("a.bin", 0, 500, 1000)
+    with socket.create_connection(("localhost", port)) as sock:
+        sock.sendall(codec.packOp("011", framing.VERSION))
+        framing.recvExact(sock, 1)
+        sock.sendall(codec.packRange(codec.EXT_RANGE_PUT, "a.bin", 500, 500, 1000, framing.VERSION >= framing.VERSION_WIDE) + b"x" * 10)
+    deadline = time.monotonic() + 10
+    while list(served.iterdir()):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    # a new upload starts over
+    assert c._putRange("a.bin", 0, 1000, 1000)
+    c.client.close()
+    with open("a.bin", 'rb') as file:
+        assert (served / "a.bin").read_bytes() == file.read()
+
+def test_help_lists_parallel_commands(server):
+    port, served = server
+    assert {"pget", "pput"} <= set(serverCommands(port))
@@ -0,0 +1,64 @@
+import os
+import pytest
+from client import constants
+from conftest import connected, serverCommands
+from common import framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+pipelining and batch tests
+
+Get and change requests typed together are sent back to back and answered in order, a batch
+get fetches several files with one request and answers every file with an ordinary get
+response, a missing one with an error in its place. Servers without the framing get one
+request at a time and the help response lists the new commands
+"""
+
+@pytest.fixture
+def files(server):
+    port, served = server
+    for i in range(5):
+        (served / f"f{i}.txt").write_bytes(os.urandom(1000 * i + 1))
+    return port, served
+
+@pytest.mark.parametrize("framed", [True, False])
+def test_batch_get(files, monkeypatch, framed):
+    port, served = files
+    if not framed:
+        monkeypatch.setattr(framing, "VERSION", framing.VERSION_LEGACY)
+    c = connected(port)
+    c._batchGet(["f1.txt", "missing.txt", "f3.txt"])
+    c._request(["get", "f4.txt"])
+    c.client.close()
+    assert c.Errors == [constants.ERROR_SERVER + "010"]
+    for i in [1, 3, 4]:
+        with open(f"f{i}.txt", 'rb') as file:
+            assert file.read()[:1000 * i + 1] == (served / f"f{i}.txt").read_bytes()
+    assert not os.path.exists("missing.txt")
+
+def test_pipeline(files):
+    port, served = files
+    c = connected(port)
+    c._pipeline([["get", f"f{i}.txt"] for i in range(5)] + [["change", "f0.txt", "g0.txt"], ["get", "g0.txt"]])
+    c.client.close()
+    assert not c.Errors
+    for i in range(1, 5):
+        with open(f"f{i}.txt", 'rb') as file:
+            assert file.read() == (served / f"f{i}.txt").read_bytes()
+    with open("f0.txt", 'rb') as old, open("g0.txt", 'rb') as new:
+        assert old.read() == new.read() == (served / "g0.txt").read_bytes()
+
+def test_pipeline_refuses_put(files):
+    port, served = files
+    c = connected(port)
+    c._pipeline([["get", "f1.txt"], ["put", "f1.txt"]])
+    c.client.close()
+    assert c.Errors == [constants.ERROR_PIPELINE]
+    assert not os.path.exists("f1.txt")
+
+def test_help_lists_commands(server):
+    port, served = server
+    commands = serverCommands(port)
+    assert commands[0] == "put" and commands[-1] == "bye"
+    assert {"mget", "change", "help", "pipelining", "details"} <= set(commands)
@@ -0,0 +1,82 @@
+import logging, os, time
+import pytest
+from client import api
+from common import progress
+from conftest import connected
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+progress reporting tests
+
+Transfers report their progress to a callback at most every INTERVAL seconds and once more
+when they end, nothing is tracked without a callback. The client and the library take the
+callback as an argument, servers log the reports with --progress
+"""
+
+def test_reports_rate_limited():
+    reports = []
+    with progress.Progress(reports.append, "sending a", 1000, interval=3600) as p:
+        for _ in range(1000):
+            p.update(1)
+    p.close()
+    assert len(reports) == 1
+    assert reports[0].final and reports[0].done == 1000 and reports[0].total == 1000
+
+def test_reports_every_update_without_interval():
+    reports = []
+    with progress.Progress(reports.append, "sending a", None, interval=0) as p:
+        p.update(5)
+        p.update(5)
+    assert [r.done for r in reports] == [5, 10, 10]
+    assert [r.final for r in reports] == [False, False, True]
+
+def test_track_without_callback():
+    assert progress.track(None, "a", 1) is progress.NULL
+    with progress.track(None, "a", 1) as p:
+        p.update(1)
+
+def test_log_progress(caplog):
+    logger = logging.getLogger("test_progress")
+    with caplog.at_level(logging.INFO, logger="test_progress"):
+        progress.LogProgress(logger)(progress.Report("sending a", 10, None, 0.0, True))
+    assert "sending a done 10/? bytes" in caplog.text
+
+@pytest.mark.parametrize("size", [0, 300000])
+def test_client_reports(anyServer, size):
+    port, served = anyServer
+    data = os.urandom(size)
+    (served / "a.bin").write_bytes(data)
+    reports = []
+    c = connected(port, progress=reports.append)
+    c._request(["get", "a.bin"])
+    c.client.close()
+    assert not c.Errors
+    final = [r for r in reports if r.final]
+    assert len(final) == 1 and final[0].done == final[0].total == size
+
+def test_library_reports(server):
+    port, served = server
+    data = os.urandom(200000)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    reports = []
+    with api.Client("localhost", port, progress=reports.append) as ftp:
+        ftp.put("a.bin")
+        ftp.get("a.bin", "b.bin")
+    assert [(r.name.split()[0], r.done) for r in reports if r.final] == [("sending", len(data)), ("receiving", len(data))]
+    assert all(r.done <= len(data) for r in reports)
+
+def test_server_logs_progress(startServer):
+    # log level 2 writes info messages to server.log in the served directory, files served
+    # from the cache are sent in one piece without progress
+    port, served = startServer("2", "--progress", "--cache", "0")
+    (served / "a.bin").write_bytes(os.urandom(200000))
+    c = connected(port)
+    c._request(["get", "a.bin"])
+    c.client.close()
+    assert not c.Errors
+    deadline = time.monotonic() + 10
+    while "done 200000/200000 bytes" not in (served / "server.log").read_text():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
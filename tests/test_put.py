@@ -0,0 +1,70 @@
+import os, socket, time
+import pytest
+from client import constants
+from client.client import client
+from conftest import connected
+from common import codec, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+streaming put tests
+
+Uploads are written to disk as their chunks arrive, into a partial file that only replaces
+the stored file once the whole upload is there. An upload that breaks off leaves the stored
+file alone and keeps what arrived as its resumable partial file. Put commands without a
+file to send are refused by the client before anything goes out
+"""
+
+@pytest.mark.parametrize("size", [0, 1, 1023, 1024, 65536, 1000003])
+@pytest.mark.parametrize("framed", [True, False])
+def test_put(server, monkeypatch, size, framed):
+    port, served = server
+    if not framed:
+        monkeypatch.setattr(framing, "VERSION", framing.VERSION_LEGACY)
+    data = os.urandom(size)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    c = connected(port)
+    c._request(["put", "a.bin"])
+    c.client.close()
+    assert not c.Errors
+    assert (served / "a.bin").read_bytes() == data
+    assert [each.name for each in served.iterdir()] == ["a.bin"]
+
+def test_put_replaces_file(server):
+    port, served = server
+    (served / "a.bin").write_bytes(b"old contents")
+    with open("a.bin", 'wb') as file:
+        file.write(b"new")
+    c = connected(port)
+    c._request(["put", "a.bin"])
+    c.client.close()
+    assert (served / "a.bin").read_bytes() == b"new"
+
+def test_broken_off_upload_is_kept_apart(server):
+    port, served = server
+    (served / "a.bin").write_bytes(b"old contents")
+    with socket.create_connection(("localhost", port)) as sock:
+        sock.sendall(codec.packOp("011", framing.VERSION))
+        assert codec.unpackOp(sock.recv(1)) == ("111", framing.VERSION)
+        sock.sendall(codec.packHeader("000", "a.bin", 100000, wide=True) + b"z" * 40000)
+        time.sleep(0.2)
+    part = served / f"a.bin{constants.PARTIAL_SUFFIX}"
+    deadline = time.monotonic() + 10
+    while not part.exists():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert part.read_bytes() == b"z" * 40000
+    assert (served / "a.bin").read_bytes() == b"old contents"
+
+@pytest.mark.parametrize("command", ["put", "reput", "dput"])
+def test_put_without_file_is_refused(command):
+    c = client("localhost", 1)
+    c.Errors = []
+    assert not c._validateArgs([command])
+    assert c.Errors == [constants.ERROR_ARG_PUT]
+    c.Errors = []
+    assert not c._validateArgs([command, "missing.bin"])
+    assert c.Errors == [constants.ERROR_ARG_FILE]
+    c.client.close()
@@ -0,0 +1,77 @@
+import io, os, socket
+import pytest
+from common import codec, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+buffered receiver tests
+
+The receiver reads ahead in one large recv and keeps what arrived past the current message
+for the next one. Peeking doesn't consume, messages come out whole however they were split,
+reads larger than the buffer go straight into their result and a peer closing between
+messages is told apart from one closing in the middle of one. Requests sent to the server in
+a single segment all have to be answered, in both serving modes
+"""
+
+@pytest.fixture
+def pair():
+    a, b = socket.socketpair()
+    with a, b:
+        yield a, framing.Receiver(b, 64)
+
+def test_peek_then_recv(pair):
+    sock, receiver = pair
+    sock.sendall(b"abcdef")
+    assert receiver.peek(2) == b"ab"
+    assert receiver.recvExact(3) == b"abc"
+    assert receiver.pending() == 3
+
+def test_back_to_back_messages(pair):
+    sock, receiver = pair
+    messages = [codec.packName("001", "a.txt"), codec.packChange("010", "b", "c"), codec.packOp("011")]
+    sock.sendall(b''.join(messages))
+    for each in messages:
+        assert receiver.recvMessage(codec.requestSize, True) == each
+    assert receiver.pending() == 0
+
+def test_large_read_and_file(pair):
+    sock, receiver = pair
+    data = os.urandom(1000)
+    sock.sendall(b"xy" + data + data)
+    assert receiver.recvExact(2) == b"xy"
+    assert receiver.recvExact(1000) == data
+    out = io.BytesIO()
+    receiver.recvToFile(out, 1000, 128)
+    assert out.getvalue() == data
+
+def test_close_between_and_inside_messages(pair):
+    sock, receiver = pair
+    sock.sendall(codec.packOp("011"))
+    sock.sendall(codec.packName("001", "a.txt")[:3])
+    sock.shutdown(socket.SHUT_WR)
+    assert receiver.recvMessage(codec.requestSize, True) == codec.packOp("011")
+    with pytest.raises(ConnectionError):
+        receiver.recvMessage(codec.requestSize, True)
+
+def test_clean_close(pair):
+    sock, receiver = pair
+    sock.shutdown(socket.SHUT_WR)
+    assert receiver.recvMessage(codec.requestSize, True) == b''
+
+@pytest.mark.parametrize("mode", ["thread", "selector"])
+def test_requests_in_one_segment(startServer, mode):
+    port, served = startServer("--mode", mode)
+    for i in range(20):
+        (served / f"f{i}.txt").write_bytes(str(i).encode())
+    with socket.create_connection(("localhost", port)) as sock:
+        sock.sendall(codec.packOp("011", framing.VERSION))
+        assert codec.unpackOp(sock.recv(1)) == ("111", framing.VERSION)
+        sock.sendall(b''.join(codec.packName("001", f"f{i}.txt") for i in range(20)))
+        receiver = framing.Receiver(sock)
+        for i in range(20):
+            name = f"f{i}.txt"
+            header = receiver.recvExact(codec.headerSize(len(name), True))
+            _, fn, fs = codec.unpackHeader(header, True)
+            assert fn == name
+            assert receiver.recvExact(fs) == str(i).encode()
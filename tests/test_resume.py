@@ -0,0 +1,86 @@
+import os
+import pytest
+from client import constants
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+resumable transfer tests
+
+An interrupted transfer is kept as <name>.part. reput asks the server how much of the
+upload it kept and only sends the rest, reget requests the file from the size of the local
+partial file on. Either way the partial file replaces the real one once complete, a partial
+file longer than the file it belongs to is started over and a refused reget leaves nothing
+behind
+"""
+
+PART = constants.PARTIAL_SUFFIX
+SIZE = 300000
+
+@pytest.mark.parametrize("have", [0, 1, SIZE // 2, SIZE - 1])
+def test_resume_put(anyServer, have):
+    port, served = anyServer
+    data = os.urandom(SIZE)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    if have:
+        (served / f"a.bin{PART}").write_bytes(data[:have])
+    (served / "a.bin").write_bytes(b"old")
+    c = connected(port)
+    c._resumePut("a.bin")
+    c.client.close()
+    assert not c.Errors
+    assert (served / "a.bin").read_bytes() == data
+    assert not (served / f"a.bin{PART}").exists()
+
+def test_resume_put_of_other_file(anyServer):
+    port, served = anyServer
+    data = os.urandom(1000)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    # the partial file is longer than the file, it can't be a prefix of it
+    (served / f"a.bin{PART}").write_bytes(os.urandom(5000))
+    c = connected(port)
+    c._resumePut("a.bin")
+    c.client.close()
+    assert (served / "a.bin").read_bytes() == data
+
+@pytest.mark.parametrize("have", [0, 1, SIZE // 2, SIZE])
+def test_resume_get(anyServer, have):
+    port, served = anyServer
+    data = os.urandom(SIZE)
+    (served / "a.bin").write_bytes(data)
+    with open(f"a.bin{PART}", 'wb') as file:
+        file.write(data[:have])
+    c = connected(port)
+    c._resumeGet("a.bin")
+    c.client.close()
+    assert not c.Errors
+    with open("a.bin", 'rb') as file:
+        assert file.read() == data
+    assert not os.path.exists(f"a.bin{PART}")
+
+def test_resume_get_of_shrunk_file(anyServer):
+    port, served = anyServer
+    data = os.urandom(1000)
+    (served / "a.bin").write_bytes(data)
+    with open(f"a.bin{PART}", 'wb') as file:
+        file.write(os.urandom(5000))
+    c = connected(port)
+    c._resumeGet("a.bin")
+    c.client.close()
+    with open("a.bin", 'rb') as file:
+        assert file.read() == data
+
+def test_refused_resume_get(server):
+    port, served = server
+    c = connected(port)
+    c._resumeGet("missing.bin")
+    c.client.close()
+    assert c.Errors == [constants.ERROR_SERVER + "010"]
+    assert os.listdir(".") == []
+
+def test_help_lists_resume_commands(server):
+    port, served = server
+    assert {"reget", "reput"} <= set(serverCommands(port))
@@ -0,0 +1,85 @@
+import os, socket, threading, time
+import pytest
+from client import api
+from common import codec, framing
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+concurrent server tests
+
+Many clients are served at once from the single listening socket in both serving modes,
+every one of them moving files of its own. In thread mode a connection beyond the size of
+the worker pool has to wait for a worker, which the server logs, and is served once one of
+the connections ahead of it goes away
+"""
+
+CLIENTS = 8
+
+def negotiate(sock):
+    """offers the server the framed protocol on a raw socket
+
+    Returns:
+        bytes: the server's answer
+    """
+    sock.sendall(codec.packOp("011", framing.VERSION))
+    return sock.recv(1)
+
+@pytest.mark.parametrize("mode", ["thread", "selector"])
+def test_concurrent_clients(startServer, mode):
+    port, served = startServer("--mode", mode, "--workers", "4")
+    errors = []
+    def run(i):
+        try:
+            data = os.urandom(50000 + i)
+            with open(f"up{i}.bin", 'wb') as file:
+                file.write(data)
+            with api.Client("localhost", port, poolSize=1) as ftp:
+                for _ in range(5):
+                    ftp.put(f"up{i}.bin")
+                    ftp.get(f"up{i}.bin", f"down{i}.bin")
+                    with open(f"down{i}.bin", 'rb') as file:
+                        assert file.read() == data
+        except Exception as e:
+            errors.append(e)
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(CLIENTS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    for i in range(CLIENTS):
+        assert os.path.getsize(served / f"up{i}.bin") == 50000 + i
+
+def test_idle_connections_dont_block_selector(startServer):
+    port, served = startServer("--mode", "selector", "--workers", "1")
+    idle = [socket.create_connection(("localhost", port)) for _ in range(4)]
+    try:
+        for sock in idle:
+            assert codec.unpackOp(negotiate(sock)) == ("111", framing.VERSION)
+        (served / "a.txt").write_bytes(b"contents")
+        with api.Client("localhost", port, poolSize=1) as ftp:
+            ftp.get("a.txt")
+        with open("a.txt", 'rb') as file:
+            assert file.read() == b"contents"
+    finally:
+        for sock in idle:
+            sock.close()
+
+def test_saturated_pool_is_logged(startServer, tmp_path):
+    port, served = startServer("--workers", "1")
+    first = socket.create_connection(("localhost", port))
+    assert codec.unpackOp(negotiate(first)) == ("111", framing.VERSION)
+    second = socket.create_connection(("localhost", port))
+    second.settimeout(10)
+    try:
+        second.sendall(codec.packOp("011", framing.VERSION))
+        deadline = time.monotonic() + 10
+        while b"workers are busy" not in (tmp_path / "server.err").read_bytes():
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        first.close()
+        assert codec.unpackOp(second.recv(1)) == ("111", framing.VERSION)
+    finally:
+        first.close()
+        second.close()
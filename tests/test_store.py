@@ -0,0 +1,125 @@
+import io, os
+import pytest
+from common import store
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+content addressed store tests
+
+A server started with --store keeps every stored file as a hard link to a blob named after
+its blake2b digest, taken while the upload is written. With dedup on the client asks for the contents by hash first and nothing is sent
+when the server holds them, the name becomes another link to the blob
+"""
+
+def test_intern_shares_blob(tmp_path):
+    s = store.Store(str(tmp_path / "store"))
+    (tmp_path / "a").write_bytes(b"same")
+    (tmp_path / "b").write_bytes(b"same")
+    digest = s.intern(str(tmp_path / "a"))
+    assert s.intern(str(tmp_path / "b")) == digest
+    assert s.has(digest, 4) and not s.has(digest, 5)
+    assert os.path.samefile(tmp_path / "a", tmp_path / "b")
+    assert os.stat(s.path(digest)).st_nlink == 3
+
+def test_intern_uses_given_digest(tmp_path):
+    s = store.Store(str(tmp_path / "store"))
+    (tmp_path / "a").write_bytes(b"data")
+    # a digest taken while writing is trusted, the file isn't read again
+    given = bytes(store.DIGEST_SIZE)
+    assert s.intern(str(tmp_path / "a"), given) == given
+    assert os.path.samefile(s.path(given), tmp_path / "a")
+    digest = store.new()
+    digest.update(b"data")
+    assert store.digestFile(io.BytesIO(b"data")) == digest.digest() != given
+
+def test_link_of_linked_name_is_left_alone(tmp_path):
+    s = store.Store(str(tmp_path / "store"))
+    (tmp_path / "a").write_bytes(b"data")
+    digest = s.intern(str(tmp_path / "a"))
+    s.link(digest, str(tmp_path / "a"))
+    assert sorted(os.listdir(tmp_path)) == ["a", "store"]
+    assert (tmp_path / "a").read_bytes() == b"data"
+
+def test_collect_removes_unlinked_blobs(tmp_path):
+    s = store.Store(str(tmp_path / "store"))
+    (tmp_path / "a").write_bytes(b"kept")
+    (tmp_path / "b").write_bytes(b"dropped")
+    kept = s.intern(str(tmp_path / "a"))
+    dropped = s.intern(str(tmp_path / "b"))
+    os.remove(tmp_path / "b")
+    assert s.collect() == 1
+    assert os.path.exists(s.path(kept)) and not os.path.exists(s.path(dropped))
+
+def test_put_is_interned(startServer):
+    port, served = startServer("--store")
+    with open("a.bin", 'wb') as file:
+        file.write(os.urandom(10000))
+    c = connected(port)
+    c._request(["put", "a.bin"])
+    c.client.close()
+    assert not c.Errors
+    assert os.stat(served / "a.bin").st_nlink == 2
+
+@pytest.mark.parametrize("script", ["server.py", "async_server.py"])
+def test_every_upload_stored_under_its_digest(startServer, script):
+    port, served = startServer("--store", script=script)
+    blob = lambda name: store.Store(str(served / ".store")).path(store.digestFile(open(served / name, 'rb')))
+    data = os.urandom(300000)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    os.makedirs("t/sub")
+    with open("t/sub/b.bin", 'wb') as file:
+        file.write(data[:1000])
+    c = connected(port)
+    c._request(["put", "a.bin"])
+    c.compression = "zlib"
+    c._compressedPut("a.bin")
+    c.checksum = "crc32"
+    c._checkedPut("a.bin")
+    with open("a.bin", 'r+b') as file:
+        file.write(b"changed")
+    c._deltaPut("a.bin")
+    c._treePut("t")
+    c.client.close()
+    assert not c.Errors
+    for name in ["a.bin", "t/sub/b.bin"]:
+        assert os.path.samefile(served / name, blob(name))
+
+def test_dedup_put_sends_nothing(startServer):
+    port, served = startServer("--store")
+    data = os.urandom(10000)
+    with open("a.bin", 'wb') as file:
+        file.write(data)
+    c = connected(port)
+    assert not c._putByHash("a.bin")
+    c._request(["put", "a.bin"])
+    os.rename("a.bin", "b.bin")
+    assert c._putByHash("b.bin")
+    c.client.close()
+    assert not c.Errors
+    assert (served / "b.bin").read_bytes() == data
+    assert os.path.samefile(served / "a.bin", served / "b.bin")
+
+def test_dedup_without_store(server):
+    port, served = server
+    with open("a.bin", 'wb') as file:
+        file.write(b"data")
+    c = connected(port)
+    c._request(["put", "a.bin"])
+    assert not c._putByHash("a.bin")
+    c.client.close()
+    assert os.stat(served / "a.bin").st_nlink == 1
+
+def test_unlinked_blobs_collected_at_start(startServer, tmp_path):
+    s = store.Store(str(tmp_path / "server" / ".store"))
+    (tmp_path / "server" / "a").write_bytes(b"old")
+    digest = s.intern(str(tmp_path / "server" / "a"))
+    os.remove(tmp_path / "server" / "a")
+    startServer("--store")
+    assert not os.path.exists(s.path(digest))
+
+def test_help_lists_dedup(server):
+    port, _ = server
+    assert "dedup" in serverCommands(port)
@@ -0,0 +1,91 @@
+import asyncio, json, os, time
+import pytest
+from common import framing, tracing
+from conftest import connected
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+tracing and profiling tests
+
+Spans are written in the Chrome trace event format, one line per span and the closing bracket
+left out. The servers trace with --trace or FTP_TRACE and write a cProfile dump of every
+connection to the --profile directory once it closes. Without them nothing is wrapped
+"""
+
+def spans(path, timeout=10):
+    """the spans of a trace file, waiting for a server to write some"""
+    deadline = time.monotonic() + timeout
+    while True:
+        text = path.read_text() if path.exists() else ""
+        events = json.loads(text.rstrip().rstrip(",") + "]") if text else []
+        if events or time.monotonic() > deadline:
+            return events
+        time.sleep(0.05)
+
+def test_tracer_writes_complete_events(tmp_path):
+    t = tracing.Tracer(str(tmp_path / "t.json"))
+    class Target:
+        def work(self, x):
+            return x * 2
+        async def later(self):
+            return 1
+    target = Target()
+    tracing.instrument(target, ["work", "later"], t, "test")
+    tracing.instrument(target, ["work"], t, "test")
+    assert target.work(2) == 4
+    assert asyncio.run(target.later()) == 1
+    t.close()
+    events = spans(tmp_path / "t.json")
+    assert [e["name"] for e in events] == ["test.work", "test.later"]
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+def test_off_without_settings(monkeypatch):
+    monkeypatch.delenv(tracing.TRACE_ENV, raising=False)
+    monkeypatch.delenv(tracing.PROFILE_ENV, raising=False)
+    assert tracing.tracer() is None and tracing.profiler() is None
+
+@pytest.mark.parametrize("script", ["server.py", "async_server.py"])
+@pytest.mark.parametrize("byEnv", [False, True])
+def test_server_trace(startServer, tmp_path, script, byEnv):
+    trace = tmp_path / "server.trace.json"
+    if byEnv:
+        port, served = startServer(script=script, env={tracing.TRACE_ENV: str(trace)})
+    else:
+        port, served = startServer("--trace", str(trace), script=script)
+    (served / "a.txt").write_bytes(b"data")
+    c = connected(port)
+    c._request(["get", "a.txt"])
+    c.client.close()
+    assert not c.Errors
+    names = {e["name"] for e in spans(trace)}
+    assert any(name.startswith("server.") for name in names)
+    # the threaded server reads every connection through its own traced receiver
+    assert any(name.startswith("recv.") for name in names) == (script == "server.py")
+
+def test_client_trace(server, tmp_path, monkeypatch):
+    port, served = server
+    trace = tmp_path / "client.trace.json"
+    monkeypatch.setenv(tracing.TRACE_ENV, str(trace))
+    (served / "a.txt").write_bytes(b"data")
+    c = connected(port)
+    c._request(["get", "a.txt"])
+    c.client.close()
+    c.tracer.close()
+    names = {e["name"] for e in spans(trace)}
+    assert any(name.startswith("client.") for name in names)
+    assert any(name.startswith("recv.") for name in names)
+    # only the client's own receiver is wrapped, other connections in the process aren't traced
+    assert not any(getattr(getattr(framing.Receiver, name), "traced", False) for name in framing.Receiver.Traced)
+
+def test_server_profile(startServer, tmp_path):
+    prof = tmp_path / "prof"
+    port, served = startServer("--profile", str(prof))
+    c = connected(port)
+    c._request(["help"])
+    c.client.close()
+    deadline = time.monotonic() + 10
+    while not (prof.exists() and os.listdir(prof)) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    dumps = os.listdir(prof)
+    assert len(dumps) == 1 and dumps[0].startswith("conn-") and dumps[0].endswith(".prof")
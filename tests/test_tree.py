@@ -0,0 +1,83 @@
+import os
+import pytest
+from common import framing, tree
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+directory tree transfer tests
+
+tput and tget send a whole directory tree as one stream of entries, directories before what
+they hold. Symlinks are left out and entries leaving the root are refused, legacy servers
+can't transfer trees
+"""
+
+def makeTree(root):
+    """a tree with empty and nested directories, small files and one larger file"""
+    files = {"a.txt": b"a", "empty.txt": b"", "sub/b.txt": b"b" * 100, "sub/deep/big.bin": os.urandom(300000)}
+    for name, data in files.items():
+        os.makedirs(os.path.join(root, os.path.dirname(name)), exist_ok=True)
+        with open(os.path.join(root, name), 'wb') as file:
+            file.write(data)
+    os.makedirs(os.path.join(root, "sub", "none"))
+    return files
+
+def readTree(root):
+    out = {}
+    for dirpath, dirs, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            with open(path, 'rb') as file:
+                out[os.path.relpath(path, root).replace(os.sep, "/")] = file.read()
+    return out
+
+def test_walk_skips_symlinks(tmp_path):
+    makeTree(tmp_path / "t")
+    (tmp_path / "outside.txt").write_bytes(b"secret")
+    os.symlink(tmp_path / "outside.txt", tmp_path / "t" / "link.txt")
+    os.symlink(tmp_path, tmp_path / "t" / "up")
+    names = [name for kind, name, path, size in tree.walk(str(tmp_path / "t"))]
+    assert "link.txt" not in names and "up" not in names
+    assert names.index("sub") < names.index("sub/b.txt") < names.index("sub/deep/big.bin")
+
+@pytest.mark.parametrize("name", ["../x", "/x", "a/../../x", "a//b", ""])
+def test_target_refuses_leaving_root(name):
+    with pytest.raises(ValueError):
+        tree.target("root", name)
+
+def test_tree_round_trip(anyServer):
+    port, served = anyServer
+    files = makeTree("t")
+    os.symlink(os.path.abspath("t/a.txt"), "t/link.txt")
+    c = connected(port)
+    c._treePut("t")
+    assert readTree(served / "t") == files
+    assert (served / "t" / "sub" / "none").is_dir()
+    assert not (served / "t" / "link.txt").exists()
+    os.rename("t", "old")
+    c._treeGet("t")
+    c.client.close()
+    assert not c.Errors
+    assert readTree("t") == files
+    assert os.path.isdir("t/sub/none")
+
+def test_tree_get_missing(anyServer):
+    port, served = anyServer
+    c = connected(port)
+    c._treeGet("missing")
+    c.client.close()
+    assert c.Errors
+
+def test_tree_needs_framing(server, monkeypatch):
+    port, _ = server
+    monkeypatch.setattr(framing, "VERSION", framing.VERSION_LEGACY)
+    makeTree("t")
+    c = connected(port)
+    c._treePut("t")
+    c.client.close()
+    assert c.Errors
+
+def test_help_lists_tput_and_tget(server):
+    port, _ = server
+    assert {"tput", "tget"} <= set(serverCommands(port))
@@ -0,0 +1,86 @@
+import os
+import pytest
+from common import codec, tuning
+from conftest import connected, serverCommands
+"""
+Name: Maxim Hermez
+ID: 201706267
+user: mnh34
+tuning tests
+
+tune offers the client's chunk size and socket buffers to the server, the connection takes
+the client's chunk size within MIN_CHUNK and MAX_CHUNK. With auto tuning the chunk size
+doubles while transfers get faster, settles, and is probed again after REPROBE transfers
+"""
+
+MB = 1 << 20
+
+def feed(tuner, rates):
+    """observes transfers of 64 chunks each at the given rates in bytes per second"""
+    sizes = []
+    for rate in rates:
+        nbytes = tuner.chunkSize * 64
+        sizes.append(tuner.observe(nbytes, nbytes / rate))
+    return sizes
+
+def test_auto_tuner_grows_and_settles():
+    tuner = tuning.AutoTuner(64 << 10)
+    assert feed(tuner, [100 * MB, 200 * MB, 190 * MB]) == [128 << 10, 256 << 10, 128 << 10]
+    assert tuner.settled
+    assert feed(tuner, [300 * MB] * 5) == [128 << 10] * 5
+
+def test_auto_tuner_ignores_short_transfers():
+    tuner = tuning.AutoTuner(64 << 10)
+    assert tuner.observe(64 << 10, 0.001) == 64 << 10
+    assert tuner.observe(1 << 30, 0) == 64 << 10
+
+def test_auto_tuner_probes_again():
+    tuner = tuning.AutoTuner(64 << 10)
+    feed(tuner, [100 * MB, 90 * MB])
+    assert tuner.settled and tuner.chunkSize == 64 << 10
+    sizes = feed(tuner, [100 * MB] * tuning.REPROBE)
+    assert sizes[:-1] == [64 << 10] * (tuning.REPROBE - 1)
+    assert sizes[-1] == 128 << 10 and not tuner.settled
+    # the network got faster, the bigger size pays off now
+    assert feed(tuner, [150 * MB]) == [256 << 10]
+
+def test_auto_tuner_stays_at_maximum():
+    tuner = tuning.AutoTuner(tuning.MAX_CHUNK)
+    feed(tuner, [100 * MB])
+    assert tuner.settled
+    assert set(feed(tuner, [100 * MB] * (tuning.REPROBE + 1))) == {tuning.MAX_CHUNK}
+
+@pytest.mark.parametrize("serverChunk", [[], ["--chunk-size", "32"]])
+def test_tune_honors_client_chunk_size(startServer, serverChunk, capsys):
+    port, served = startServer(*serverChunk)
+    data = os.urandom(MB)
+    (served / "a.bin").write_bytes(data)
+    c = connected(port)
+    c._retune("256")
+    assert c.chunkSize == 256 << 10
+    assert "Chunk size 256 KB" in capsys.readouterr().out
+    c._request(["get", "a.bin"])
+    c.client.close()
+    assert not c.Errors
+    with open("a.bin", 'rb') as file:
+        assert file.read() == data
+
+def test_tune_clamped_by_server(anyServer):
+    port, _ = anyServer
+    c = connected(port)
+    c.client.sendall(codec.packTune(64 << 20, 0, 0))
+    chunkSize, _, _ = codec.unpackTuneReply(c.receiver.recvExact(codec.TUNE_REPLY.size))
+    c.client.close()
+    assert chunkSize == tuning.MAX_CHUNK
+
+def test_tune_auto(anyServer, capsys):
+    port, _ = anyServer
+    c = connected(port)
+    c._retune("auto")
+    c.client.close()
+    assert c.tuner is not None
+    assert "tuned automatically" in capsys.readouterr().out
+
+def test_help_lists_tune(server):
+    port, _ = server
+    assert "tune" in serverCommands(port)